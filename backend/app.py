@@ -1,25 +1,37 @@
 """
 Flask backend application for plugin-based web app.
 """
-from flask import Flask, jsonify, request
+from flask import Blueprint, Flask, Response, jsonify, request
 from flask_cors import CORS
+import hashlib
+import json
+import logging
 import os
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 app = Flask(__name__)
+# Encode responses with orjson when it is installed
+from serialization import install as install_json
+install_json(app)
 # Enable CORS for all routes - simple and permissive
-CORS(app, origins="*", methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"], allow_headers=["Content-Type", "Authorization"])
-
-# Initialize database
-from database import init_database
-init_database()
+CORS(app, origins="*", methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"], allow_headers=["Content-Type", "Authorization", "X-DB-Session"])
 
 # Import plugin registry
 from plugins import get_plugins, get_plugin_by_id
 
+from metrics import METRICS_ENABLED, REGISTRY, instrument_app
+if METRICS_ENABLED:
+    instrument_app(app)
+
+# Registered after metrics so response sizes are counted as sent
+from compression import available_encodings, encoded_etag, install as install_compression
+install_compression(app)
+
 
 @app.route('/api/plugins', methods=['GET'])
 def list_plugins():
@@ -42,55 +54,174 @@ def health_check():
     """Health check endpoint."""
     return jsonify({'status': 'ok'})
 
+
+@app.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: 503 until the database answers; never waits long on it."""
+    status = get_readiness()
+    return jsonify(status), 200 if status['ready'] else 503
+
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics endpoint."""
+    if not METRICS_ENABLED:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 @app.after_request
 def after_request(response):
     """Add CORS headers to all responses."""
     response.headers.add('Access-Control-Allow-Origin', '*')
-    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
+    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,X-DB-Session')
     response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
     return response
 
 
 # Database API endpoints
 from database import (
-    get_tables, get_table_schema, create_table, drop_table,
-    add_column, get_table_data, insert_row, update_row, delete_row,
-    execute_query
+    get_readiness, get_tables, get_table_schema, create_table, drop_table,
+    add_column, get_table_stats, list_indexes, create_index, drop_index, get_index_advice, clear_index_advice,
+    get_table_data, insert_row, insert_rows, update_row, delete_row,
+    execute_query, cancel_query, get_running_queries, explain_query, get_slow_queries,
+    clear_slow_queries, get_change_token, get_pool_stats, get_executor_stats, stream_query, stream_table_data,
+    import_rows, export_table, execute_transaction, get_query_cache_stats, clear_query_cache,
+    get_adapter, list_connections, use_connection, use_session, UnknownConnection,
+    IMPORT_SAMPLE_ROWS, EXPORT_FORMATS, ROW_FORMATS
 )
+from streaming import (
+    PrimedIterator, ndjson_stream, json_array_stream, gzip_stream, read_csv, read_ndjson
+)
+from executor import ExecutorSaturated
+
+STREAM_FORMATS = ('ndjson', 'json')
+
+# The database API, served for the default connection under /api/db and for
+# named ones under /api/db/<conn> (registered at the end of this module)
+db_api = Blueprint('db_api', __name__)
+
 
+@app.url_value_preprocessor
+def select_connection(endpoint, values):
+    """
+    Point this request's database calls at the connection named in its URL (or
+    the default one), on behalf of the client's session: the X-DB-Session
+    header, or else the client address.
+    """
+    use_connection(values.pop('conn', None) if values else None)
+    use_session(request.headers.get('X-DB-Session') or request.remote_addr)
 
-@app.route('/api/db/tables', methods=['GET'])
+
+@db_api.before_request
+def open_connection():
+    """Open the request's connection up front, so an unknown name is a 404 on every route."""
+    try:
+        get_adapter()
+    except UnknownConnection as e:
+        return jsonify({'error': str(e)}), 404
+
+
+def error_response(e: Exception, message=None):
+    """
+    Error response for an unexpected failure; 503 when the database executor
+    is saturated, 404 for an unknown connection.
+    """
+    if isinstance(e, ExecutorSaturated):
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
+    if isinstance(e, UnknownConnection):
+        return jsonify({'error': str(e)}), 404
+    return jsonify({'error': message or str(e)}), 500
+
+
+def resource_etag(table_name=None) -> str:
+    """
+    Strong ETag for the current GET request, from the change token of a table
+    (or of the table list), so it can be checked without touching the database.
+    """
+    token = get_change_token(table_name)
+    return hashlib.sha1(f'{token}|{request.full_path}'.encode()).hexdigest()
+
+
+def not_modified(etag: str):
+    """Return a 304 response if the client already holds ``etag`` in any encoding, else None."""
+    for tag in [etag] + [encoded_etag(etag, encoding) for encoding in available_encodings()]:
+        if request.if_none_match.contains_weak(tag):
+            response = Response(status=304)
+            response.set_etag(tag)
+            response.vary.add('Accept-Encoding')
+            return response
+    return None
+
+
+def stream_response(batches, stream_format: str, extra=None) -> Response:
+    """Build a chunked response from ``(columns, rows)`` batches."""
+    # Pull the first batch now so query errors still get a proper status code.
+    batches = PrimedIterator(batches)
+    if stream_format == 'ndjson':
+        return Response(ndjson_stream(batches), mimetype='application/x-ndjson')
+    return Response(json_array_stream(batches, extra), mimetype='application/json')
+
+
+@db_api.route('/tables', methods=['GET'])
 def db_list_tables():
     """Get list of all tables."""
     try:
+        etag = resource_etag()
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
         tables = get_tables()
-        return jsonify({'tables': tables})
+        response = jsonify({'tables': tables})
+        response.set_etag(etag)
+        return response
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 
-@app.route('/api/db/tables/<table_name>/schema', methods=['GET'])
+@db_api.route('/tables/<table_name>/schema', methods=['GET'])
 def db_get_schema(table_name):
     """Get schema for a table."""
     try:
+        etag = resource_etag(table_name)
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
         schema = get_table_schema(table_name)
-        return jsonify({'schema': schema})
+        response = jsonify({'schema': schema})
+        response.set_etag(etag)
+        return response
+    except Exception as e:
+        return error_response(e)
+
+
+@db_api.route('/tables/<table_name>/stats', methods=['GET'])
+def db_get_stats(table_name):
+    """Get per-column statistics (nulls, min/max, distinct, common values, histograms) of a table."""
+    try:
+        full = request.args.get('full', 'false').lower() == 'true'
+        refresh = request.args.get('refresh', 'false').lower() == 'true'
+        if table_name not in get_tables():
+            return jsonify({'error': f'Table {table_name} not found'}), 404
+        etag = resource_etag(table_name)
+        cached = None if refresh else not_modified(etag)
+        if cached is not None:
+            return cached
+        response = jsonify(get_table_stats(table_name, full, refresh))
+        response.set_etag(etag)
+        return response
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 
-@app.route('/api/db/tables', methods=['POST', 'OPTIONS'])
+@db_api.route('/tables', methods=['POST', 'OPTIONS'])
 def db_create_table():
     """Create a new table."""
     # Handle preflight OPTIONS request
     if request.method == 'OPTIONS':
         return jsonify({}), 200
     
-    # Debug logging
-    print(f"Received {request.method} request to /api/db/tables")
-    print(f"Headers: {dict(request.headers)}")
-    print(f"Content-Type: {request.content_type}")
-    print(f"Is JSON: {request.is_json}")
+    logger.debug("Received %s request to /api/db/tables (Content-Type: %s, is JSON: %s, headers: %s)",
+                 request.method, request.content_type, request.is_json, dict(request.headers))
     
     try:
         if not request.is_json:
@@ -112,13 +243,11 @@ def db_create_table():
         else:
             return jsonify({'error': error_msg or 'Failed to create table'}), 400
     except Exception as e:
-        import traceback
-        error_trace = traceback.format_exc()
-        print(f"Error in db_create_table: {error_trace}")
-        return jsonify({'error': f'Server error: {str(e)}'}), 500
+        logger.exception("Error in db_create_table")
+        return error_response(e, f'Server error: {str(e)}')
 
 
-@app.route('/api/db/tables/<table_name>', methods=['DELETE'])
+@db_api.route('/tables/<table_name>', methods=['DELETE'])
 def db_drop_table(table_name):
     """Drop a table."""
     try:
@@ -128,10 +257,10 @@ def db_drop_table(table_name):
         else:
             return jsonify({'error': 'Failed to drop table'}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 
-@app.route('/api/db/tables/<table_name>/columns', methods=['POST'])
+@db_api.route('/tables/<table_name>/columns', methods=['POST'])
 def db_add_column(table_name):
     """Add a column to a table."""
     try:
@@ -149,28 +278,132 @@ def db_add_column(table_name):
         else:
             return jsonify({'error': 'Failed to add column'}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
+
+
+@db_api.route('/tables/<table_name>/indexes', methods=['GET'])
+def db_list_indexes(table_name):
+    """List the indexes of a table with their sizes."""
+    try:
+        return jsonify({'indexes': list_indexes(table_name)})
+    except Exception as e:
+        return error_response(e)
+
+
+@db_api.route('/tables/<table_name>/indexes', methods=['POST'])
+def db_create_index(table_name):
+    """Create an index on a table."""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'Request body is required'}), 400
+        
+        columns = data.get('columns')
+        if isinstance(columns, str):
+            columns = [columns]
+        
+        success, error_msg = create_index(table_name, columns, data.get('name') or None,
+                                          bool(data.get('unique', False)), bool(data.get('concurrently', False)))
+        if success:
+            return jsonify({'success': True, 'message': f'Index on {table_name} created'})
+        else:
+            return jsonify({'error': error_msg or 'Failed to create index'}), 400
+    except Exception as e:
+        return error_response(e)
+
+
+@db_api.route('/tables/<table_name>/indexes/<index_name>', methods=['DELETE'])
+def db_drop_index(table_name, index_name):
+    """Drop an index of a table."""
+    try:
+        concurrently = request.args.get('concurrently') == 'true'
+        success, error_msg = drop_index(table_name, index_name, concurrently)
+        if success:
+            return jsonify({'success': True, 'message': f'Index {index_name} dropped'})
+        else:
+            return jsonify({'error': error_msg or 'Failed to drop index'}), 400
+    except Exception as e:
+        return error_response(e)
+
+
+@db_api.route('/indexes/advice', methods=['GET'])
+def db_index_advice():
+    """Recommend indexes for the filters and sorts of recent queries."""
+    try:
+        min_queries = request.args.get('min_queries', 1, type=int)
+        return jsonify(get_index_advice(min_queries))
+    except Exception as e:
+        return error_response(e)
+
+
+@db_api.route('/indexes/advice', methods=['DELETE'])
+def db_clear_index_advice():
+    """Forget the queries the index advisor has seen."""
+    try:
+        clear_index_advice()
+        return jsonify({'success': True, 'message': 'Index advisor reset'})
+    except Exception as e:
+        return error_response(e)
 
 
-@app.route('/api/db/tables/<table_name>/data', methods=['GET'])
+@db_api.route('/tables/<table_name>/data', methods=['GET'])
 def db_get_data(table_name):
     """Get data from a table."""
     try:
         limit = request.args.get('limit', 100, type=int)
         offset = request.args.get('offset', 0, type=int)
+        after = request.args.get('after') or None
+        sort_column = request.args.get('sort_column') or None
+        keyset = request.args.get('pagination') == 'keyset'
+        count_strategy = request.args.get('count') or None
+        row_format = request.args.get('format', 'records')
+        order_by = request.args.get('order_by') or None
+        search = request.args.get('search') or None
+        where = request.args.get('where') or None
+        if where is not None:
+            try:
+                where = json.loads(where)
+            except ValueError:
+                return jsonify({'error': 'where must be JSON'}), 400
+        stream_format = request.args.get('stream')
+        
+        if stream_format:
+            if stream_format not in STREAM_FORMATS:
+                return jsonify({'error': f'stream must be one of: {", ".join(STREAM_FORMATS)}'}), 400
+            batch_size = request.args.get('batch_size', type=int)
+            # Streams the whole table unless a limit is given; no COUNT(*) is run.
+            stream_limit = request.args.get('limit', type=int)
+            batches = stream_table_data(table_name, stream_limit, offset, batch_size)
+            return stream_response(batches, stream_format, {'offset': offset})
+        
+        if row_format not in ROW_FORMATS:
+            return jsonify({'error': f'format must be one of: {", ".join(ROW_FORMATS)}'}), 400
         
-        rows, total = get_table_data(table_name, limit, offset)
-        return jsonify({
+        # Taken before reading, so a write racing with the read only makes it stale sooner.
+        etag = resource_etag(table_name)
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+        
+        rows, total, page = get_table_data(table_name, limit, offset, after, sort_column, keyset,
+                                           count_strategy, row_format, where, order_by, search)
+        response = {
             'data': rows,
             'total': total,
             'limit': limit,
             'offset': offset
-        })
+        }
+        response.update(page)
+        response = jsonify(response)
+        response.set_etag(etag)
+        return response
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 
-@app.route('/api/db/tables/<table_name>/rows', methods=['POST'])
+@db_api.route('/tables/<table_name>/rows', methods=['POST'])
 def db_insert_row(table_name):
     """Insert a row into a table."""
     try:
@@ -181,10 +414,84 @@ def db_insert_row(table_name):
         else:
             return jsonify({'error': 'Failed to insert row'}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
+
 
+@db_api.route('/tables/<table_name>/rows/batch', methods=['POST'])
+def db_insert_rows(table_name):
+    """Insert many rows into a table in one transaction."""
+    try:
+        data = request.get_json()
+        atomic = False
+        if isinstance(data, dict):
+            atomic = bool(data.get('atomic', False))
+            data = data.get('rows')
+        if not isinstance(data, list) or not data:
+            return jsonify({'error': 'A non-empty array of rows is required'}), 400
+        
+        result = insert_rows(table_name, data, atomic)
+        result['success'] = not result['failed']
+        return jsonify(result), 200 if result['committed'] else 400
+    except Exception as e:
+        return error_response(e)
+
+
+@db_api.route('/tables/<table_name>/import', methods=['POST'])
+def db_import_table(table_name):
+    """Stream a CSV or NDJSON body into a table."""
+    try:
+        import_format = request.args.get('format')
+        if not import_format:
+            import_format = 'ndjson' if 'json' in (request.content_type or '') else 'csv'
+        create = request.args.get('create', 'false').lower() == 'true'
+        infer_types = request.args.get('infer_types', 'false').lower() == 'true'
+        chunk_size = request.args.get('chunk_size', type=int)
+        
+        try:
+            if import_format == 'csv':
+                columns, rows = read_csv(request.stream)
+            elif import_format == 'ndjson':
+                columns, rows = read_ndjson(request.stream, IMPORT_SAMPLE_ROWS)
+            else:
+                return jsonify({'error': 'format must be csv or ndjson'}), 400
+            result = import_rows(table_name, columns, rows, create, infer_types, chunk_size)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        result['success'] = 'error' not in result
+        return jsonify(result), 200 if result['success'] else 400
+    except Exception as e:
+        return error_response(e)
 
-@app.route('/api/db/tables/<table_name>/rows/<int:row_id>', methods=['PUT'])
+
+@db_api.route('/tables/<table_name>/export', methods=['GET'])
+def db_export_table(table_name):
+    """Stream a whole table as CSV or NDJSON, optionally gzipped."""
+    try:
+        export_format = request.args.get('format', 'csv')
+        compress = request.args.get('compress')
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': f'format must be one of: {", ".join(EXPORT_FORMATS)}'}), 400
+        if compress not in (None, 'gzip'):
+            return jsonify({'error': 'compress must be gzip'}), 400
+        if table_name not in get_tables():
+            return jsonify({'error': f'Table {table_name} not found'}), 404
+        
+        # Pull the first chunk now so errors still get a proper status code.
+        chunks = PrimedIterator(export_table(table_name, export_format))
+        filename = f'{table_name}.{export_format}'
+        mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+        if compress == 'gzip':
+            chunks = gzip_stream(chunks)
+            filename += '.gz'
+            mimetype = 'application/gzip'
+        response = Response(chunks, mimetype=mimetype)
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    except Exception as e:
+        return error_response(e)
+
+
+@db_api.route('/tables/<table_name>/rows/<int:row_id>', methods=['PUT'])
 def db_update_row(table_name, row_id):
     """Update a row in a table."""
     try:
@@ -199,10 +506,10 @@ def db_update_row(table_name, row_id):
         else:
             return jsonify({'error': 'Failed to update row'}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 
-@app.route('/api/db/tables/<table_name>/rows/<int:row_id>', methods=['DELETE'])
+@db_api.route('/tables/<table_name>/rows/<int:row_id>', methods=['DELETE'])
 def db_delete_row(table_name, row_id):
     """Delete a row from a table."""
     try:
@@ -213,10 +520,26 @@ def db_delete_row(table_name, row_id):
         else:
             return jsonify({'error': 'Failed to delete row'}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 
-@app.route('/api/db/query', methods=['POST'])
+@db_api.route('/transaction', methods=['POST'])
+def db_execute_transaction():
+    """Run a list of insert/update/delete operations in one transaction."""
+    try:
+        data = request.get_json()
+        operations = data.get('operations') if isinstance(data, dict) else data
+        if not isinstance(operations, list) or not operations:
+            return jsonify({'error': 'A non-empty array of operations is required'}), 400
+        
+        result = execute_transaction(operations)
+        result['success'] = result['committed']
+        return jsonify(result), 200 if result['committed'] else 400
+    except Exception as e:
+        return error_response(e)
+
+
+@db_api.route('/query', methods=['POST'])
 def db_execute_query():
     """Execute a SELECT query."""
     try:
@@ -226,16 +549,133 @@ def db_execute_query():
         if not query:
             return jsonify({'error': 'Query is required'}), 400
         
-        rows, error = execute_query(query)
+        stream_format = data.get('stream')
+        if stream_format:
+            if stream_format not in STREAM_FORMATS:
+                return jsonify({'error': f'stream must be one of: {", ".join(STREAM_FORMATS)}'}), 400
+            try:
+                return stream_response(stream_query(query, data.get('batch_size')), stream_format)
+            except Exception as e:
+                return jsonify({'error': str(e)}), 400
+        
+        try:
+            timeout = float(data['timeout']) if data.get('timeout') is not None else None
+            max_rows = int(data['max_rows']) if data.get('max_rows') is not None else None
+            max_bytes = int(data['max_bytes']) if data.get('max_bytes') is not None else None
+            rows, error, info = execute_query(query, data.get('cache', True) is not False,
+                                              timeout, max_rows, max_bytes, data.get('query_id'),
+                                              data.get('format', 'records'))
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+        if error:
+            return jsonify({'error': error, 'query_id': info['query_id']}), 400
+        
+        return jsonify({'data': rows, **info})
+    except Exception as e:
+        return error_response(e)
+
+
+@db_api.route('/query/explain', methods=['POST'])
+def db_explain_query():
+    """Get the query plan of a SELECT query."""
+    try:
+        data = request.get_json()
+        query = data.get('query', '')
+        
+        if not query:
+            return jsonify({'error': 'Query is required'}), 400
+        
+        plan, error = explain_query(query, bool(data.get('analyze', False)))
         if error:
             return jsonify({'error': error}), 400
         
-        return jsonify({'data': rows})
+        return jsonify(plan)
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
+
+
+@db_api.route('/query/slow', methods=['GET'])
+def db_slow_queries():
+    """Get recent slow statements, newest first."""
+    try:
+        return jsonify(get_slow_queries(request.args.get('limit', type=int)))
+    except Exception as e:
+        return error_response(e)
+
+
+@db_api.route('/query/slow', methods=['DELETE'])
+def db_clear_slow_queries():
+    """Empty the slow-query log."""
+    try:
+        clear_slow_queries()
+        return jsonify({'success': True, 'message': 'Slow-query log cleared'})
+    except Exception as e:
+        return error_response(e)
+
+
+@db_api.route('/query/running', methods=['GET'])
+def db_running_queries():
+    """List queries currently running."""
+    try:
+        return jsonify({'queries': get_running_queries()})
+    except Exception as e:
+        return error_response(e)
+
+
+@db_api.route('/query/<query_id>/cancel', methods=['POST'])
+def db_cancel_query(query_id):
+    """Cancel a running query."""
+    try:
+        if cancel_query(query_id):
+            return jsonify({'success': True, 'message': f"Query '{query_id}' cancelled"})
+        return jsonify({'error': f"No running query with id '{query_id}'"}), 404
+    except Exception as e:
+        return error_response(e)
+
+
+@db_api.route('/query/cache', methods=['GET'])
+def db_query_cache_stats():
+    """Get query result cache statistics."""
+    try:
+        return jsonify({'cache': get_query_cache_stats()})
+    except Exception as e:
+        return error_response(e)
+
+
+@db_api.route('/query/cache', methods=['DELETE'])
+def db_clear_query_cache():
+    """Drop all cached query results."""
+    try:
+        clear_query_cache()
+        return jsonify({'success': True, 'message': 'Query cache cleared'})
+    except Exception as e:
+        return error_response(e)
+
+
+@db_api.route('/pool', methods=['GET'])
+def db_pool_stats():
+    """Get connection pool statistics."""
+    try:
+        return jsonify({'pool': get_pool_stats(), 'executor': get_executor_stats()})
+    except Exception as e:
+        return error_response(e)
+
+
+@app.route('/api/db/connections', methods=['GET'])
+def db_list_connections():
+    """List the configured database connections and which of them are open."""
+    try:
+        return jsonify(list_connections())
+    except Exception as e:
+        return error_response(e)
+
+
+app.register_blueprint(db_api, url_prefix='/api/db')
+app.register_blueprint(db_api, url_prefix='/api/db/<conn>', name='db_conn')
 
 
 if __name__ == '__main__':
+    logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO').upper())
     port = int(os.getenv('PORT', 5000))
     debug = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
     host = os.getenv('FLASK_HOST', '0.0.0.0')
@@ -0,0 +1,285 @@
+"""
+Per-column statistics gathered in a single pass over a table's rows.
+
+Every column keeps running aggregates whose memory doesn't grow with the
+table: null count, min/max, a k-minimum-values sketch of the number of
+distinct values, a pruned counter of the most common values and a reservoir
+sample of its numbers for the histogram. Rows can be added after the scan,
+which is how inserted rows are folded into cached statistics.
+"""
+import heapq
+import json
+import random
+import time
+from collections import Counter
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+_MASK = (1 << 64) - 1
+# Text values longer than this aren't counted as candidate common values
+_MAX_TOP_LENGTH = 256
+
+
+class DistinctSketch:
+    """K-minimum-values estimate of the number of distinct values; exact below ``k`` of them."""
+
+    def __init__(self, k: int = 1024):
+        self.k = k
+        # Negated, so the largest kept hash is on top of the heap
+        self._heap: List[int] = []
+        self._kept = set()
+
+    def update(self, values: Iterable[Any]):
+        heap, kept, k = self._heap, self._kept, self.k
+        for value in values:
+            # Python hashes small ints to themselves; mix them over 64 bits (splitmix64).
+            h = ((value if type(value) is int else hash(value)) + 0x9E3779B97F4A7C15) & _MASK
+            h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+            h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & _MASK
+            h ^= h >> 31
+            if len(heap) < k:
+                if h not in kept:
+                    heapq.heappush(heap, -h)
+                    kept.add(h)
+            elif h < -heap[0] and h not in kept:
+                kept.discard(-heapq.heapreplace(heap, -h))
+                kept.add(h)
+
+    def estimate(self) -> int:
+        if len(self._heap) < self.k:
+            return len(self._heap)
+        return int((self.k - 1) * (_MASK + 1) / (-self._heap[0] or 1))
+
+
+class TopValues:
+    """
+    Counts of the most common values.
+
+    Up to ``2 * size`` values are counted; beyond that only the ``size``
+    most common are kept. Counts are exact for columns with few distinct
+    values and approximate (low) otherwise.
+    """
+
+    def __init__(self, size: int = 64):
+        self.size = size
+        self._counts: Dict[Any, int] = {}
+
+    def update(self, values: Iterable[Any]):
+        counts = self._counts
+        for value, count in Counter(values).items():
+            counts[value] = counts.get(value, 0) + count
+        if len(counts) > 2 * self.size:
+            self._counts = dict(heapq.nlargest(self.size, counts.items(), key=lambda item: item[1]))
+
+    def most_common(self, n: int) -> List[Tuple[Any, int]]:
+        return heapq.nlargest(n, self._counts.items(), key=lambda item: item[1])
+
+
+def _order_key(value: Any) -> Tuple[int, Any]:
+    """Sort key across types, in SQLite's order: numbers, then text, then anything else."""
+    if isinstance(value, (int, float, Decimal)):
+        return 0, value
+    if isinstance(value, str):
+        return 1, value
+    return 2, value
+
+
+class ColumnStats:
+    """Running statistics of one column, fed a batch of its values at a time."""
+
+    def __init__(self, name: str, column_type: str = '', top_size: int = 64,
+                 sample_size: int = 1000, sketch_size: int = 1024):
+        self.name = name
+        self.type = column_type
+        self.count = 0
+        self.nulls = 0
+        self.min: Any = None
+        self.max: Any = None
+        self._min_key: Optional[Tuple[int, Any]] = None
+        self._max_key: Optional[Tuple[int, Any]] = None
+        # Numbers (not booleans): count, sum, range and a reservoir sample for the histogram
+        self.numbers = 0
+        self.total = 0.0
+        self.low: Optional[float] = None
+        self.high: Optional[float] = None
+        self.sample: List[float] = []
+        self.sample_size = sample_size
+        # Total length of text and binary values, and how many there were
+        self.length = 0
+        self.sized = 0
+        self.distinct = DistinctSketch(sketch_size)
+        self.top = TopValues(top_size)
+        self._random = random.Random()
+
+    def add_values(self, values: Sequence[Any]):
+        self.count += len(values)
+        # Split by type so the common cases run through builtins over whole lists.
+        numbers: List[Any] = []
+        texts: List[str] = []
+        others: List[Any] = []
+        for value in values:
+            if value is None:
+                continue
+            kind = type(value)
+            if kind is int or kind is float:
+                numbers.append(value)
+            elif kind is str:
+                texts.append(value)
+            else:
+                others.append(value)
+        self.nulls += len(values) - len(numbers) - len(texts) - len(others)
+        if numbers:
+            self.distinct.update(numbers)
+            self.top.update(numbers)
+            self._add_numbers(numbers)
+        if texts:
+            self.distinct.update(texts)
+            self.length += sum(map(len, texts))
+            self.sized += len(texts)
+            self.top.update(text for text in texts if len(text) <= _MAX_TOP_LENGTH)
+            self._add_bound(min(texts))
+            self._add_bound(max(texts))
+        for value in others:
+            self._add_other(value)
+
+    def _add_other(self, value: Any):
+        if isinstance(value, memoryview):
+            value = value.tobytes()
+        elif isinstance(value, (dict, list)):
+            value = json.dumps(value, sort_keys=True, default=str)
+        self.distinct.update((value,))
+        if isinstance(value, (bytes, str)):
+            self.length += len(value)
+            self.sized += 1
+            if isinstance(value, bytes):
+                return
+        self.top.update((value,))
+        if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+            self._add_numbers([float(value)])
+        else:
+            self._add_bound(value)
+
+    def _add_numbers(self, numbers: List[Any]):
+        numbers = [number for number in numbers if number == number]  # drop NaN
+        if not numbers:
+            return
+        low, high = min(numbers), max(numbers)
+        self._add_bound(low)
+        self._add_bound(high)
+        if self.low is None or low < self.low:
+            self.low = float(low)
+        if self.high is None or high > self.high:
+            self.high = float(high)
+        self.total += sum(numbers)
+        seen = self.numbers
+        self.numbers += len(numbers)
+        sample, size = self.sample, self.sample_size
+        room = size - len(sample)
+        if room > 0:
+            sample.extend(numbers[:room])
+            seen += len(numbers[:room])
+            numbers = numbers[room:]
+        draw = self._random.random
+        for number in numbers:
+            seen += 1
+            if draw() * seen < size:
+                sample[int(draw() * size)] = number
+
+    def _add_bound(self, value: Any):
+        key = _order_key(value)
+        try:
+            if self._min_key is None or key < self._min_key:
+                self.min, self._min_key = value, key
+            if self._max_key is None or key > self._max_key:
+                self.max, self._max_key = value, key
+        except TypeError:
+            # Values that don't compare with the rest (e.g. dates next to datetimes)
+            pass
+
+    def histogram(self, buckets: int = 10, scale: float = 1.0) -> Optional[List[Dict[str, Any]]]:
+        """Equal-width buckets over the numeric range, with counts extrapolated from the reservoir sample."""
+        if not self.sample:
+            return None
+        low, high = self.low, self.high
+        if low == high:
+            return [{'lower': low, 'upper': high, 'count': round(self.numbers * scale)}]
+        width = (high - low) / buckets
+        counts = [0] * buckets
+        for number in self.sample:
+            counts[min(int((number - low) / width), buckets - 1)] += 1
+        factor = self.numbers * scale / len(self.sample)
+        return [{'lower': low + i * width, 'upper': low + (i + 1) * width if i < buckets - 1 else high,
+                 'count': round(count * factor)}
+                for i, count in enumerate(counts)]
+
+    def summary(self, scale: float = 1.0, top_values: int = 10, buckets: int = 10) -> Dict[str, Any]:
+        """
+        Summarize the column; counts are multiplied by ``scale`` when the
+        rows seen were a sample of the table.
+        """
+        non_null = self.count - self.nulls
+        distinct = self.distinct.estimate()
+        if scale > 1 and distinct >= 0.9 * non_null:
+            # Nearly every sampled value differs: assume that holds for the whole table.
+            distinct = round(distinct * scale)
+        return {
+            'name': self.name,
+            'type': self.type,
+            'null_count': round(self.nulls * scale),
+            'null_fraction': round(self.nulls / self.count, 4) if self.count else 0.0,
+            'distinct': distinct,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.total / self.numbers if self.numbers else None,
+            'avg_length': round(self.length / self.sized, 2) if self.sized else None,
+            # Values seen once aren't "common"
+            'top_values': [{'value': value, 'count': round(count * scale)}
+                           for value, count in self.top.most_common(top_values) if count > 1],
+            'histogram': self.histogram(buckets, scale),
+        }
+
+
+class TableStats:
+    """
+    Statistics of every column of a table.
+
+    ``total`` is set when the rows added were a sample: it is the estimated
+    number of rows in the table, and counts are extrapolated to it.
+    """
+
+    def __init__(self, columns: Sequence[Tuple[str, str]], **options: Any):
+        self.columns = [ColumnStats(name, column_type, **options) for name, column_type in columns]
+        self.rows = 0
+        self.total: Optional[int] = None
+        # Rows written since the statistics were gathered
+        self.changes = 0
+        self.computed_at = time.time()
+        self.loaded_at = time.monotonic()
+        self.duration = 0.0
+
+    @property
+    def sampled(self) -> bool:
+        return self.total is not None
+
+    @property
+    def row_count(self) -> int:
+        return self.total if self.sampled else self.rows
+
+    def add_rows(self, rows: Sequence[Sequence[Any]]):
+        if not rows:
+            return
+        self.rows += len(rows)
+        for column, values in zip(self.columns, zip(*rows)):
+            column.add_values(values)
+
+    def summary(self) -> Dict[str, Any]:
+        scale = self.total / self.rows if self.sampled and self.rows else 1.0
+        return {
+            'row_count': self.row_count,
+            'sampled': self.sampled,
+            'scanned_rows': self.rows,
+            'computed_at': self.computed_at,
+            'duration_ms': round(self.duration * 1000, 3),
+            'changes': self.changes,
+            'columns': [column.summary(scale) for column in self.columns],
+        }
@@ -0,0 +1,109 @@
+"""
+Content-Encoding negotiation for API responses.
+
+Responses are compressed with brotli (when the ``brotli`` package is
+installed) or gzip, whichever the client prefers in ``Accept-Encoding``.
+Small bodies are sent as they are; streamed bodies are compressed chunk by
+chunk and flushed after each one, so they still arrive incrementally.
+"""
+import os
+import zlib
+from typing import Any, Iterable, Iterator, List, Optional
+
+from streaming import _close, gzip_stream
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+# Compress responses the client accepts compressed
+COMPRESSION_ENABLED = os.getenv('COMPRESSION', 'true').lower() == 'true'
+# Bodies smaller than this many bytes are sent uncompressed
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+# zlib level for gzip (1-9) and quality for brotli (0-11)
+COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', '6'))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '4'))
+
+COMPRESSIBLE_TYPES = (
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'application/xml',
+)
+
+
+def available_encodings() -> List[str]:
+    """Encodings this process can produce, most preferred first."""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def is_compressible(mimetype: Optional[str]) -> bool:
+    return bool(mimetype) and (mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES)
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=COMPRESSION_BROTLI_QUALITY)
+    return zlib.compress(data, COMPRESSION_GZIP_LEVEL, wbits=31)
+
+
+def brotli_stream(chunks: Iterable[Any], quality: int = COMPRESSION_BROTLI_QUALITY) -> Iterator[bytes]:
+    """Brotli-compress a stream of str/bytes chunks, flushing after each one."""
+    compressor = brotli.Compressor(quality=quality)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            compressed = compressor.process(chunk) + compressor.flush()
+            if compressed:
+                yield compressed
+        yield compressor.finish()
+    finally:
+        _close(chunks)
+
+
+def compress_stream(chunks: Iterable[Any], encoding: str) -> Iterator[bytes]:
+    if encoding == 'br':
+        return brotli_stream(chunks)
+    return gzip_stream(chunks, COMPRESSION_GZIP_LEVEL, flush=True)
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """The ETag of a representation compressed with ``encoding``; strong ETags must differ per encoding."""
+    return f'{etag}-{encoding}'
+
+
+def install(app):
+    """Compress the responses of a Flask app according to ``Accept-Encoding``."""
+    from flask import request
+
+    @app.after_request
+    def _compress_response(response):
+        if (not COMPRESSION_ENABLED
+                or response.status_code < 200 or response.status_code in (204, 304)
+                or request.method == 'HEAD'
+                or 'Content-Encoding' in response.headers
+                or response.direct_passthrough
+                or not is_compressible(response.mimetype)):
+            return response
+        # The body depends on Accept-Encoding even when it ends up uncompressed.
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(available_encodings())
+        if encoding is None:
+            return response
+        if response.is_streamed:
+            response.response = compress_stream(response.response, encoding)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < COMPRESSION_MIN_SIZE:
+                return response
+            response.set_data(compress(data, encoding))
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(encoded_etag(etag, encoding), weak)
+        return response
+
+    return app
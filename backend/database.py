@@ -1,35 +1,528 @@
 """
 Database management module supporting both SQLite and PostgreSQL.
 """
+import base64
+import importlib
+import io
+import itertools
+import json
+import logging
 import os
-from typing import List, Dict, Any, Optional, Tuple
+import queue
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from typing import List, Dict, Any, FrozenSet, Iterator, Optional, Tuple
 from abc import ABC, abstractmethod
 
+from executor import BoundedExecutor
+from metrics import METRICS_ENABLED, instrument_adapter
+from pool import ConnectionPool
+from column_stats import TableStats
+from index_advisor import IndexAdvisor, Pattern, index_pattern, query_predicates
+from query_cache import QueryResultCache, estimate_row_size, estimate_size, normalize_sql, referenced_tables
+from readiness import ReadinessProbe
+from replicas import ReplicaSet
+from registry import ConnectionRegistry, UnknownConnection, parse_connections, parse_url
+from slow_log import SlowQueryLog
+from streaming import csv_stream, ndjson_stream
+from write_coalescer import WriteCoalescer
+
+logger = logging.getLogger(__name__)
+
 # Determine database type
 DATABASE_TYPE = os.getenv('DATABASE_TYPE', 'sqlite').lower()
+USE_POSTGRESQL = DATABASE_TYPE == 'postgresql'
+DB_PATH = os.getenv('DATABASE_PATH', 'dashtools.db')
+
+# psycopg2 is imported by the first PostgreSQL adapter (see _import_psycopg2),
+# so importing this module doesn't pay for a driver it may never use.
+psycopg2 = None
+RealDictCursor = None
+execute_values = None
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+# Row layouts for table data and query results: one dict per row, one array per
+# row, or one array per column (the last two list the column names once)
+ROW_FORMATS = ('records', 'columnar', 'columns')
+TRANSACTION_OPS = ('insert', 'update', 'delete')
+
+# Column types accepted by create_table, and their PostgreSQL equivalents
+COLUMN_TYPES = ['TEXT', 'INTEGER', 'REAL', 'BLOB', 'NUMERIC']
+POSTGRES_TYPE_MAP = {
+    'TEXT': 'TEXT',
+    'INTEGER': 'INTEGER',
+    'REAL': 'REAL',
+    'BLOB': 'BYTEA',
+    'NUMERIC': 'NUMERIC'
+}
+
+# How get_table_data computes ``total``: exact, cached or estimated
+COUNT_STRATEGIES = ('exact', 'cached', 'estimated')
+DEFAULT_COUNT_STRATEGY = os.getenv('DB_COUNT_STRATEGY', 'exact').lower()
+# Seconds a cached row count is trusted, to pick up writes made outside this process (0 = forever)
+COUNT_CACHE_TTL = float(os.getenv('DB_COUNT_CACHE_TTL', '60'))
+# Rows fetched per round trip when streaming results
+STREAM_BATCH_SIZE = int(os.getenv('DB_STREAM_BATCH_SIZE', '1000'))
+# Rows sent to the database per statement by batch inserts
+BATCH_CHUNK_SIZE = int(os.getenv('DB_BATCH_CHUNK_SIZE', '1000'))
+# Rows committed per transaction by bulk imports, and rows sampled to infer column types
+IMPORT_CHUNK_SIZE = int(os.getenv('DB_IMPORT_CHUNK_SIZE', '10000'))
+IMPORT_SAMPLE_ROWS = int(os.getenv('DB_IMPORT_SAMPLE_ROWS', '1000'))
+# Memory budget of the execute_query result cache (0 disables it) and its TTL in seconds
+QUERY_CACHE_BYTES = int(os.getenv('DB_QUERY_CACHE_BYTES', '0'))
+QUERY_CACHE_TTL = float(os.getenv('DB_QUERY_CACHE_TTL', '60'))
+# Server-wide ceilings on execute_query: seconds, rows and approximate result bytes (0 = unlimited)
+QUERY_TIMEOUT = float(os.getenv('DB_QUERY_TIMEOUT', '0'))
+QUERY_MAX_ROWS = int(os.getenv('DB_QUERY_MAX_ROWS', '0'))
+QUERY_MAX_BYTES = int(os.getenv('DB_QUERY_MAX_BYTES', '0'))
+# Statements at least this many milliseconds long go to the slow-query log, which keeps the last N (0 disables it)
+SLOW_QUERY_MS = float(os.getenv('DB_SLOW_QUERY_MS', '500'))
+SLOW_QUERY_LOG_SIZE = int(os.getenv('DB_SLOW_QUERY_LOG_SIZE', '100'))
+# Filter/sort shapes of recent queries the index advisor keeps (0, the default, disables it:
+# it looks up the schema of every table a raw query reads)
+INDEX_ADVISOR_SIZE = int(os.getenv('DB_INDEX_ADVISOR_SIZE', '0'))
+# Tables with more rows than this are profiled from a sample of about this many rows (0 = always scan)
+STATS_SAMPLE_ROWS = int(os.getenv('DB_STATS_SAMPLE_ROWS', '100000'))
+# Seconds cached column statistics are trusted, to pick up writes made outside this process (0 = forever)
+STATS_TTL = float(os.getenv('DB_STATS_TTL', '600'))
+# Share of a sampled table's rows that may change through this process before its statistics are recomputed
+STATS_STALE_FRACTION = float(os.getenv('DB_STATS_STALE_FRACTION', '0.1'))
+# Run adapter calls made through this module on a bounded per-adapter thread pool,
+# with this many workers (0 = one per pooled connection, or per CPU for SQLite) and queued calls
+USE_EXECUTOR = os.getenv('DB_EXECUTOR', 'false').lower() == 'true'
+EXECUTOR_WORKERS = int(os.getenv('DB_EXECUTOR_WORKERS', '0'))
+EXECUTOR_QUEUE = int(os.getenv('DB_EXECUTOR_QUEUE', '100'))
+# Seconds cached table lists and schemas are trusted, to pick up DDL made outside this process (0 = forever)
+METADATA_CACHE_TTL = float(os.getenv('DB_METADATA_TTL', '30'))
+# Seconds a change token (and so an HTTP ETag) stays valid without a write through this
+# process, to pick up writes made by other processes (0 = until this process writes)
+CHANGE_TOKEN_TTL = float(os.getenv('DB_ETAG_TTL', '5'))
+# Seconds a readiness check result is reused, and the longest /api/ready waits for a check in flight
+READY_INTERVAL = float(os.getenv('DB_READY_INTERVAL', '5'))
+READY_TIMEOUT = float(os.getenv('DB_READY_TIMEOUT', '1'))
+# Named connections, served under /api/db/<name>/: name=url pairs separated by ';' (or a JSON
+# object of name -> url or {"url": ..., options}), the same as a JSON file, and a directory
+# whose <name>.db SQLite files are connections too
+DB_CONNECTIONS = os.getenv('DB_CONNECTIONS', '')
+DB_CONNECTIONS_FILE = os.getenv('DB_CONNECTIONS_FILE', '')
+DB_SQLITE_DIR = os.getenv('DB_SQLITE_DIR', '')
+# Seconds a named connection may go unused before it is closed (0 = never),
+# and how many may be open at once, least recently used closed first (0 = no limit)
+CONNECTION_IDLE_TIMEOUT = float(os.getenv('DB_CONNECTION_IDLE_TIMEOUT', '300'))
+MAX_OPEN_CONNECTIONS = int(os.getenv('DB_MAX_OPEN_CONNECTIONS', '100'))
+
+
+def _import_psycopg2():
+    """Import psycopg2 into this module's namespace (``psycopg2`` is bound last, once all of it is there)."""
+    global psycopg2, RealDictCursor, execute_values
+    if psycopg2 is None:
+        importlib.import_module('psycopg2.extensions')
+        extras = importlib.import_module('psycopg2.extras')
+        RealDictCursor, execute_values = extras.RealDictCursor, extras.execute_values
+        psycopg2 = importlib.import_module('psycopg2')
+
+
+def is_select_query(query: str) -> bool:
+    """Return True if the query is a SELECT (the only kind run through the query API)."""
+    return query.strip().upper().startswith('SELECT')
+
+
+def check_row_format(row_format: str) -> bool:
+    """Validate a ``ROW_FORMATS`` name; True if rows are returned as tuples rather than dicts."""
+    if row_format not in ROW_FORMATS:
+        raise ValueError(f'format must be one of: {", ".join(ROW_FORMATS)}')
+    return row_format != 'records'
+
+
+def layout_rows(columns: List[str], rows: List[tuple], row_format: str) -> List[Any]:
+    """Lay out tuple rows as arrays per row ('columnar') or per column ('columns')."""
+    if row_format == 'columns':
+        if not rows:
+            return [[] for _ in columns]
+        return [list(values) for values in zip(*rows)]
+    return rows
+
+
+def effective_limit(requested: Optional[float], ceiling: float) -> Optional[float]:
+    """
+    Combine a per-request limit with the server-wide one.
+    
+    A request may tighten the server limit but never lift it; 0 or None
+    means unlimited. Returns None when neither side sets a limit.
+    """
+    if requested is not None and requested < 0:
+        raise ValueError('Query limits must not be negative')
+    limits = [limit for limit in (requested, ceiling) if limit]
+    return min(limits) if limits else None
+
+
+def infer_column_type(values: List[Any]) -> str:
+    """
+    Pick the narrowest ``COLUMN_TYPES`` entry that fits every sampled value.
+    
+    Strings (as read from CSV) count as numbers if they parse as one; NULLs
+    are ignored and a column with nothing but NULLs is TEXT.
+    """
+    inferred = None
+    for value in values:
+        if value is None:
+            continue
+        if isinstance(value, bool) or isinstance(value, int):
+            kind = 'INTEGER'
+        elif isinstance(value, float):
+            kind = 'REAL'
+        elif isinstance(value, (bytes, bytearray)):
+            kind = 'BLOB'
+        elif isinstance(value, str):
+            text = value.strip()
+            try:
+                int(text)
+                kind = 'INTEGER'
+            except ValueError:
+                try:
+                    float(text)
+                    kind = 'REAL'
+                except ValueError:
+                    kind = 'TEXT'
+        else:
+            kind = 'TEXT'
+        if inferred is None or inferred == kind:
+            inferred = kind
+        elif {inferred, kind} == {'INTEGER', 'REAL'}:
+            inferred = 'REAL'
+        else:
+            return 'TEXT'
+    return inferred or 'TEXT'
+
+
+def quote_identifier(name: str) -> str:
+    """Quote a table or column name for use in SQL."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def encode_cursor(sort_column: Optional[str], values: List[Any]) -> str:
+    """Encode the keyset position of a row as an opaque, URL-safe cursor."""
+    payload = json.dumps({'s': sort_column, 'v': values}, default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, sort_column: Optional[str]) -> List[Any]:
+    """Decode a cursor produced by ``encode_cursor`` for the same sort column."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        values = payload['v']
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if payload.get('s') != sort_column or not isinstance(values, list):
+        raise ValueError('Cursor does not match the requested sort column')
+    return values
+
+
+# Filter operators accepted by get_table_data and their SQL; like/ilike take SQL LIKE patterns
+FILTER_OPS = {
+    'eq': '=',
+    'ne': '<>',
+    'lt': '<',
+    'lte': '<=',
+    'gt': '>',
+    'gte': '>=',
+    'like': 'LIKE',
+    'ilike': 'ILIKE',
+    'in': 'IN',
+    'is_null': 'IS NULL',
+    'not_null': 'IS NOT NULL',
+}
+# Most values an ``in`` filter may list
+MAX_IN_VALUES = 1000
+
+
+def normalize_filters(where: Any) -> List[Tuple[str, str, Any]]:
+    """
+    Validate table data filters and return them as ``(column, op, value)``.
+    
+    ``where`` is a list of ``{"column", "op", "value"}`` objects, or an
+    object mapping columns to values for plain equality. Columns are
+    checked against the table later, by the adapter.
+    """
+    if not where:
+        return []
+    if isinstance(where, dict):
+        where = [{'column': column, 'op': 'eq', 'value': value} for column, value in where.items()]
+    if not isinstance(where, list):
+        raise ValueError('where must be a list of filters or an object of column values')
+    filters = []
+    for item in where:
+        if not isinstance(item, dict) or not isinstance(item.get('column'), str):
+            raise ValueError('Each filter needs a "column"')
+        column, op, value = item['column'], item.get('op', 'eq'), item.get('value')
+        if op not in FILTER_OPS:
+            raise ValueError(f'Unknown filter op "{op}". Must be one of: {", ".join(FILTER_OPS)}')
+        if op in ('is_null', 'not_null'):
+            value = None
+        elif op == 'in':
+            if not isinstance(value, list) or not value:
+                raise ValueError(f'Filter on "{column}": in needs a non-empty list of values')
+            if len(value) > MAX_IN_VALUES:
+                raise ValueError(f'Filter on "{column}": in takes at most {MAX_IN_VALUES} values')
+            if not all(isinstance(v, (str, int, float)) for v in value):
+                raise ValueError(f'Filter on "{column}": in values must be strings or numbers')
+        elif op in ('like', 'ilike'):
+            if not isinstance(value, str):
+                raise ValueError(f'Filter on "{column}": {op} needs a string pattern')
+        elif value is None:
+            raise ValueError(f'Filter on "{column}": use is_null to match NULL')
+        elif not isinstance(value, (str, int, float)):
+            raise ValueError(f'Filter on "{column}": value must be a string or a number')
+        filters.append((column, op, value))
+    return filters
+
 
-if DATABASE_TYPE == 'postgresql':
-    import psycopg2
-    from psycopg2.extras import RealDictCursor
-    USE_POSTGRESQL = True
-else:
-    import sqlite3
-    USE_POSTGRESQL = False
+def parse_order_by(order_by: str) -> List[Tuple[str, bool]]:
+    """
+    Parse ``"col, -col2"`` or ``"col asc, col2 desc"`` into ``(column, descending)`` pairs.
+    """
+    order = []
+    for item in order_by.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        descending = False
+        if item.startswith('-'):
+            item, descending = item[1:].strip(), True
+        else:
+            name, _, direction = item.rpartition(' ')
+            if name and direction.lower() in ('asc', 'desc'):
+                item, descending = name.strip(), direction.lower() == 'desc'
+        order.append((item, descending))
+    if not order:
+        raise ValueError('order_by names no columns')
+    return order
+
+
+def escape_like(text: str) -> str:
+    """Escape LIKE wildcards so ``text`` matches literally (with ESCAPE '\\')."""
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+# Connection pools inherited across fork, never to be closed by this process
+_inherited_pools: List[Any] = []
+# Client session of the current request, so reads that follow its writes can avoid lagging replicas
+_session: ContextVar[Optional[str]] = ContextVar('db_session', default=None)
 
 
 class DatabaseAdapter(ABC):
     """Abstract base class for database adapters."""
     
+    # Placeholder style of the driver's paramstyle
+    PLACEHOLDER = '?'
+    # Pseudo-column used to order tables that have no primary key
+    ROWID_COLUMN = 'rowid'
+    ROWID_PLACEHOLDER = '?'
+    # LIMIT value meaning "no limit", needed to use OFFSET on its own
+    NO_LIMIT = '-1'
+    # Case-insensitive LIKE; SQLite's own LIKE already ignores ASCII case
+    ILIKE = 'LIKE'
+    
+    def __init__(self):
+        self.stream_batch_size = STREAM_BATCH_SIZE
+        self.batch_chunk_size = BATCH_CHUNK_SIZE
+        self.import_chunk_size = IMPORT_CHUNK_SIZE
+        self.query_cache = QueryResultCache(QUERY_CACHE_BYTES, QUERY_CACHE_TTL)
+        self.count_strategy = DEFAULT_COUNT_STRATEGY
+        self.count_cache_ttl = COUNT_CACHE_TTL
+        self._state_lock = threading.Lock()
+        # Bumped on every write or DDL this process makes to a table
+        self._table_versions: Dict[str, int] = {}
+        # table -> (row count, version it was counted at, monotonic time)
+        self._row_counts: Dict[str, Tuple[int, int, float]] = {}
+        self.metadata_cache_ttl = METADATA_CACHE_TTL
+        # Bumped on every DDL; table list and schemas loaded under an older one are stale
+        self._catalog_version = 0
+        # key -> (value, schema stamp, monotonic time); key is None for the table list,
+        # the table name for its columns and ('indexes', table name) for its indexes
+        self._metadata: Dict[Any, Tuple[Any, Any, float]] = {}
+        self.query_timeout = QUERY_TIMEOUT
+        self.query_max_rows = QUERY_MAX_ROWS
+        self.query_max_bytes = QUERY_MAX_BYTES
+        # query id -> handle of an execute_query call in flight
+        self._running_queries: Dict[str, Dict[str, Any]] = {}
+        self.slow_log = SlowQueryLog(SLOW_QUERY_MS, SLOW_QUERY_LOG_SIZE)
+        self.index_advisor = IndexAdvisor(INDEX_ADVISOR_SIZE)
+        self.stats_sample_rows = STATS_SAMPLE_ROWS
+        self.stats_ttl = STATS_TTL
+        self.stats_stale_fraction = STATS_STALE_FRACTION
+        self._stats_lock = threading.Lock()
+        # table -> column statistics, and the lock held while they are computed
+        self._column_stats: Dict[str, TableStats] = {}
+        self._stats_loading: Dict[str, threading.Lock] = {}
+        self.use_executor = USE_EXECUTOR
+        self.executor_workers = EXECUTOR_WORKERS
+        self.executor_queue = EXECUTOR_QUEUE
+        self._executor: Optional[BoundedExecutor] = None
+        self._executor_lock = threading.Lock()
+        self.change_token_ttl = CHANGE_TOKEN_TTL
+        # Distinguishes this process's table versions from another's (or an earlier run's)
+        self._instance_token = uuid.uuid4().hex
+    
+    def _schema_stamp(self) -> Any:
+        """
+        Return a cheap marker that changes whenever the database schema does.
+        
+        Lets cached metadata notice DDL made outside this process; None means
+        the adapter has no such marker and relies on the TTL alone.
+        """
+        return None
+    
+    def _cached_metadata(self, key: Any, load):
+        with self._state_lock:
+            cached = self._metadata.get(key)
+            version = self._catalog_version
+        stamp = self._schema_stamp()
+        if cached is not None:
+            value, cached_stamp, loaded_at = cached
+            fresh = not self.metadata_cache_ttl or time.monotonic() - loaded_at < self.metadata_cache_ttl
+            if fresh and cached_stamp == stamp:
+                return value
+        value = load()
+        with self._state_lock:
+            # Don't cache what a concurrent DDL may already have made stale.
+            if self._catalog_version == version:
+                self._metadata[key] = (value, stamp, time.monotonic())
+        return value
+    
+    def get_tables(self) -> List[str]:
+        """Return the table names, served from the metadata cache when fresh."""
+        return list(self._cached_metadata(None, self._load_tables))
+    
+    def get_table_schema(self, table_name: str) -> List[Dict[str, Any]]:
+        """Return the columns of a table, served from the metadata cache when fresh."""
+        schema = self._cached_metadata(table_name, lambda: self._load_table_schema(table_name))
+        return [dict(col) for col in schema]
+    
+    def get_table_indexes(self, table_name: str) -> List[Dict[str, Any]]:
+        """
+        Return the indexes of a table, served from the metadata cache when fresh.
+        
+        Each has a ``name``, its ``columns`` in order (None for expressions),
+        ``unique``, ``primary``, ``partial`` and the access ``method``.
+        """
+        indexes = self._cached_metadata(('indexes', table_name), lambda: self._load_table_indexes(table_name))
+        return [dict(index, columns=list(index['columns'])) for index in indexes]
+    
+    def list_indexes(self, table_name: str) -> List[Dict[str, Any]]:
+        """Return the indexes of a table, read fresh, with their on-disk ``size_bytes`` (None if unknown)."""
+        indexes = self._load_table_indexes(table_name)
+        sizes = self._index_sizes(table_name)
+        for index in indexes:
+            index['size_bytes'] = sizes.get(index['name'])
+        return indexes
+    
+    def _index_sizes(self, table_name: str) -> Dict[str, int]:
+        """Map the table's index names to their size in bytes, where the database can tell."""
+        return {}
+    
+    def _index_statement(self, table_name: str, columns: List[str], name: Optional[str] = None,
+                         unique: bool = False, concurrently: bool = False) -> Tuple[str, str]:
+        """
+        Build a CREATE INDEX statement after checking the columns against the schema.
+        
+        The index is named ``idx_<table>_<columns>`` unless ``name`` is given.
+        Returns the SQL and the index name.
+        """
+        if not columns or not all(isinstance(column, str) for column in columns):
+            raise ValueError('At least one column is required')
+        schema = self.get_table_schema(table_name)
+        if not schema:
+            raise ValueError(f'Table "{table_name}" not found')
+        names = {col['name'] for col in schema}
+        for column in columns:
+            if column not in names:
+                raise ValueError(f'Unknown column "{column}"')
+        if len(set(columns)) != len(columns):
+            raise ValueError('Columns must not repeat')
+        # PostgreSQL truncates identifiers to 63 bytes.
+        name = name or '_'.join(['idx', table_name] + columns)[:63]
+        sql = (f'CREATE {"UNIQUE " if unique else ""}INDEX {"CONCURRENTLY " if concurrently else ""}'
+               f'{quote_identifier(name)} ON {quote_identifier(table_name)} '
+               f'({", ".join(quote_identifier(column) for column in columns)})')
+        return sql, name
+    
+    @abstractmethod
+    def create_index(self, table_name: str, columns: List[str], name: Optional[str] = None,
+                     unique: bool = False, concurrently: bool = False) -> Tuple[bool, Optional[str]]:
+        pass
+    
+    @abstractmethod
+    def drop_index(self, table_name: str, index_name: str, concurrently: bool = False) -> Tuple[bool, Optional[str]]:
+        pass
+    
+    def _droppable_index(self, table_name: str, index_name: str) -> Optional[str]:
+        """Return why an index can't be dropped through the API, or None if it can."""
+        index = next((index for index in self._load_table_indexes(table_name) if index['name'] == index_name), None)
+        if index is None:
+            return f'Index "{index_name}" not found on table "{table_name}"'
+        if index['primary'] or index['method'] == 'rowid':
+            return f'Index "{index_name}" is the primary key of "{table_name}"'
+        return None
+    
+    def index_advice(self, min_queries: int = 1) -> List[Dict[str, Any]]:
+        """
+        Recommend indexes for the filter and sort shapes seen by execute_query
+        and get_table_data that no current index serves, busiest first.
+        
+        Each recommendation gives the table, the columns in index order, the
+        number of queries and their total time, and the CREATE INDEX statement.
+        """
+        tables = set(self.get_tables())
+        indexes = {table: self.get_table_indexes(table)
+                   for table in {pattern[0] for pattern, _, _ in self.index_advisor.patterns()}
+                   if table in tables}
+        advice = self.index_advisor.recommend(indexes, min_queries)
+        for entry in advice:
+            entry['sql'] = self._index_statement(entry['table'], entry['columns'])[0]
+        return advice
+    
+    def invalidate_metadata(self, table_name: Optional[str] = None):
+        """Drop cached metadata for one table (and the table list), or everything."""
+        with self._state_lock:
+            self._catalog_version += 1
+            if table_name is None:
+                self._metadata.clear()
+            else:
+                self._metadata.pop(table_name, None)
+                self._metadata.pop(('indexes', table_name), None)
+                self._metadata.pop(None, None)
+    
     @abstractmethod
     def get_connection(self):
         pass
     
+    def _read_connection(self):
+        """Connection for read-only statements; adapters with read replicas route these there."""
+        return self.get_connection()
+    
+    def _read_settled(self) -> bool:
+        """
+        False when this thread's last read may have missed this process's
+        latest writes (it came from a lagging replica), so must not be cached.
+        """
+        return True
+    
     @abstractmethod
-    def get_tables(self) -> List[str]:
+    def _load_tables(self) -> List[str]:
         pass
     
     @abstractmethod
-    def get_table_schema(self, table_name: str) -> List[Dict[str, Any]]:
+    def _load_table_schema(self, table_name: str) -> List[Dict[str, Any]]:
+        pass
+    
+    @abstractmethod
+    def _load_table_indexes(self, table_name: str) -> List[Dict[str, Any]]:
         pass
     
     @abstractmethod
@@ -45,7 +538,11 @@ class DatabaseAdapter(ABC):
         pass
     
     @abstractmethod
-    def get_table_data(self, table_name: str, limit: int = 100, offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+    def get_table_data(self, table_name: str, limit: int = 100, offset: int = 0,
+                       after: Optional[str] = None, sort_column: Optional[str] = None,
+                       keyset: bool = False, count_strategy: Optional[str] = None,
+                       row_format: str = 'records', where: Any = None, order_by: Optional[str] = None,
+                       search: Optional[str] = None) -> Tuple[List[Any], int, Dict[str, Any]]:
         pass
     
     @abstractmethod
@@ -61,31 +558,1172 @@ class DatabaseAdapter(ABC):
         pass
     
     @abstractmethod
-    def execute_query(self, query: str) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str]]:
+    def _execute_query(self, query: str, handle: Dict[str, Any]) -> Tuple[Optional[List[Any]], Optional[str], Optional[str]]:
+        """
+        Run a SELECT under the limits in ``handle``.
+        
+        Returns ``(rows, error, truncated_by)``. Implementations must honour
+        ``handle['deadline']`` and install a canceller with ``_set_canceller``.
+        """
+        pass
+    
+    def execute_query(self, query: str, use_cache: bool = True, timeout: Optional[float] = None,
+                      max_rows: Optional[int] = None, max_bytes: Optional[int] = None,
+                      query_id: Optional[str] = None, row_format: str = 'records'
+                      ) -> Tuple[Optional[List[Any]], Optional[str], Dict[str, Any]]:
+        """
+        Execute a SELECT query under a timeout, a row cap and a result size cap.
+        
+        Per-call limits can only tighten the adapter's own. A result that hits
+        a cap is cut short rather than failed; the returned info dict says so
+        in ``truncated_by``. A running query can be stopped with
+        ``cancel_query(query_id)``.
+        
+        With a columnar ``row_format`` the rows are the cursor's tuples (laid
+        out per ``layout_rows``) and the info dict lists the ``columns``.
+        
+        Repeated queries are served from the result cache when it is enabled.
+        Cached results are keyed on the normalized SQL text and dropped when
+        this process writes to a table the query reads (or after the TTL, which
+        also covers views and writes made outside the app).
+        """
+        columnar = check_row_format(row_format)
+        info = {'query_id': query_id or uuid.uuid4().hex, 'format': row_format, 'truncated': False,
+                'truncated_by': None, 'cached': False}
+        if not is_select_query(query):
+            return None, "Only SELECT queries are allowed", info
+        timeout = effective_limit(timeout, self.query_timeout)
+        max_rows = effective_limit(max_rows, self.query_max_rows)
+        max_bytes = effective_limit(max_bytes, self.query_max_bytes)
+        
+        use_cache = use_cache and self.query_cache.enabled
+        if use_cache:
+            # Both columnar layouts share one cached (columns, tuples) entry.
+            key = ('columnar:' if columnar else '') + normalize_sql(query)
+            cached = self.query_cache.get(key)
+            if cached is not None:
+                columns, rows = cached if columnar else (None, cached)
+                rows, truncated_by = self._limit_rows(rows, max_rows, max_bytes, as_dict=not columnar)
+                info.update(cached=True, truncated=truncated_by is not None, truncated_by=truncated_by)
+                if columnar:
+                    info['columns'] = columns
+                    rows = layout_rows(columns, rows, row_format)
+                return rows, None, info
+            generation = self.query_cache.generation()
+        
+        handle = {
+            'query_id': info['query_id'],
+            'query': query,
+            'started': time.monotonic(),
+            'deadline': time.monotonic() + timeout if timeout else None,
+            'timeout': timeout,
+            'max_rows': max_rows,
+            'max_bytes': max_bytes,
+            'columnar': columnar,
+            'columns': None,
+            'cancelled': False,
+            'cancel': None,
+        }
+        with self._state_lock:
+            if handle['query_id'] in self._running_queries:
+                return None, f"Query id '{handle['query_id']}' is already running", info
+            self._running_queries[handle['query_id']] = handle
+        try:
+            rows, error, truncated_by = self._execute_query(query, handle)
+        finally:
+            with self._state_lock:
+                self._running_queries.pop(handle['query_id'], None)
+        duration = time.monotonic() - handle['started']
+        self.slow_log.record('query', query, None, duration, len(rows) if rows is not None else None, error)
+        info.update(truncated=truncated_by is not None, truncated_by=truncated_by)
+        record_shape = error is None and self.index_advisor.enabled
+        store = use_cache and error is None and truncated_by is None and self._read_settled()
+        # Both want the tables the query reads; look them up once.
+        tables = referenced_tables(query, self.get_tables()) if record_shape or store else frozenset()
+        if record_shape:
+            self._record_query_shape(query, tables, duration)
+        if store:
+            if columnar:
+                self.query_cache.put(key, (handle['columns'], rows), tables, generation, estimate_size(rows))
+            else:
+                self.query_cache.put(key, rows, tables, generation)
+        if columnar and error is None:
+            info['columns'] = handle['columns']
+            rows = layout_rows(handle['columns'], rows, row_format)
+        return rows, error, info
+    
+    def _record_query_shape(self, query: str, tables: FrozenSet[str], duration: float):
+        """Feed the filtered and sorted columns of a raw SELECT, reading ``tables``, to the index advisor."""
+        columns = {table: [col['name'] for col in self.get_table_schema(table)] for table in tables}
+        for table, (filters, sort) in query_predicates(query, columns).items():
+            self.index_advisor.record(index_pattern(table, filters, sort), duration)
+    
+    @abstractmethod
+    def _explain(self, query: str, analyze: bool) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        pass
+    
+    def explain_query(self, query: str, analyze: bool = False) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Return the plan the database would use for a SELECT query.
+        
+        With ``analyze`` the query is actually run (PostgreSQL only), so the
+        plan carries real row counts, timings and buffer usage.
+        """
+        if not is_select_query(query):
+            return None, "Only SELECT queries are allowed"
+        return self._explain(query, analyze)
+    
+    def _set_canceller(self, handle: Dict[str, Any], cancel) -> bool:
+        """Register how to interrupt a running query; False if it was already cancelled."""
+        with self._state_lock:
+            handle['cancel'] = cancel
+            return not handle['cancelled']
+    
+    def cancel_query(self, query_id: str) -> bool:
+        """Interrupt a running execute_query call. Returns False if no such query is running."""
+        with self._state_lock:
+            handle = self._running_queries.get(query_id)
+            if handle is None:
+                return False
+            handle['cancelled'] = True
+            cancel = handle['cancel']
+        if cancel is not None:
+            cancel()
+        return True
+    
+    def running_queries(self) -> List[Dict[str, Any]]:
+        """Describe the execute_query calls currently in flight."""
+        now = time.monotonic()
+        with self._state_lock:
+            handles = list(self._running_queries.values())
+        return [{
+            'query_id': handle['query_id'],
+            'query': handle['query'],
+            'elapsed': round(now - handle['started'], 3),
+            'timeout': handle['timeout'],
+            'cancelled': handle['cancelled'],
+        } for handle in handles]
+    
+    def _limit_rows(self, rows, max_rows: Optional[int], max_bytes: Optional[int],
+                    deadline: Optional[float] = None, as_dict: bool = True) -> Tuple[List[Any], Optional[str]]:
+        """
+        Collect rows (as dicts, or as they come with ``as_dict`` off) until a cap is hit.
+        
+        Returns the rows and the name of the cap that cut them short, if any.
+        Reading stops as soon as a cap is reached, so the rest of the result
+        is never fetched.
+        """
+        result = []
+        size = 0
+        for row in rows:
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError('Query timed out')
+            if max_rows is not None and len(result) >= max_rows:
+                return result, 'max_rows'
+            if as_dict:
+                row = dict(row)
+            if max_bytes is not None:
+                size += estimate_row_size(row)
+                if size > max_bytes:
+                    return result, 'max_bytes'
+            result.append(row)
+        return result, None
+    
+    def _fetch_limited(self, cursor, handle: Dict[str, Any]) -> Tuple[List[Any], Optional[str]]:
+        """
+        Read a cursor's result in batches under the limits in ``handle``.
+        
+        Columnar results keep the cursor's tuples and record the column names
+        in ``handle['columns']``.
+        """
+        columnar = handle['columnar']
+        if handle['max_rows'] is None and handle['max_bytes'] is None and handle['deadline'] is None:
+            rows = cursor.fetchall()
+            if columnar:
+                handle['columns'] = [col[0] for col in cursor.description or ()]
+            return (rows if columnar else [dict(row) for row in rows]), None
+        first = cursor.fetchmany(self.stream_batch_size)
+        if columnar:
+            # A server-side cursor has no description until the first fetch.
+            handle['columns'] = [col[0] for col in cursor.description or ()]
+        batches = itertools.chain([first], iter(lambda: cursor.fetchmany(self.stream_batch_size), []))
+        return self._limit_rows(itertools.chain.from_iterable(batches), handle['max_rows'],
+                                handle['max_bytes'], handle['deadline'], as_dict=not columnar)
+    
+    def _query_error(self, error: Exception, handle: Dict[str, Any]) -> str:
+        """Describe why a query failed, naming cancellation and timeouts plainly."""
+        if handle['cancelled']:
+            return 'Query was cancelled'
+        if handle['deadline'] is not None and time.monotonic() >= handle['deadline']:
+            return f"Query timed out after {handle['timeout']:g}s"
+        return str(error)
+    
+    @abstractmethod
+    def _stream(self, sql: str, params: Optional[List[Any]], batch_size: int) -> Iterator[Tuple[List[str], List[tuple]]]:
+        """
+        Run a query and yield ``(columns, rows)`` batches of at most ``batch_size`` tuples.
+        
+        The first batch is always yielded, even if empty, so callers learn the
+        columns. The connection is held until the generator is exhausted or closed.
+        """
         pass
+    
+    @abstractmethod
+    def _insert_many(self, cursor, table_name: str, columns: List[str], values: List[List[Any]]):
+        """Insert several rows with the same columns in one statement (or one driver call)."""
+        pass
+    
+    def _begin(self, cursor):
+        """Start a transaction explicitly, for drivers that don't do it before the first statement."""
+        pass
+    
+    def insert_rows(self, table_name: str, rows: List[Dict[str, Any]], atomic: bool = False,
+                    chunk_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Insert many rows in a single transaction.
+        
+        Rows are sent in chunks of ``chunk_size``, grouped by their column set.
+        Each chunk runs under a savepoint; if it fails, its rows are retried one
+        by one so that only the offending rows are reported and skipped. With
+        ``atomic`` the first failure rolls back the whole batch instead.
+        """
+        chunk_size = chunk_size or self.batch_chunk_size
+        inserted = 0
+        failed: List[Dict[str, Any]] = []
+        batches: List[Dict[str, Any]] = []
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            self._begin(cursor)
+            for start in range(0, len(rows), chunk_size):
+                batch = {'start': start, 'size': len(rows[start:start + chunk_size]), 'inserted': 0, 'failed': 0}
+                batches.append(batch)
+                groups: List[Tuple[List[str], List[Tuple[int, List[Any]]]]] = []
+                for index, row in enumerate(rows[start:start + chunk_size], start):
+                    if not isinstance(row, dict) or not row:
+                        failed.append({'index': index, 'error': 'Row must be a non-empty object'})
+                        batch['failed'] += 1
+                        continue
+                    columns = list(row.keys())
+                    if not groups or groups[-1][0] != columns:
+                        groups.append((columns, []))
+                    groups[-1][1].append((index, list(row.values())))
+                for columns, group in groups:
+                    cursor.execute('SAVEPOINT dashtools_batch')
+                    try:
+                        self._insert_many(cursor, table_name, columns, [values for _, values in group])
+                        cursor.execute('RELEASE SAVEPOINT dashtools_batch')
+                        batch['inserted'] += len(group)
+                        continue
+                    except Exception:
+                        cursor.execute('ROLLBACK TO SAVEPOINT dashtools_batch')
+                        cursor.execute('RELEASE SAVEPOINT dashtools_batch')
+                    for index, values in group:
+                        cursor.execute('SAVEPOINT dashtools_row')
+                        try:
+                            self._insert_many(cursor, table_name, columns, [values])
+                            cursor.execute('RELEASE SAVEPOINT dashtools_row')
+                            batch['inserted'] += 1
+                        except Exception as e:
+                            cursor.execute('ROLLBACK TO SAVEPOINT dashtools_row')
+                            cursor.execute('RELEASE SAVEPOINT dashtools_row')
+                            failed.append({'index': index, 'error': str(e)})
+                            batch['failed'] += 1
+                            if atomic:
+                                break
+                    if atomic and failed:
+                        break
+                inserted += batch['inserted']
+                if atomic and failed:
+                    break
+            if atomic and failed:
+                conn.rollback()
+                for batch in batches:
+                    batch['inserted'] = 0
+                return {'inserted': 0, 'failed': failed, 'batches': batches, 'committed': False}
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        if inserted:
+            self._note_change(table_name, inserted=inserted)
+        return {'inserted': inserted, 'failed': failed, 'batches': batches, 'committed': True}
+    
+    @abstractmethod
+    def _import_chunks(self, table_name: str, columns: List[str], rows: Iterator[List[Any]],
+                       chunk_size: int, progress: Dict[str, Any]):
+        """
+        Load rows in transactions of ``chunk_size`` rows using the fastest bulk path.
+        
+        Updates ``progress['imported']`` and ``progress['chunks']`` after every
+        commit, so a failure part-way still reports what was loaded.
+        """
+        pass
+    
+    def import_rows(self, table_name: str, columns: List[str], rows: Iterator[List[Any]],
+                    create: bool = False, infer_types: bool = False,
+                    chunk_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Bulk-load an iterator of rows (lists in ``columns`` order) into a table.
+        
+        Rows are consumed incrementally and committed every ``chunk_size`` rows.
+        If the table does not exist and ``create`` is set, it is created first;
+        with ``infer_types`` the column types come from a sample of the leading
+        rows, otherwise every column is TEXT.
+        """
+        if not columns:
+            raise ValueError('At least one column is required')
+        chunk_size = chunk_size or self.import_chunk_size
+        result: Dict[str, Any] = {'imported': 0, 'chunks': 0, 'created': False, 'columns': columns}
+        if table_name not in self.get_tables():
+            if not create:
+                raise ValueError(f'Table "{table_name}" does not exist')
+            sample: List[List[Any]] = []
+            if infer_types:
+                for row in rows:
+                    sample.append(row)
+                    if len(sample) >= IMPORT_SAMPLE_ROWS:
+                        break
+            types = {name: infer_column_type([row[i] for row in sample if i < len(row)]) if infer_types else 'TEXT'
+                     for i, name in enumerate(columns)}
+            success, error = self.create_table(table_name, [{'name': name, 'type': types[name]} for name in columns])
+            if not success:
+                raise ValueError(error or 'Failed to create table')
+            result['created'] = True
+            result['types'] = types
+            rows = itertools.chain(sample, rows)
+        try:
+            self._import_chunks(table_name, columns, rows, chunk_size, result)
+        except Exception as e:
+            first = result['imported'] + 1
+            result['error'] = f'Rows {first}-{first + chunk_size - 1}: {e}'
+        if result['imported']:
+            self._note_change(table_name, inserted=result['imported'])
+        return result
+    
+    def _row_statement(self, op: Dict[str, Any], tables: List[str]) -> Tuple[str, List[Any]]:
+        """
+        Build the SQL and parameters for one insert/update/delete operation.
+        
+        Operations of the same kind on the same table and columns produce the
+        same SQL text, so drivers with a statement cache (sqlite3) prepare it once.
+        """
+        if not isinstance(op, dict):
+            raise ValueError('Operation must be an object')
+        kind = op.get('op')
+        table_name = op.get('table')
+        if kind not in TRANSACTION_OPS:
+            raise ValueError(f'Operation must be one of: {", ".join(TRANSACTION_OPS)}')
+        if table_name not in tables:
+            raise ValueError(f'Table "{table_name}" not found')
+        table = quote_identifier(table_name)
+        data = op.get('data') or {}
+        if kind in ('insert', 'update') and (not isinstance(data, dict) or not data):
+            raise ValueError(f'{kind} requires a non-empty "data" object')
+        if kind == 'insert':
+            columns = ', '.join(quote_identifier(key) for key in data)
+            placeholders = ', '.join(self.PLACEHOLDER for _ in data)
+            return f'INSERT INTO {table} ({columns}) VALUES ({placeholders})', list(data.values())
+        if 'id' not in op:
+            raise ValueError(f'{kind} requires an "id"')
+        id_column = quote_identifier(op.get('id_column') or 'id')
+        if kind == 'update':
+            set_clause = ', '.join(f'{quote_identifier(key)} = {self.PLACEHOLDER}' for key in data)
+            return f'UPDATE {table} SET {set_clause} WHERE {id_column} = {self.PLACEHOLDER}', list(data.values()) + [op['id']]
+        return f'DELETE FROM {table} WHERE {id_column} = {self.PLACEHOLDER}', [op['id']]
+    
+    def execute_transaction(self, operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Run an ordered list of insert/update/delete operations atomically.
+        
+        All operations share one connection and one commit. Each operation is
+        ``{"op", "table", "data", "id", "id_column"}``; the result lists the
+        rowcount of every operation, or the index and error of the first one
+        that failed, in which case nothing is committed.
+        """
+        tables = self.get_tables()
+        statements = []
+        for index, op in enumerate(operations):
+            try:
+                statements.append(self._row_statement(op, tables))
+            except ValueError as e:
+                return {'committed': False, 'failed_index': index, 'error': str(e)}
+        
+        rowcounts: List[int] = []
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            self._begin(cursor)
+            for index, (sql, params) in enumerate(statements):
+                try:
+                    cursor.execute(sql, params)
+                except Exception as e:
+                    conn.rollback()
+                    return {'committed': False, 'failed_index': index, 'error': str(e)}
+                rowcounts.append(cursor.rowcount)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        
+        changes: Dict[str, Dict[str, int]] = {}
+        for op, rowcount in zip(operations, rowcounts):
+            change = changes.setdefault(op['table'], {'inserted': 0, 'deleted': 0, 'updated': 0})
+            if op['op'] == 'insert':
+                change['inserted'] += rowcount
+            elif op['op'] == 'delete':
+                change['deleted'] += rowcount
+            else:
+                change['updated'] += rowcount
+        for table_name, change in changes.items():
+            self._note_change(table_name, **change)
+        return {'committed': True, 'results': [{'rowcount': rowcount} for rowcount in rowcounts]}
+    
+    def stream_query(self, query: str, batch_size: Optional[int] = None) -> Iterator[Tuple[List[str], List[tuple]]]:
+        """Stream the rows of a SELECT query in batches instead of materializing them."""
+        if not is_select_query(query):
+            raise ValueError("Only SELECT queries are allowed")
+        return self._stream(query, None, batch_size or self.stream_batch_size)
+    
+    def export_table(self, table_name: str, export_format: str = 'csv') -> Iterator[Any]:
+        """
+        Stream a whole table as CSV (with header) or NDJSON text chunks.
+        
+        The default reads the table with a single streaming cursor; adapters
+        with a native bulk export override it.
+        """
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f'Export format must be one of: {", ".join(EXPORT_FORMATS)}')
+        batches = self._stream(f'SELECT * FROM {quote_identifier(table_name)}', None, self.stream_batch_size)
+        return csv_stream(batches) if export_format == 'csv' else ndjson_stream(batches)
+    
+    def stream_table_data(self, table_name: str, limit: Optional[int] = None, offset: int = 0,
+                          batch_size: Optional[int] = None) -> Iterator[Tuple[List[str], List[tuple]]]:
+        """Stream the rows of a table (optionally a LIMIT/OFFSET slice of it) in batches."""
+        sql = f'SELECT * FROM {quote_identifier(table_name)}'
+        params: List[Any] = []
+        if limit is not None or offset:
+            sql += f' LIMIT {self.PLACEHOLDER if limit is not None else self.NO_LIMIT} OFFSET {self.PLACEHOLDER}'
+            params = ([limit] if limit is not None else []) + [offset]
+        return self._stream(sql, params, batch_size or self.stream_batch_size)
+    
+    @staticmethod
+    def _is_text_type(column_type: str) -> bool:
+        """True for column types searched by ``search`` (SQLite text affinity covers PostgreSQL's too)."""
+        column_type = (column_type or '').upper()
+        return any(word in column_type for word in ('CHAR', 'CLOB', 'TEXT'))
+    
+    def _table_filters(self, table_name: str, where: Any = None, order_by: Optional[str] = None,
+                       search: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Build the WHERE conditions and ORDER BY of a filtered get_table_data call.
+        
+        Filter and sort columns are checked against the table schema and every
+        value is bound as a parameter. ``search`` matches a substring in any
+        text column. Returns None when nothing is filtered or sorted, otherwise
+        the SQL ``conditions`` and their ``params``, the ``order_sql`` (with the
+        primary key or row id appended so pages are stable) and ``index_hints``
+        for filters and sorts that can't use an index.
+        """
+        filters = normalize_filters(where)
+        order = parse_order_by(order_by) if order_by else []
+        if not filters and not order and not search:
+            return None
+        schema = self.get_table_schema(table_name)
+        if not schema:
+            raise ValueError(f'Table "{table_name}" not found')
+        types = {col['name']: col['type'] for col in schema}
+        
+        conditions = []
+        params: List[Any] = []
+        for column, op, value in filters:
+            if column not in types:
+                raise ValueError(f'Unknown filter column "{column}"')
+            ident = quote_identifier(column)
+            if op in ('is_null', 'not_null'):
+                conditions.append(f'{ident} {FILTER_OPS[op]}')
+            elif op == 'in':
+                conditions.append(f'{ident} IN ({", ".join([self.PLACEHOLDER] * len(value))})')
+                params.extend(value)
+            else:
+                operator = self.ILIKE if op == 'ilike' else FILTER_OPS[op]
+                conditions.append(f'{ident} {operator} {self.PLACEHOLDER}')
+                params.append(value)
+        if search:
+            text_columns = [name for name, column_type in types.items() if self._is_text_type(column_type)]
+            if not text_columns:
+                raise ValueError(f'Table "{table_name}" has no text columns to search')
+            pattern = f'%{escape_like(search)}%'
+            matches = [f"{quote_identifier(name)} {self.ILIKE} {self.PLACEHOLDER} ESCAPE '\\'" for name in text_columns]
+            conditions.append(f'({" OR ".join(matches)})')
+            params.extend([pattern] * len(text_columns))
+        
+        order_sql = None
+        if order:
+            terms = []
+            for column, descending in order:
+                if column not in types:
+                    raise ValueError(f'Unknown sort column "{column}"')
+                terms.append(f'{quote_identifier(column)} {"DESC" if descending else "ASC"}')
+            ordered = {column for column, _ in order}
+            pk_columns = [col['name'] for col in schema if col['pk']]
+            terms.extend(quote_identifier(name) for name in pk_columns if name not in ordered)
+            if not pk_columns:
+                terms.append(self.ROWID_COLUMN)
+            order_sql = ', '.join(terms)
+        
+        # A leading wildcard can't use an index, so the advisor doesn't count it.
+        seekable = [(column, op) for column, op, value in filters
+                    if not (op == 'like' and value[:1] in ('%', '_'))]
+        return {
+            'conditions': conditions,
+            'params': params,
+            'order_sql': order_sql,
+            'index_hints': self._index_hints(table_name, filters, order, bool(search)),
+            'pattern': index_pattern(table_name, seekable, [column for column, _ in order]),
+        }
+    
+    def _index_hints(self, table_name: str, filters: List[Tuple[str, str, Any]],
+                     order: List[Tuple[str, bool]], search: bool) -> List[Dict[str, Any]]:
+        """
+        List the filters and sorts of a query that no index can serve.
+        
+        A column counts as indexed when it leads a (non-partial) index, or
+        follows leading columns that are all matched by eq/in filters.
+        """
+        indexes = [index for index in self.get_table_indexes(table_name) if not index['partial']]
+        equal = {column for column, op, _ in filters if op in ('eq', 'in')}
+        
+        def served(columns: List[str], methods: Tuple[str, ...]) -> bool:
+            for index in indexes:
+                if index['method'] not in methods:
+                    continue
+                remaining = list(index['columns'])
+                while remaining and remaining[0] in equal and remaining[0] not in columns:
+                    remaining.pop(0)
+                if remaining[:len(columns)] == columns:
+                    return True
+            return False
+        
+        hints = []
+        for column, op, value in filters:
+            reason = None
+            if op == 'ne':
+                reason = 'ne filters match most of an index and are applied row by row'
+            elif op == 'not_null':
+                reason = 'not_null filters match most of an index and are applied row by row'
+            elif op in ('like', 'ilike') and value[:1] in ('%', '_'):
+                reason = 'pattern starts with a wildcard'
+            elif op == 'ilike' and self.ILIKE == 'ILIKE':
+                reason = 'ILIKE cannot use a btree index'
+            elif not served([column], ('btree', 'hash', 'rowid') if op in ('eq', 'in') else ('btree', 'rowid')):
+                reason = 'no index starts with this column'
+            if reason:
+                hints.append({'column': column, 'usage': 'filter', 'op': op, 'reason': reason})
+        if search:
+            hints.append({'column': None, 'usage': 'search', 'op': None,
+                          'reason': 'substring search reads every text column of every row'})
+        if order and not served([column for column, _ in order], ('btree', 'rowid')):
+            hints.append({'column': order[0][0], 'usage': 'sort', 'op': None,
+                          'reason': 'no index matches this order; matching rows are sorted before paging'})
+        return hints
+    
+    def _offset_query(self, table_name: str, limit: int, offset: int,
+                      filters: Optional[Dict[str, Any]] = None) -> Tuple[str, List[Any]]:
+        """Build the LIMIT/OFFSET query of a table page, filtered and sorted per ``_table_filters``."""
+        sql = f'SELECT * FROM {quote_identifier(table_name)}'
+        params: List[Any] = []
+        if filters and filters['conditions']:
+            sql += ' WHERE ' + ' AND '.join(filters['conditions'])
+            params.extend(filters['params'])
+        if filters and filters['order_sql']:
+            sql += f' ORDER BY {filters["order_sql"]}'
+        sql += f' LIMIT {self.PLACEHOLDER} OFFSET {self.PLACEHOLDER}'
+        params.extend([limit, offset])
+        return sql, params
+    
+    def _keyset_query(self, table_name: str, limit: int, after: Optional[str],
+                      sort_column: Optional[str], filters: Optional[Dict[str, Any]] = None
+                      ) -> Tuple[str, List[Any], List[Tuple[str, bool]]]:
+        """
+        Build a seek query for keyset pagination.
+        
+        Rows are ordered by ``sort_column`` (if any) followed by the primary key,
+        or the driver's row id for tables without one, so the order is unique and
+        each page is an index range scan instead of an OFFSET. Rows whose sort
+        column is NULL cannot be positioned and are skipped. The conditions
+        of ``filters`` are applied too; its ordering is not.
+        Returns the SQL, its parameters and the (key, is_pseudo) columns.
+        """
+        schema = self.get_table_schema(table_name)
+        if not schema:
+            raise ValueError(f'Table "{table_name}" not found')
+        names = [col['name'] for col in schema]
+        keys: List[Tuple[str, bool]] = []
+        if sort_column:
+            if sort_column not in names:
+                raise ValueError(f'Unknown sort column "{sort_column}"')
+            keys.append((sort_column, False))
+        pk_columns = [col['name'] for col in schema if col['pk']]
+        for name in pk_columns:
+            if name != sort_column:
+                keys.append((name, False))
+        if not pk_columns:
+            keys.append((self.ROWID_COLUMN, True))
+        
+        select = '*'
+        key_exprs = []
+        placeholders = []
+        for i, (key, pseudo) in enumerate(keys):
+            if pseudo:
+                select += f', {key} AS "__keyset_{i}"'
+                key_exprs.append(key)
+                placeholders.append(self.ROWID_PLACEHOLDER)
+            else:
+                key_exprs.append(quote_identifier(key))
+                placeholders.append(self.PLACEHOLDER)
+        
+        conditions = []
+        params: List[Any] = []
+        if sort_column:
+            conditions.append(f'{quote_identifier(sort_column)} IS NOT NULL')
+        if filters:
+            conditions.extend(filters['conditions'])
+            params.extend(filters['params'])
+        if after:
+            values = decode_cursor(after, sort_column)
+            if len(values) != len(keys):
+                raise ValueError('Cursor does not match the table key')
+            conditions.append(f'({", ".join(key_exprs)}) > ({", ".join(placeholders)})')
+            params.extend(values)
+        sql = f'SELECT {select} FROM {quote_identifier(table_name)}'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += f' ORDER BY {", ".join(key_exprs)} LIMIT {self.PLACEHOLDER}'
+        # Fetch one extra row to know whether another page follows.
+        params.append(limit + 1)
+        return sql, params, keys
+    
+    @staticmethod
+    def _keyset_page(rows: List[Any], keys: List[Tuple[str, bool]], limit: int,
+                     sort_column: Optional[str], columns: Optional[List[str]] = None
+                     ) -> Tuple[List[Any], Optional[str]]:
+        """
+        Trim a seek query result to ``limit`` rows and compute the next cursor.
+        
+        Rows are dicts, or tuples laid out as ``columns``; either way the
+        pseudo key columns added by ``_keyset_query`` are removed.
+        """
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        names = [f'__keyset_{i}' if pseudo else key for i, (key, pseudo) in enumerate(keys)]
+        next_cursor = None
+        if has_more and rows:
+            last = rows[-1]
+            if columns is None:
+                values = [last[name] for name in names]
+            else:
+                values = [last[columns.index(name)] for name in names]
+            next_cursor = encode_cursor(sort_column, values)
+        pseudo_names = [name for name, (_, pseudo) in zip(names, keys) if pseudo]
+        if pseudo_names:
+            if columns is None:
+                for row in rows:
+                    for name in pseudo_names:
+                        row.pop(name, None)
+            else:
+                # The pseudo columns are selected last.
+                rows = [row[:-len(pseudo_names)] for row in rows]
+        return rows, next_cursor
+    
+    def _table_key(self, table_name: str) -> str:
+        """
+        Name that per-table state (versions, cached counts and statistics,
+        query cache entries) is kept under, so every spelling the database
+        accepts for a table reaches the same state. Must not touch the
+        database: writers call it while holding a connection.
+        """
+        return table_name
+    
+    def _note_change(self, table_name: str, inserted: int = 0, deleted: int = 0, updated: int = 0,
+                     row: Optional[Any] = None):
+        """
+        Record a committed write so cached state about the table stays correct.
+        
+        ``row`` is the stored row (all columns, in order) of a single insert,
+        which lets cached column statistics take it in instead of being dropped.
+        """
+        table_name = self._table_key(table_name)
+        with self._state_lock:
+            version = self._table_versions.get(table_name, 0) + 1
+            self._table_versions[table_name] = version
+            cached = self._row_counts.get(table_name)
+            if cached is not None:
+                count, _, counted_at = cached
+                self._row_counts[table_name] = (max(count + inserted - deleted, 0), version, counted_at)
+        self.query_cache.invalidate(table_name)
+        self._update_stats(table_name, inserted, deleted, updated, row)
+    
+    def _note_ddl(self, table_name: str):
+        """Record a committed schema change (create, drop, alter) of a table."""
+        table_name = self._table_key(table_name)
+        with self._state_lock:
+            self._table_versions[table_name] = self._table_versions.get(table_name, 0) + 1
+            self._row_counts.pop(table_name, None)
+        with self._stats_lock:
+            self._column_stats.pop(table_name, None)
+        self.invalidate_metadata(table_name)
+        self.query_cache.invalidate(table_name)
+    
+    def _update_stats(self, table_name: str, inserted: int, deleted: int, updated: int, row: Optional[Any]):
+        """
+        Bring cached column statistics up to date with a write, or drop them.
+        
+        Statistics from a full scan take in a single inserted row and are
+        dropped on any other write. Sampled ones only track the row count and
+        are dropped once ``stats_stale_fraction`` of the rows have changed.
+        """
+        with self._stats_lock:
+            stats = self._column_stats.get(table_name)
+            if stats is None:
+                return
+            if stats.sampled:
+                stats.total = max(stats.total + inserted - deleted, 0)
+                stats.changes += inserted + deleted + updated
+                keep = stats.changes <= self.stats_stale_fraction * max(stats.total, 1)
+            else:
+                keep = not deleted and not updated and (not inserted or (inserted == 1 and row is not None))
+                if keep and inserted:
+                    stats.add_rows([row])
+                    stats.changes += 1
+            if not keep:
+                del self._column_stats[table_name]
+    
+    def _stats_cached(self, table_name: str) -> bool:
+        """True if column statistics of the table are cached, so inserts should hand over their row."""
+        return self._table_key(table_name) in self._column_stats
+    
+    def _stats_sample(self, cursor, table_name: str, sample_rows: int) -> Optional[Tuple[str, List[Any], float]]:
+        """
+        Plan a sample of about ``sample_rows`` rows of a larger table.
+        
+        Returns the sampling SELECT, its parameters and the fraction of the
+        table it reads, or None to scan the whole table.
+        """
+        return None
+    
+    def table_stats(self, table_name: str, full: bool = False, refresh: bool = False) -> Dict[str, Any]:
+        """
+        Summarize every column of a table: null count, min/max, mean, distinct
+        values, most common values and a histogram of numeric values.
+        
+        Tables with more than ``stats_sample_rows`` rows are read through a
+        sample of about that many rows unless ``full`` is set; smaller ones in
+        one scan. Results are cached per table (see ``_update_stats``) and
+        recomputed after ``stats_ttl`` seconds or when ``refresh`` is set.
+        """
+        schema = self.get_table_schema(table_name)
+        if not schema:
+            raise ValueError(f'Table "{table_name}" not found')
+        requested = time.monotonic()
+        key = self._table_key(table_name)
+        with self._stats_lock:
+            loading = self._stats_loading.setdefault(key, threading.Lock())
+        # One computation per table at a time; requests that waited for it take its result.
+        with loading:
+            with self._stats_lock:
+                stats = self._column_stats.get(key)
+                if stats is not None and (not full or not stats.sampled) and \
+                        (not refresh or stats.loaded_at >= requested) and \
+                        (not self.stats_ttl or time.monotonic() - stats.loaded_at < self.stats_ttl):
+                    return dict(stats.summary(), table=table_name, cached=stats.loaded_at < requested)
+            with self._state_lock:
+                version = self._table_versions.get(key, 0)
+            stats = self._compute_stats(table_name, schema, full)
+            with self._state_lock:
+                # Only cache statistics if no write raced with the scan.
+                current = self._table_versions.get(key, 0) == version
+            with self._stats_lock:
+                if current:
+                    self._column_stats[key] = stats
+                return dict(stats.summary(), table=table_name, cached=False)
+    
+    def _compute_stats(self, table_name: str, schema: List[Dict[str, Any]], full: bool) -> TableStats:
+        sample = None
+        if not full and self.stats_sample_rows:
+            conn = self._read_connection()
+            try:
+                sample = self._stats_sample(conn.cursor(), table_name, self.stats_sample_rows)
+            finally:
+                conn.close()
+        sql, params, fraction = sample or (f'SELECT * FROM {quote_identifier(table_name)}', [], None)
+        types = {col['name']: col['type'] for col in schema}
+        started = time.monotonic()
+        stats = None
+        for columns, rows in self._stream(sql, params, self.stream_batch_size):
+            if stats is None:
+                stats = TableStats([(name, types.get(name, '')) for name in columns])
+            stats.add_rows(rows)
+        if fraction is not None:
+            stats.total = round(stats.rows / fraction)
+        stats.duration = time.monotonic() - started
+        self.slow_log.record('stats', sql, params, stats.duration, stats.rows)
+        return stats
+    
+    def change_token(self, table_name: Optional[str] = None) -> str:
+        """
+        Return an opaque token that changes whenever a table may have changed.
+        
+        Without ``table_name`` the token follows the table list instead. It
+        changes on every write or DDL made through this adapter and, after
+        ``change_token_ttl`` seconds, regardless; it never touches the database.
+        """
+        with self._state_lock:
+            if table_name is None:
+                version = self._catalog_version
+            else:
+                version = self._table_versions.get(self._table_key(table_name), 0)
+        epoch = int(time.monotonic() // self.change_token_ttl) if self.change_token_ttl else 0
+        return f'{self._instance_token}.{epoch}.{version}'
+    
+    def _exact_count(self, cursor, table_name: str, filters: Optional[Dict[str, Any]] = None) -> int:
+        sql = f'SELECT COUNT(*) FROM {quote_identifier(table_name)}'
+        params = None
+        if filters and filters['conditions']:
+            sql += ' WHERE ' + ' AND '.join(filters['conditions'])
+            params = filters['params']
+        started = time.monotonic()
+        if params:
+            cursor.execute(sql, params)
+        else:
+            cursor.execute(sql)
+        count = cursor.fetchone()[0]
+        self.slow_log.record('count', sql, params, time.monotonic() - started, 1)
+        return count
+    
+    def _fetch_logged(self, cursor, source: str, sql: str, params: List[Any],
+                      columnar: bool = False, pattern: Optional[Pattern] = None) -> List[Any]:
+        """
+        Run a statement and return its rows, recording it in the slow-query log
+        (and, given its filter/sort ``pattern``, with the index advisor).
+        
+        Rows are dicts, or the cursor's own tuples when ``columnar`` is set.
+        """
+        started = time.monotonic()
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        if not columnar:
+            rows = [dict(row) for row in rows]
+        duration = time.monotonic() - started
+        self.slow_log.record(source, sql, params, duration, len(rows))
+        self.index_advisor.record(pattern, duration)
+        return rows
+    
+    def _estimated_count(self, cursor, table_name: str) -> Optional[int]:
+        """Return the planner's row estimate, or None when the database has none."""
+        return None
+    
+    def _count_rows(self, cursor, table_name: str, strategy: Optional[str] = None,
+                    filters: Optional[Dict[str, Any]] = None) -> Tuple[int, str]:
+        """
+        Count the rows of a table with the given strategy.
+        
+        Returns the count and the strategy that actually produced it: an
+        estimate falls back to an exact count when no statistics exist, and a
+        cache miss is counted exactly (and then cached). Rows matching
+        ``filters`` are always counted exactly.
+        """
+        strategy = (strategy or self.count_strategy).lower()
+        if strategy not in COUNT_STRATEGIES:
+            raise ValueError(f'Invalid count strategy "{strategy}". Must be one of: {", ".join(COUNT_STRATEGIES)}')
+        if filters and filters['conditions']:
+            return self._exact_count(cursor, table_name, filters), 'exact'
+        if strategy == 'estimated':
+            estimate = self._estimated_count(cursor, table_name)
+            if estimate is not None:
+                return int(estimate), 'estimated'
+            return self._exact_count(cursor, table_name), 'exact'
+        if strategy == 'cached':
+            key = self._table_key(table_name)
+            with self._state_lock:
+                version = self._table_versions.get(key, 0)
+                cached = self._row_counts.get(key)
+            if cached is not None:
+                count, _, counted_at = cached
+                if not self.count_cache_ttl or time.monotonic() - counted_at < self.count_cache_ttl:
+                    return count, 'cached'
+            count = self._exact_count(cursor, table_name)
+            with self._state_lock:
+                # Only cache the count if no write raced with it.
+                if self._table_versions.get(key, 0) == version and self._read_settled():
+                    self._row_counts[key] = (count, version, time.monotonic())
+            return count, 'exact'
+        return self._exact_count(cursor, table_name), 'exact'
+    
+    def ping(self):
+        """Run a trivial query on a connection; raises if the database can't be reached."""
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+        finally:
+            conn.close()
+    
+    def pool_stats(self) -> Dict[str, Any]:
+        """Return connection pool statistics (adapters without a pool report it as disabled)."""
+        return {'enabled': False}
+    
+    def _default_executor_workers(self) -> int:
+        return os.cpu_count() or 4
+    
+    @property
+    def executor(self) -> BoundedExecutor:
+        """The adapter's bounded thread pool, created on first use."""
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = BoundedExecutor(
+                        self.executor_workers or self._default_executor_workers(),
+                        self.executor_queue,
+                        name=f'{type(self).__name__}-executor'
+                    )
+        return self._executor
+    
+    def call(self, method, *args, **kwargs):
+        """
+        Run a blocking adapter call, on the executor when ``use_executor`` is set.
+        
+        Raises ExecutorSaturated when the executor's queue is full.
+        """
+        if not self.use_executor:
+            return method(*args, **kwargs)
+        return self.executor.call(method, *args, **kwargs)
+    
+    def executor_stats(self) -> Dict[str, Any]:
+        """Return executor statistics (reported as disabled until it is first used)."""
+        executor = self._executor
+        if executor is None:
+            return {'enabled': False}
+        return executor.stats()
+    
+    def close(self):
+        """Release any connections and worker threads held by the adapter."""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+    
+    def reset_after_fork(self):
+        """
+        Forget state inherited from the parent process; call in a child right after fork.
+        
+        Locks may have been held by parent threads that don't exist here, the
+        executor's threads are gone, and caches describe the parent's writes.
+        Subclasses also drop their connection pools.
+        """
+        self._state_lock = threading.Lock()
+        self._executor_lock = threading.Lock()
+        self._executor = None
+        self._instance_token = uuid.uuid4().hex
+        self._table_versions = {}
+        self._row_counts = {}
+        self._metadata = {}
+        self._running_queries = {}
+        self.query_cache = QueryResultCache(self.query_cache.max_bytes, self.query_cache.ttl)
+        self.slow_log = SlowQueryLog(self.slow_log.threshold_ms, self.slow_log.size)
+        self.index_advisor = IndexAdvisor(self.index_advisor.size)
+        self._stats_lock = threading.Lock()
+        self._column_stats = {}
+        self._stats_loading = {}
+    
+    def _abandon_pool(self):
+        """
+        Drop an inherited pool without closing its connections.
+        
+        The connections share sockets and file locks with the parent, so closing
+        them would also end the parent's sessions; they are kept referenced so
+        garbage collection doesn't close them either.
+        """
+        if self._pool is not None:
+            _inherited_pools.append(self._pool)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+
+# PRAGMAs applied to every new SQLite connection. WAL lets readers keep going
+# while a writer commits; the rest trade a little durability and memory for speed.
+SQLITE_DEFAULT_PRAGMAS: Dict[str, str] = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': '-16000',
+    'mmap_size': '134217728',
+    'temp_store': 'MEMORY',
+    'busy_timeout': '5000',
+}
+
+
+def parse_pragmas(spec: str) -> Dict[str, str]:
+    """Parse a ``name=value;name=value`` PRAGMA profile (commas also separate entries)."""
+    pragmas = {}
+    for item in spec.replace(',', ';').split(';'):
+        if not item.strip():
+            continue
+        name, sep, value = item.partition('=')
+        name, value = name.strip().lower(), value.strip()
+        if not sep or not name.replace('_', '').isalnum() or not value.replace('-', '').replace('_', '').isalnum():
+            raise ValueError(f'Invalid PRAGMA setting "{item.strip()}"')
+        pragmas[name] = value
+    return pragmas
 
 
 class SQLiteAdapter(DatabaseAdapter):
     """SQLite database adapter."""
     
-    def __init__(self, db_path: str):
+    # VM instructions between checks for a query's timeout or cancellation
+    PROGRESS_INTERVAL = 1000
+    # Runs of consecutive row ids read by a table statistics sample
+    STATS_SAMPLE_BLOCKS = 100
+    
+    def __init__(self, db_path: str, persistent: bool = True, pragmas: Optional[Dict[str, str]] = None,
+                 pool_max: int = 10, pool_timeout: float = 30.0,
+                 group_commit: bool = False, group_commit_window: float = 0.001, group_commit_max_ops: int = 100):
+        """
+        With ``persistent``, connections are kept open in a pool shared by all
+        threads, at most ``pool_max`` of them; a caller waits up to
+        ``pool_timeout`` seconds for one. With ``group_commit``, single-row inserts, updates and deletes are
+        committed in batches by one writer thread (see ``WriteCoalescer``),
+        gathered over ``group_commit_window`` seconds, at most
+        ``group_commit_max_ops`` per transaction.
+        """
+        super().__init__()
         self.db_path = db_path
+        self.persistent = persistent
+        self.pragmas = dict(SQLITE_DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self.pool_max = pool_max
+        self.pool_timeout = pool_timeout
+        self._pool: Optional[ConnectionPool] = None
+        self._pool_lock = threading.Lock()
+        self.group_commit = group_commit
+        self.group_commit_window = group_commit_window
+        self.group_commit_max_ops = group_commit_max_ops
+        self._coalescer: Optional[WriteCoalescer] = None
+        # Table names as sqlite_master stores them, by their lowercase form
+        self._table_names: Dict[str, str] = {}
     
-    def get_connection(self):
-        conn = sqlite3.connect(self.db_path)
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=not self.persistent, cached_statements=256)
         conn.row_factory = sqlite3.Row
+        # journal_mode is stored in the database file, so only switch it when needed.
+        journal_mode = self.pragmas.get('journal_mode')
+        if journal_mode and conn.execute('PRAGMA journal_mode').fetchone()[0].upper() != journal_mode.upper():
+            conn.execute(f'PRAGMA journal_mode = {journal_mode}')
+        for name, value in self.pragmas.items():
+            if name != 'journal_mode':
+                conn.execute(f'PRAGMA {name} = {value}')
         return conn
     
-    def get_tables(self) -> List[str]:
+    @staticmethod
+    def _reset(conn):
+        if conn.in_transaction:
+            conn.rollback()
+    
+    def get_connection(self):
+        if not self.persistent:
+            return self._connect()
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ConnectionPool(self._connect, min_size=0, max_size=self.pool_max,
+                                                timeout=self.pool_timeout, reset=self._reset)
+        return self._pool.getconn()
+    
+    def pool_stats(self) -> Dict[str, Any]:
+        if not self.persistent:
+            stats = {'enabled': False}
+        else:
+            stats = self._pool.stats() if self._pool is not None else {'size': 0, 'max_size': self.pool_max}
+            stats.update({'enabled': True, 'mode': 'shared', 'pragmas': self.pragmas})
+        if self._coalescer is not None:
+            stats['group_commit'] = self._coalescer.stats()
+        return stats
+    
+    def _default_executor_workers(self) -> int:
+        # More workers than pooled connections would only queue on the pool.
+        return self.pool_max if self.persistent else super()._default_executor_workers()
+    
+    def _write(self, op):
+        """
+        Run ``op(cursor)`` as a transaction of its own and return its result,
+        or as part of a group commit when ``group_commit`` is on. Raises if
+        the write (or its commit) fails, after rolling it back.
+        """
+        if self.group_commit:
+            if self._coalescer is None:
+                with self._pool_lock:
+                    if self._coalescer is None:
+                        self._coalescer = WriteCoalescer(self._connect, self.group_commit_window,
+                                                         self.group_commit_max_ops, name='dashtools-sqlite-writer')
+            return self._coalescer.submit(op)
+        conn = self.get_connection()
+        try:
+            result = op(conn.cursor())
+            conn.commit()
+            return result
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
+    def close(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+            coalescer, self._coalescer = self._coalescer, None
+        if coalescer is not None:
+            coalescer.close()
+        if pool is not None:
+            pool.close()
+        super().close()
+    
+    def reset_after_fork(self):
+        super().reset_after_fork()
+        # The writer thread didn't survive the fork; its connection is the parent's.
+        if self._coalescer is not None:
+            _inherited_pools.append(self._coalescer)
+        self._coalescer = None
+        self._abandon_pool()
+    
+    def _schema_stamp(self) -> Any:
+        conn = self.get_connection()
+        try:
+            return conn.execute("PRAGMA schema_version").fetchone()[0]
+        finally:
+            conn.close()
+    
+    def _table_key(self, table_name: str) -> str:
+        # SQLite matches table names case-insensitively, so "People" and
+        # "people" are one table; use the name sqlite_master lists, as the
+        # query cache does. Names are known once the table list was loaded.
+        return self._table_names.get(table_name.lower(), table_name)
+    
+    def _load_tables(self) -> List[str]:
         conn = self.get_connection()
         try:
             cursor = conn.cursor()
             cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-            return [row[0] for row in cursor.fetchall()]
+            tables = [row[0] for row in cursor.fetchall()]
+            # Kept after a drop, so the drop's own invalidation still finds the name.
+            self._table_names = {**self._table_names, **{name.lower(): name for name in tables}}
+            return tables
         finally:
             conn.close()
     
-    def get_table_schema(self, table_name: str) -> List[Dict[str, Any]]:
+    def _load_table_schema(self, table_name: str) -> List[Dict[str, Any]]:
         conn = self.get_connection()
         try:
             cursor = conn.cursor()
@@ -104,6 +1742,84 @@ class SQLiteAdapter(DatabaseAdapter):
         finally:
             conn.close()
     
+    def _load_table_indexes(self, table_name: str) -> List[Dict[str, Any]]:
+        indexes = []
+        # An INTEGER PRIMARY KEY is the rowid itself, which keys the table's own b-tree.
+        pk_columns = [col for col in self.get_table_schema(table_name) if col['pk']]
+        if len(pk_columns) == 1 and pk_columns[0]['type'].upper() == 'INTEGER':
+            indexes.append({'name': 'rowid', 'columns': [pk_columns[0]['name']], 'unique': True,
+                            'primary': True, 'partial': False, 'method': 'rowid'})
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            # seq, name, unique, origin (c, u or pk), partial
+            cursor.execute(f'PRAGMA index_list({quote_identifier(table_name)})')
+            for row in cursor.fetchall():
+                info = conn.execute(f'PRAGMA index_info({quote_identifier(row[1])})').fetchall()
+                indexes.append({
+                    'name': row[1],
+                    'columns': [col[2] for col in sorted(info, key=lambda col: col[0])],
+                    'unique': bool(row[2]),
+                    'primary': row[3] == 'pk',
+                    'partial': bool(row[4]),
+                    'method': 'btree'
+                })
+            return indexes
+        finally:
+            conn.close()
+    
+    def _index_sizes(self, table_name: str) -> Dict[str, int]:
+        conn = self.get_connection()
+        try:
+            # dbstat is an optional SQLite build feature.
+            rows = conn.execute(
+                "SELECT s.name, SUM(s.pgsize) FROM dbstat s JOIN sqlite_master m ON m.name = s.name "
+                "WHERE m.type = 'index' AND m.tbl_name = ? GROUP BY s.name", (table_name,)
+            ).fetchall()
+            return {row[0]: row[1] for row in rows}
+        except sqlite3.OperationalError:
+            return {}
+        finally:
+            conn.close()
+    
+    def create_index(self, table_name: str, columns: List[str], name: Optional[str] = None,
+                     unique: bool = False, concurrently: bool = False) -> Tuple[bool, Optional[str]]:
+        if concurrently:
+            return False, 'CONCURRENTLY is only available on PostgreSQL'
+        try:
+            sql, name = self._index_statement(table_name, columns, name, unique)
+        except ValueError as e:
+            return False, str(e)
+        conn = self.get_connection()
+        try:
+            conn.execute(sql)
+            conn.commit()
+            self._note_ddl(table_name)
+            return True, None
+        except Exception as e:
+            conn.rollback()
+            return False, str(e)
+        finally:
+            conn.close()
+    
+    def drop_index(self, table_name: str, index_name: str, concurrently: bool = False) -> Tuple[bool, Optional[str]]:
+        if concurrently:
+            return False, 'CONCURRENTLY is only available on PostgreSQL'
+        error = self._droppable_index(table_name, index_name)
+        if error:
+            return False, error
+        conn = self.get_connection()
+        try:
+            conn.execute(f'DROP INDEX {quote_identifier(index_name)}')
+            conn.commit()
+            self._note_ddl(table_name)
+            return True, None
+        except Exception as e:
+            conn.rollback()
+            return False, str(e)
+        finally:
+            conn.close()
+    
     def create_table(self, table_name: str, columns: List[Dict[str, str]]) -> Tuple[bool, Optional[str]]:
         if not table_name or not columns:
             return False, 'Table name and at least one column are required'
@@ -127,9 +1843,8 @@ class SQLiteAdapter(DatabaseAdapter):
                 if not col_name.replace('_', '').replace('$', '').isalnum():
                     return False, f'Column name "{col_name}" must contain only alphanumeric characters, underscores, or dollar signs'
                 
-                valid_types = ['TEXT', 'INTEGER', 'REAL', 'BLOB', 'NUMERIC']
-                if col_type not in valid_types:
-                    return False, f'Invalid column type "{col_type}". Must be one of: {", ".join(valid_types)}'
+                if col_type not in COLUMN_TYPES:
+                    return False, f'Invalid column type "{col_type}". Must be one of: {", ".join(COLUMN_TYPES)}'
                 
                 col_def = f'"{col_name}" {col_type}'
                 if col_pk:
@@ -145,6 +1860,7 @@ class SQLiteAdapter(DatabaseAdapter):
             sql = f'CREATE TABLE IF NOT EXISTS "{table_name}" ({", ".join(column_defs)})'
             cursor.execute(sql)
             conn.commit()
+            self._note_ddl(table_name)
             return True, None
         except Exception as e:
             conn.rollback()
@@ -158,6 +1874,7 @@ class SQLiteAdapter(DatabaseAdapter):
             cursor = conn.cursor()
             cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
             conn.commit()
+            self._note_ddl(table_name)
             return True
         except Exception as e:
             conn.rollback()
@@ -174,6 +1891,7 @@ class SQLiteAdapter(DatabaseAdapter):
                 sql += f" DEFAULT {default_value}"
             cursor.execute(sql)
             conn.commit()
+            self._note_ddl(table_name)
             return True
         except Exception as e:
             conn.rollback()
@@ -181,85 +1899,337 @@ class SQLiteAdapter(DatabaseAdapter):
         finally:
             conn.close()
     
-    def get_table_data(self, table_name: str, limit: int = 100, offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+    def _estimated_count(self, cursor, table_name: str) -> Optional[int]:
+        # sqlite_stat1 is only populated by ANALYZE; the first number of each
+        # entry is the row count of the table or index it describes.
+        try:
+            cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = ?", (table_name,))
+        except sqlite3.OperationalError:
+            return None
+        counts = [int(row[0].split()[0]) for row in cursor.fetchall() if row[0]]
+        return max(counts) if counts else None
+    
+    def _inserted_row(self, cursor, table_name: str) -> Optional[tuple]:
+        """Read back the row the cursor just inserted, or None (e.g. for WITHOUT ROWID tables)."""
+        try:
+            cursor.execute(f'SELECT * FROM {quote_identifier(table_name)} WHERE rowid = ?', (cursor.lastrowid,))
+            row = cursor.fetchone()
+        except sqlite3.Error:
+            return None
+        return tuple(row) if row is not None else None
+    
+    def _stats_sample(self, cursor, table_name: str, sample_rows: int) -> Optional[Tuple[str, List[Any], float]]:
+        # SQLite has no TABLESAMPLE: read STATS_SAMPLE_BLOCKS runs of row ids,
+        # one at a random place in each equal slice of the row id range. Each
+        # run is an index range on the table's b-tree, so only the sampled
+        # pages are read.
+        table = quote_identifier(table_name)
+        try:
+            cursor.execute(f'SELECT MIN(rowid), MAX(rowid) FROM {table}')
+        except sqlite3.OperationalError:
+            return None
+        low, high = cursor.fetchone()
+        if low is None:
+            return None
+        span = high - low + 1
+        estimate = self._estimated_count(cursor, table_name) or span
+        if estimate <= sample_rows:
+            return None
+        blocks = min(self.STATS_SAMPLE_BLOCKS, sample_rows)
+        stride = span / blocks
+        width = max(int(stride * sample_rows / estimate), 1)
+        params: List[Any] = []
+        for block in range(blocks):
+            start = low + int(block * stride) + random.randrange(max(int(stride) - width, 0) + 1)
+            params += [start, start + width - 1]
+        conditions = ' OR '.join(['rowid BETWEEN ? AND ?'] * blocks)
+        return f'SELECT * FROM {table} WHERE {conditions}', params, min(blocks * width / span, 1.0)
+    
+    def get_table_data(self, table_name: str, limit: int = 100, offset: int = 0,
+                       after: Optional[str] = None, sort_column: Optional[str] = None,
+                       keyset: bool = False, count_strategy: Optional[str] = None,
+                       row_format: str = 'records', where: Any = None, order_by: Optional[str] = None,
+                       search: Optional[str] = None) -> Tuple[List[Any], int, Dict[str, Any]]:
+        columnar = check_row_format(row_format)
+        keyset = keyset or after is not None
+        if keyset and order_by:
+            raise ValueError('order_by cannot be combined with keyset pagination; use sort_column')
+        filters = self._table_filters(table_name, where, order_by, search)
+        query = self._keyset_query(table_name, limit, after, sort_column, filters) if keyset else None
         conn = self.get_connection()
         try:
             cursor = conn.cursor()
-            cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-            total = cursor.fetchone()[0]
-            cursor.execute(f"SELECT * FROM {table_name} LIMIT ? OFFSET ?", (limit, offset))
-            rows = [dict(row) for row in cursor.fetchall()]
-            return rows, total
+            total, strategy = self._count_rows(cursor, table_name, count_strategy, filters)
+            page = {'count_strategy': strategy, 'format': row_format}
+            if filters:
+                page['index_hints'] = filters['index_hints']
+            if columnar:
+                # Plain tuples: no sqlite3.Row, let alone a dict, per row.
+                cursor.row_factory = None
+            if keyset:
+                sql, params, keys = query
+                rows = self._fetch_logged(cursor, 'table_data', sql, params, columnar, filters and filters['pattern'])
+                columns = [col[0] for col in cursor.description] if columnar else None
+                rows, page['next_cursor'] = self._keyset_page(rows, keys, limit, sort_column, columns)
+            else:
+                sql, params = self._offset_query(table_name, limit, offset, filters)
+                rows = self._fetch_logged(cursor, 'table_data', sql, params, columnar, filters and filters['pattern'])
+                columns = [col[0] for col in cursor.description] if columnar else None
+            if columnar:
+                page['columns'] = [name for name in columns if not name.startswith('__keyset_')]
+                rows = layout_rows(page['columns'], rows, row_format)
+            return rows, total, page
         finally:
             conn.close()
     
     def insert_row(self, table_name: str, data: Dict[str, Any]) -> bool:
-        conn = self.get_connection()
-        try:
-            cursor = conn.cursor()
+        def insert(cursor):
             columns = ', '.join(data.keys())
             placeholders = ', '.join(['?' for _ in data])
             cursor.execute(f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})", list(data.values()))
-            conn.commit()
-            return True
+            return self._inserted_row(cursor, table_name) if self._stats_cached(table_name) else None
+        
+        try:
+            row = self._write(insert)
         except Exception as e:
-            conn.rollback()
             return False
-        finally:
-            conn.close()
+        self._note_change(table_name, inserted=1, row=row)
+        return True
     
     def update_row(self, table_name: str, row_id: int, data: Dict[str, Any], id_column: str = 'id') -> bool:
-        conn = self.get_connection()
-        try:
-            cursor = conn.cursor()
+        def update(cursor):
             set_clause = ', '.join([f"{key} = ?" for key in data.keys()])
             cursor.execute(f"UPDATE {table_name} SET {set_clause} WHERE {id_column} = ?", list(data.values()) + [row_id])
-            conn.commit()
-            return cursor.rowcount > 0
+            return cursor.rowcount
+        
+        try:
+            updated = self._write(update)
         except Exception as e:
-            conn.rollback()
             return False
-        finally:
-            conn.close()
+        self._note_change(table_name, updated=updated)
+        return updated > 0
     
     def delete_row(self, table_name: str, row_id: int, id_column: str = 'id') -> bool:
+        def delete(cursor):
+            cursor.execute(f"DELETE FROM {table_name} WHERE {id_column} = ?", (row_id,))
+            return cursor.rowcount
+        
+        try:
+            deleted = self._write(delete)
+        except Exception as e:
+            return False
+        self._note_change(table_name, deleted=deleted)
+        return deleted > 0
+    
+    def _execute_query(self, query: str, handle: Dict[str, Any]) -> Tuple[Optional[List[Any]], Optional[str], Optional[str]]:
         conn = self.get_connection()
+        deadline = handle['deadline']
+        
+        def interrupted():
+            # Non-zero makes SQLite abort the running statement.
+            return handle['cancelled'] or (deadline is not None and time.monotonic() >= deadline)
+        
+        conn.set_progress_handler(interrupted, self.PROGRESS_INTERVAL)
+        cursor = None
         try:
+            if not self._set_canceller(handle, conn.interrupt):
+                return None, 'Query was cancelled', None
             cursor = conn.cursor()
-            cursor.execute(f"DELETE FROM {table_name} WHERE {id_column} = ?", (row_id,))
-            conn.commit()
-            return cursor.rowcount > 0
+            if handle['columnar']:
+                cursor.row_factory = None
+            cursor.execute(query)
+            rows, truncated_by = self._fetch_limited(cursor, handle)
+            return rows, None, truncated_by
         except Exception as e:
-            conn.rollback()
-            return False
+            return None, self._query_error(e, handle), None
         finally:
+            self._set_canceller(handle, None)
+            if cursor is not None:
+                cursor.close()
+            conn.set_progress_handler(None, 0)
             conn.close()
     
-    def execute_query(self, query: str) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str]]:
-        if not query.strip().upper().startswith('SELECT'):
-            return None, "Only SELECT queries are allowed"
+    def _explain(self, query: str, analyze: bool) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        if analyze:
+            return None, "EXPLAIN ANALYZE is only available on PostgreSQL"
         conn = self.get_connection()
         try:
             cursor = conn.cursor()
-            cursor.execute(query)
-            return [dict(row) for row in cursor.fetchall()], None
+            cursor.execute(f'EXPLAIN QUERY PLAN {query}')
+            depths = {0: -1}
+            plan = []
+            for node_id, parent, _, detail in cursor.fetchall():
+                depths[node_id] = depths.get(parent, -1) + 1
+                plan.append({'id': node_id, 'parent': parent, 'depth': depths[node_id], 'detail': detail})
+            text = '\n'.join('  ' * node['depth'] + node['detail'] for node in plan)
+            return {'analyze': False, 'plan': plan, 'text': text}, None
         except Exception as e:
             return None, str(e)
         finally:
             conn.close()
+    
+    def _begin(self, cursor):
+        if not cursor.connection.in_transaction:
+            cursor.execute('BEGIN')
+    
+    def _insert_many(self, cursor, table_name: str, columns: List[str], values: List[List[Any]]):
+        column_list = ', '.join(quote_identifier(col) for col in columns)
+        placeholders = ', '.join('?' for _ in columns)
+        cursor.executemany(f'INSERT INTO {quote_identifier(table_name)} ({column_list}) VALUES ({placeholders})', values)
+    
+    def _import_chunks(self, table_name: str, columns: List[str], rows: Iterator[List[Any]],
+                       chunk_size: int, progress: Dict[str, Any]):
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            # Bulk loads don't need an fsync per commit; a crash mid-import
+            # can lose recent chunks but not corrupt the database.
+            synchronous = cursor.execute('PRAGMA synchronous').fetchone()[0]
+            cursor.execute('PRAGMA synchronous = OFF')
+        except Exception:
+            conn.close()
+            raise
+        try:
+            while True:
+                chunk = list(itertools.islice(rows, chunk_size))
+                if not chunk:
+                    break
+                self._begin(cursor)
+                try:
+                    self._insert_many(cursor, table_name, columns, chunk)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                progress['imported'] += len(chunk)
+                progress['chunks'] += 1
+        finally:
+            try:
+                cursor.execute(f'PRAGMA synchronous = {int(synchronous)}')
+            except Exception as e:
+                # Never hand a connection still running with synchronous=OFF to
+                # later writers; a failure here must not hide the import's own.
+                logger.warning("Could not restore PRAGMA synchronous after import, closing the connection: %s", e)
+                getattr(conn, 'discard', conn.close)()
+            else:
+                conn.close()
+    
+    def _stream(self, sql: str, params: Optional[List[Any]], batch_size: int) -> Iterator[Tuple[List[str], List[tuple]]]:
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            cursor.execute(sql, params or ())
+            columns = [col[0] for col in cursor.description or ()]
+            batch = cursor.fetchmany(batch_size)
+            yield columns, batch
+            while batch:
+                batch = cursor.fetchmany(batch_size)
+                if batch:
+                    yield columns, batch
+            cursor.close()
+        finally:
+            conn.close()
+
+
+class _CopyWriter:
+    """
+    File-like sink for ``copy_expert`` that hands data to another thread.
+    
+    COPY output arrives one row per ``write``; it is coalesced into chunks of
+    ``chunk_size`` bytes and pushed through a bounded queue, so a slow client
+    applies back-pressure to the COPY instead of growing memory.
+    """
+    
+    def __init__(self, chunks: 'queue.Queue', chunk_size: int = 65536):
+        self.chunks = chunks
+        self.chunk_size = chunk_size
+        self.cancelled = False
+        self._buffer: List[bytes] = []
+        self._buffered = 0
+    
+    def put(self, item: Any):
+        while True:
+            if self.cancelled:
+                raise IOError('Export cancelled by the client')
+            try:
+                self.chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+    
+    def write(self, data: bytes):
+        self._buffer.append(data)
+        self._buffered += len(data)
+        if self._buffered >= self.chunk_size:
+            self.flush()
+    
+    def flush(self):
+        if self._buffer:
+            chunk = b''.join(self._buffer)
+            self._buffer, self._buffered = [], 0
+            self.put(chunk)
 
 
 class PostgreSQLAdapter(DatabaseAdapter):
     """PostgreSQL database adapter."""
     
-    def __init__(self, host: str, port: int, user: str, password: str, database: str):
+    PLACEHOLDER = '%s'
+    ROWID_COLUMN = 'ctid'
+    ROWID_PLACEHOLDER = '%s::tid'
+    NO_LIMIT = 'ALL'
+    ILIKE = 'ILIKE'
+    # Seconds a replica is behind the primary; 0 when it has replayed all it received
+    # (an idle primary sends nothing, so the last replayed commit can be old without any lag)
+    REPLICA_LAG_SQL = (
+        'SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 '
+        'WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+        'ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END'
+    )
+    
+    def __init__(self, host: str, port: int, user: str, password: str, database: str,
+                 pool_enabled: bool = True, pool_min: int = 1, pool_max: int = 10,
+                 pool_timeout: float = 30.0, pool_max_uses: int = 0, pool_max_age: float = 0.0,
+                 pool_ping_query: bool = False, replicas: Optional[List[Dict[str, Any]]] = None,
+                 replica_max_lag: float = 5.0, replica_sticky: Optional[float] = None,
+                 replica_check_interval: float = 5.0, replica_retry: float = 30.0):
+        """
+        ``replicas`` are the connection settings (host, port, user, password,
+        database) of read replicas. Read-only statements are spread over the
+        ones that are up and at most ``replica_max_lag`` seconds behind; after
+        a write, the writing session reads from the primary for
+        ``replica_sticky`` seconds (default: the lag tolerance) so it sees its
+        own writes.
+        """
+        _import_psycopg2()
+        super().__init__()
         self.host = host
         self.port = port
         self.user = user
         self.password = password
         self.database = database
+        self.pool_enabled = pool_enabled
+        self.pool_min = pool_min
+        self.pool_max = pool_max
+        self.pool_timeout = pool_timeout
+        self.pool_max_uses = pool_max_uses
+        self.pool_max_age = pool_max_age
+        self.pool_ping_query = pool_ping_query
+        self._pool: Optional[ConnectionPool] = None
+        self._pool_lock = threading.Lock()
+        self.replicas = list(replicas or [])
+        self.replica_max_lag = replica_max_lag
+        self.replica_sticky = replica_sticky if replica_sticky is not None else (replica_max_lag or 5.0)
+        self.replica_check_interval = replica_check_interval
+        self.replica_retry = replica_retry
+        self._replicas = self._replica_set()
+        # session -> monotonic time until which its reads stay on the primary
+        self._pinned: Dict[Optional[str], float] = {}
+        self._last_write = float('-inf')
+        # Whether this thread's last read came from a replica
+        self._local = threading.local()
     
-    def get_connection(self):
+    def _connect(self):
         return psycopg2.connect(
             host=self.host,
             port=self.port,
@@ -268,7 +2238,157 @@ class PostgreSQLAdapter(DatabaseAdapter):
             database=self.database
         )
     
-    def get_tables(self) -> List[str]:
+    def _ping(self, conn) -> bool:
+        """Check that a pooled connection is still usable before handing it out."""
+        if conn.closed:
+            return False
+        if conn.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if self.pool_ping_query:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            conn.rollback()
+        return True
+    
+    @staticmethod
+    def _reset(conn):
+        """Roll back whatever the borrower left open so the next one starts clean."""
+        if conn.closed:
+            raise psycopg2.InterfaceError('connection already closed')
+        if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            conn.rollback()
+        if conn.autocommit:
+            conn.autocommit = False
+    
+    def _get_pool(self) -> ConnectionPool:
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ConnectionPool(
+                        self._connect,
+                        min_size=self.pool_min,
+                        max_size=self.pool_max,
+                        timeout=self.pool_timeout,
+                        max_uses=self.pool_max_uses,
+                        max_age=self.pool_max_age,
+                        ping=self._ping,
+                        reset=self._reset,
+                    )
+        return self._pool
+    
+    def get_connection(self):
+        if not self.pool_enabled:
+            return self._connect()
+        return self._get_pool().getconn()
+    
+    def _replica_set(self) -> Optional[ReplicaSet]:
+        if not self.replicas:
+            return None
+        
+        def new_pool(settings: Dict[str, Any]):
+            # Replicas are always pooled, sized like the primary's pool.
+            return lambda: ConnectionPool(
+                lambda: psycopg2.connect(**settings),
+                min_size=min(self.pool_min, self.pool_max),
+                max_size=self.pool_max,
+                timeout=self.pool_timeout,
+                max_uses=self.pool_max_uses,
+                max_age=self.pool_max_age,
+                ping=self._ping,
+                reset=self._reset,
+            )
+        
+        return ReplicaSet(
+            {f"{settings['host']}:{settings['port']}": new_pool(settings) for settings in self.replicas},
+            self._replica_lag,
+            max_lag=self.replica_max_lag,
+            check_interval=self.replica_check_interval,
+            retry_interval=self.replica_retry,
+        )
+    
+    def _replica_lag(self, conn) -> float:
+        cursor = conn.cursor()
+        cursor.execute(self.REPLICA_LAG_SQL)
+        return float(cursor.fetchone()[0])
+    
+    def _read_connection(self):
+        """A replica connection, unless none is usable or this session has just written."""
+        self._local.replica = False
+        if self._replicas is not None:
+            with self._state_lock:
+                pinned = self._pinned.get(_session.get(), 0.0) > time.monotonic()
+            if not pinned:
+                conn = self._replicas.getconn()
+                if conn is not None:
+                    self._local.replica = True
+                    return conn
+        return self.get_connection()
+    
+    def _read_settled(self) -> bool:
+        # Replicas lag by at most replica_max_lag, so once that long has passed since
+        # this process last wrote, whatever they return is current for it. Without
+        # a lag bound, replica reads are never settled.
+        if not getattr(self._local, 'replica', False):
+            return True
+        return bool(self.replica_max_lag) and time.monotonic() - self._last_write >= self.replica_max_lag
+    
+    def _pin_session(self):
+        """Keep the current session's reads on the primary for ``replica_sticky`` seconds."""
+        if self._replicas is None:
+            return
+        now = time.monotonic()
+        with self._state_lock:
+            self._last_write = now
+            if len(self._pinned) >= 10000:
+                self._pinned = {session: until for session, until in self._pinned.items() if until > now}
+            self._pinned[_session.get()] = now + self.replica_sticky
+    
+    def _note_change(self, table_name: str, inserted: int = 0, deleted: int = 0, updated: int = 0,
+                     row: Optional[Any] = None):
+        super()._note_change(table_name, inserted, deleted, updated, row)
+        self._pin_session()
+    
+    def _note_ddl(self, table_name: str):
+        super()._note_ddl(table_name)
+        self._pin_session()
+    
+    def pool_stats(self) -> Dict[str, Any]:
+        if not self.pool_enabled:
+            stats = {'enabled': False}
+        elif self._pool is None:
+            stats = {'enabled': True, 'size': 0, 'idle': 0, 'in_use': 0,
+                     'min_size': self.pool_min, 'max_size': self.pool_max}
+        else:
+            stats = self._pool.stats()
+            stats['enabled'] = True
+        if self._replicas is not None:
+            stats['replicas'] = self._replicas.stats()
+        return stats
+    
+    def _default_executor_workers(self) -> int:
+        # More workers than connections would only queue on the pool instead.
+        return self.pool_max if self.pool_enabled else super()._default_executor_workers()
+    
+    def close(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close()
+        if self._replicas is not None:
+            self._replicas.close()
+        super().close()
+    
+    def reset_after_fork(self):
+        super().reset_after_fork()
+        self._abandon_pool()
+        if self._replicas is not None:
+            _inherited_pools.extend(self._replicas.pools())
+            self._replicas = self._replica_set()
+        self._pinned = {}
+        self._last_write = float('-inf')
+        self._local = threading.local()
+    
+    def _load_tables(self) -> List[str]:
         conn = self.get_connection()
         try:
             cursor = conn.cursor()
@@ -281,34 +2401,126 @@ class PostgreSQLAdapter(DatabaseAdapter):
         finally:
             conn.close()
     
-    def get_table_schema(self, table_name: str) -> List[Dict[str, Any]]:
+    def _load_table_schema(self, table_name: str) -> List[Dict[str, Any]]:
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            # Reads pg_catalog directly: the information_schema views join
+            # through privilege checks and constraint tables for every column
+            # in the database and get slow on large catalogs.
+            cursor.execute("""
+                SELECT
+                    a.attnum as cid,
+                    a.attname as name,
+                    format_type(a.atttypid, NULL) as type,
+                    a.attnotnull as notnull,
+                    pg_get_expr(d.adbin, d.adrelid) as default_value,
+                    COALESCE(a.attnum = ANY(i.indkey), false) as pk
+                FROM pg_attribute a
+                LEFT JOIN pg_attrdef d
+                    ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+                LEFT JOIN pg_index i
+                    ON i.indrelid = a.attrelid AND i.indisprimary
+                WHERE a.attrelid = to_regclass(%s)
+                    AND a.attnum > 0
+                    AND NOT a.attisdropped
+                ORDER BY a.attnum
+            """, (quote_identifier(table_name),))
+            return [dict(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+    
+    def _load_table_indexes(self, table_name: str) -> List[Dict[str, Any]]:
         conn = self.get_connection()
         try:
             cursor = conn.cursor(cursor_factory=RealDictCursor)
+            # Expression columns have attnum 0 and come back as NULL names.
             cursor.execute("""
-                SELECT 
-                    ordinal_position as cid,
-                    column_name as name,
-                    data_type as type,
-                    is_nullable = 'NO' as notnull,
-                    column_default as default_value,
-                    CASE WHEN pk.column_name IS NOT NULL THEN true ELSE false END as pk
-                FROM information_schema.columns
-                LEFT JOIN (
-                    SELECT ku.column_name
-                    FROM information_schema.table_constraints tc
-                    JOIN information_schema.key_column_usage ku
-                        ON tc.constraint_name = ku.constraint_name
-                    WHERE tc.constraint_type = 'PRIMARY KEY'
-                        AND tc.table_name = %s
-                ) pk ON information_schema.columns.column_name = pk.column_name
-                WHERE table_name = %s
-                ORDER BY ordinal_position
-            """, (table_name, table_name))
+                SELECT
+                    c.relname as name,
+                    ARRAY(
+                        SELECT a.attname
+                        FROM unnest(i.indkey) WITH ORDINALITY AS k(attnum, n)
+                        LEFT JOIN pg_attribute a
+                            ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+                        ORDER BY k.n
+                    ) as columns,
+                    i.indisunique as unique,
+                    i.indisprimary as primary,
+                    i.indpred IS NOT NULL as partial,
+                    am.amname as method
+                FROM pg_index i
+                JOIN pg_class c ON c.oid = i.indexrelid
+                JOIN pg_am am ON am.oid = c.relam
+                WHERE i.indrelid = to_regclass(%s)
+                ORDER BY c.relname
+            """, (quote_identifier(table_name),))
             return [dict(row) for row in cursor.fetchall()]
         finally:
             conn.close()
     
+    def _index_sizes(self, table_name: str) -> Dict[str, int]:
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT c.relname, pg_relation_size(c.oid)
+                FROM pg_index i
+                JOIN pg_class c ON c.oid = i.indexrelid
+                WHERE i.indrelid = to_regclass(%s)
+            """, (quote_identifier(table_name),))
+            return {row[0]: row[1] for row in cursor.fetchall()}
+        finally:
+            conn.close()
+    
+    def _run_index_ddl(self, sql: str, concurrently: bool):
+        """Run CREATE/DROP INDEX; CONCURRENTLY can't run inside a transaction block."""
+        conn = self.get_connection()
+        try:
+            if concurrently:
+                # The pool's reset turns autocommit back off when the connection is returned.
+                conn.autocommit = True
+            conn.cursor().execute(sql)
+            if not concurrently:
+                conn.commit()
+        except Exception:
+            if not concurrently:
+                conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
+    def create_index(self, table_name: str, columns: List[str], name: Optional[str] = None,
+                     unique: bool = False, concurrently: bool = False) -> Tuple[bool, Optional[str]]:
+        try:
+            sql, name = self._index_statement(table_name, columns, name, unique, concurrently)
+        except ValueError as e:
+            return False, str(e)
+        try:
+            self._run_index_ddl(sql, concurrently)
+        except Exception as e:
+            # A failed concurrent build leaves an INVALID index behind (unless the name was taken).
+            if concurrently and getattr(e, 'pgcode', None) != '42P07':
+                try:
+                    self._run_index_ddl(f'DROP INDEX CONCURRENTLY IF EXISTS {quote_identifier(name)}', True)
+                except Exception:
+                    pass
+            return False, str(e)
+        self._note_ddl(table_name)
+        return True, None
+    
+    def drop_index(self, table_name: str, index_name: str, concurrently: bool = False) -> Tuple[bool, Optional[str]]:
+        error = self._droppable_index(table_name, index_name)
+        if error:
+            return False, error
+        try:
+            self._run_index_ddl(f'DROP INDEX {"CONCURRENTLY " if concurrently else ""}{quote_identifier(index_name)}',
+                                concurrently)
+        except Exception as e:
+            return False, str(e)
+        self._note_ddl(table_name)
+        return True, None
+    
     def create_table(self, table_name: str, columns: List[Dict[str, str]]) -> Tuple[bool, Optional[str]]:
         if not table_name or not columns:
             return False, 'Table name and at least one column are required'
@@ -326,15 +2538,7 @@ class PostgreSQLAdapter(DatabaseAdapter):
                 if not col_name:
                     continue
                 
-                # Map SQLite types to PostgreSQL types
-                type_map = {
-                    'TEXT': 'TEXT',
-                    'INTEGER': 'INTEGER',
-                    'REAL': 'REAL',
-                    'BLOB': 'BYTEA',
-                    'NUMERIC': 'NUMERIC'
-                }
-                pg_type = type_map.get(col_type, 'TEXT')
+                pg_type = POSTGRES_TYPE_MAP.get(col_type, 'TEXT')
                 
                 col_def = f'"{col_name}" {pg_type}'
                 if col_pk:
@@ -350,6 +2554,7 @@ class PostgreSQLAdapter(DatabaseAdapter):
             sql = f'CREATE TABLE IF NOT EXISTS "{table_name}" ({", ".join(column_defs)})'
             cursor.execute(sql)
             conn.commit()
+            self._note_ddl(table_name)
             return True, None
         except Exception as e:
             conn.rollback()
@@ -363,6 +2568,7 @@ class PostgreSQLAdapter(DatabaseAdapter):
             cursor = conn.cursor()
             cursor.execute(f'DROP TABLE IF EXISTS "{table_name}"')
             conn.commit()
+            self._note_ddl(table_name)
             return True
         except Exception as e:
             conn.rollback()
@@ -374,13 +2580,13 @@ class PostgreSQLAdapter(DatabaseAdapter):
         conn = self.get_connection()
         try:
             cursor = conn.cursor()
-            type_map = {'TEXT': 'TEXT', 'INTEGER': 'INTEGER', 'REAL': 'REAL', 'BLOB': 'BYTEA', 'NUMERIC': 'NUMERIC'}
-            pg_type = type_map.get(column_type.upper(), 'TEXT')
+            pg_type = POSTGRES_TYPE_MAP.get(column_type.upper(), 'TEXT')
             sql = f'ALTER TABLE "{table_name}" ADD COLUMN "{column_name}" {pg_type}'
             if default_value is not None:
                 sql += f" DEFAULT {default_value}"
             cursor.execute(sql)
             conn.commit()
+            self._note_ddl(table_name)
             return True
         except Exception as e:
             conn.rollback()
@@ -388,14 +2594,63 @@ class PostgreSQLAdapter(DatabaseAdapter):
         finally:
             conn.close()
     
-    def get_table_data(self, table_name: str, limit: int = 100, offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
-        conn = self.get_connection()
+    def _estimated_count(self, cursor, table_name: str) -> Optional[int]:
+        # Same extrapolation the planner uses: tuple density from the last
+        # ANALYZE times the current number of pages. reltuples is -1 if the
+        # table has never been analyzed.
+        cursor.execute("""
+            SELECT CASE
+                WHEN reltuples < 0 OR relpages = 0 THEN NULL
+                ELSE (reltuples / relpages * (pg_relation_size(oid) / current_setting('block_size')::int))::bigint
+            END
+            FROM pg_class
+            WHERE oid = to_regclass(%s)
+        """, (quote_identifier(table_name),))
+        row = cursor.fetchone()
+        return row[0] if row else None
+    
+    def _stats_sample(self, cursor, table_name: str, sample_rows: int) -> Optional[Tuple[str, List[Any], float]]:
+        # SYSTEM sampling picks whole pages, so it reads about as many pages as
+        # it returns rows from. Tables never analyzed have no estimate and are scanned.
+        estimate = self._estimated_count(cursor, table_name)
+        if estimate is None or estimate <= sample_rows:
+            return None
+        percent = 100.0 * sample_rows / estimate
+        return f'SELECT * FROM {quote_identifier(table_name)} TABLESAMPLE SYSTEM (%s)', [percent], percent / 100
+    
+    def get_table_data(self, table_name: str, limit: int = 100, offset: int = 0,
+                       after: Optional[str] = None, sort_column: Optional[str] = None,
+                       keyset: bool = False, count_strategy: Optional[str] = None,
+                       row_format: str = 'records', where: Any = None, order_by: Optional[str] = None,
+                       search: Optional[str] = None) -> Tuple[List[Any], int, Dict[str, Any]]:
+        columnar = check_row_format(row_format)
+        keyset = keyset or after is not None
+        if keyset and order_by:
+            raise ValueError('order_by cannot be combined with keyset pagination; use sort_column')
+        filters = self._table_filters(table_name, where, order_by, search)
+        query = self._keyset_query(table_name, limit, after, sort_column, filters) if keyset else None
+        conn = self._read_connection()
         try:
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            cursor.execute(f'SELECT COUNT(*) FROM "{table_name}"')
-            total = cursor.fetchone()['count']
-            cursor.execute(f'SELECT * FROM "{table_name}" LIMIT %s OFFSET %s', (limit, offset))
-            return [dict(row) for row in cursor.fetchall()], total
+            cursor = conn.cursor()
+            total, strategy = self._count_rows(cursor, table_name, count_strategy, filters)
+            page = {'count_strategy': strategy, 'format': row_format}
+            if filters:
+                page['index_hints'] = filters['index_hints']
+            if not columnar:
+                cursor = conn.cursor(cursor_factory=RealDictCursor)
+            if keyset:
+                sql, params, keys = query
+                rows = self._fetch_logged(cursor, 'table_data', sql, params, columnar, filters and filters['pattern'])
+                columns = [col[0] for col in cursor.description] if columnar else None
+                rows, page['next_cursor'] = self._keyset_page(rows, keys, limit, sort_column, columns)
+            else:
+                sql, params = self._offset_query(table_name, limit, offset, filters)
+                rows = self._fetch_logged(cursor, 'table_data', sql, params, columnar, filters and filters['pattern'])
+                columns = [col[0] for col in cursor.description] if columnar else None
+            if columnar:
+                page['columns'] = [name for name in columns if not name.startswith('__keyset_')]
+                rows = layout_rows(page['columns'], rows, row_format)
+            return rows, total, page
         finally:
             conn.close()
     
@@ -405,8 +2660,13 @@ class PostgreSQLAdapter(DatabaseAdapter):
             cursor = conn.cursor()
             columns = ', '.join([f'"{k}"' for k in data.keys()])
             placeholders = ', '.join(['%s' for _ in data])
-            cursor.execute(f'INSERT INTO "{table_name}" ({columns}) VALUES ({placeholders})', list(data.values()))
+            # Cached column statistics take in the stored row, defaults included.
+            returning = ' RETURNING *' if self._stats_cached(table_name) else ''
+            cursor.execute(f'INSERT INTO "{table_name}" ({columns}) VALUES ({placeholders}){returning}',
+                           list(data.values()))
+            row = cursor.fetchone() if returning else None
             conn.commit()
+            self._note_change(table_name, inserted=1, row=row)
             return True
         except Exception as e:
             conn.rollback()
@@ -421,6 +2681,7 @@ class PostgreSQLAdapter(DatabaseAdapter):
             set_clause = ', '.join([f'"{key}" = %s' for key in data.keys()])
             cursor.execute(f'UPDATE "{table_name}" SET {set_clause} WHERE "{id_column}" = %s', list(data.values()) + [row_id])
             conn.commit()
+            self._note_change(table_name, updated=cursor.rowcount)
             return cursor.rowcount > 0
         except Exception as e:
             conn.rollback()
@@ -434,6 +2695,7 @@ class PostgreSQLAdapter(DatabaseAdapter):
             cursor = conn.cursor()
             cursor.execute(f'DELETE FROM "{table_name}" WHERE "{id_column}" = %s', (row_id,))
             conn.commit()
+            self._note_change(table_name, deleted=cursor.rowcount)
             return cursor.rowcount > 0
         except Exception as e:
             conn.rollback()
@@ -441,104 +2703,647 @@ class PostgreSQLAdapter(DatabaseAdapter):
         finally:
             conn.close()
     
-    def execute_query(self, query: str) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str]]:
-        if not query.strip().upper().startswith('SELECT'):
-            return None, "Only SELECT queries are allowed"
-        conn = self.get_connection()
+    def _execute_query(self, query: str, handle: Dict[str, Any]) -> Tuple[Optional[List[Any]], Optional[str], Optional[str]]:
+        conn = self._read_connection()
         try:
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            if not self._set_canceller(handle, conn.cancel):
+                return None, 'Query was cancelled', None
+            if handle['deadline'] is not None:
+                remaining = max(handle['deadline'] - time.monotonic(), 0.001)
+                conn.cursor().execute('SET LOCAL statement_timeout = %s', (int(remaining * 1000),))
+            factory = None if handle['columnar'] else RealDictCursor
+            if handle['max_rows'] is None and handle['max_bytes'] is None:
+                cursor = conn.cursor(cursor_factory=factory)
+            else:
+                # A server-side cursor lets a capped query stop before the
+                # whole result has been sent to this process.
+                cursor = conn.cursor(name=f'dashtools_query_{uuid.uuid4().hex}', cursor_factory=factory)
             cursor.execute(query)
-            return [dict(row) for row in cursor.fetchall()], None
+            rows, truncated_by = self._fetch_limited(cursor, handle)
+            return rows, None, truncated_by
+        except Exception as e:
+            return None, self._query_error(e, handle), None
+        finally:
+            self._set_canceller(handle, None)
+            conn.close()
+    
+    def _explain(self, query: str, analyze: bool) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        options = 'ANALYZE, BUFFERS, FORMAT JSON' if analyze else 'FORMAT JSON'
+        conn = self._read_connection()
+        try:
+            cursor = conn.cursor()
+            if analyze and self.query_timeout:
+                cursor.execute('SET LOCAL statement_timeout = %s', (int(self.query_timeout * 1000),))
+            cursor.execute(f'EXPLAIN ({options}) {query}')
+            plan = cursor.fetchone()[0][0]
+            # ANALYZE really executes the statement; never keep its effects.
+            conn.rollback()
+            return {'analyze': analyze, 'plan': plan}, None
         except Exception as e:
             return None, str(e)
         finally:
             conn.close()
+    
+    def _insert_many(self, cursor, table_name: str, columns: List[str], values: List[List[Any]]):
+        column_list = ', '.join(quote_identifier(col) for col in columns)
+        # execute_values sends the rows as one multi-row VALUES list per page.
+        execute_values(cursor, f'INSERT INTO {quote_identifier(table_name)} ({column_list}) VALUES %s',
+                       values, page_size=len(values))
+    
+    def export_table(self, table_name: str, export_format: str = 'csv') -> Iterator[Any]:
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f'Export format must be one of: {", ".join(EXPORT_FORMATS)}')
+        table = quote_identifier(table_name)
+        if export_format == 'csv':
+            sql = f'COPY {table} TO STDOUT WITH (FORMAT csv, HEADER)'
+        else:
+            # One row_to_json document per line. CSV format with control
+            # characters as quote and delimiter copies the JSON text verbatim
+            # (the text format would escape its backslashes).
+            sql = (f"COPY (SELECT row_to_json(t) FROM {table} t) TO STDOUT "
+                   f"WITH (FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')")
+        return self._copy_out(sql)
+    
+    def _copy_out(self, sql: str) -> Iterator[bytes]:
+        """Run COPY ... TO STDOUT on a worker thread and yield its output in chunks."""
+        chunks: queue.Queue = queue.Queue(maxsize=16)
+        writer = _CopyWriter(chunks)
+        done = object()
+        # Picked here rather than on the worker, which doesn't see the request's session.
+        conn = self._read_connection()
+        
+        def run():
+            try:
+                conn.cursor().copy_expert(sql, writer)
+                writer.flush()
+                writer.put(done)
+            except Exception as e:
+                try:
+                    writer.put(e)
+                except IOError:
+                    pass
+            finally:
+                conn.close()
+        
+        worker = threading.Thread(target=run, name='dashtools-copy-out', daemon=True)
+        worker.start()
+        try:
+            while True:
+                item = chunks.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Unblock and stop the COPY if the client went away early.
+            writer.cancelled = True
+            while worker.is_alive():
+                try:
+                    chunks.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+    
+    @staticmethod
+    def _copy_value(value: Any) -> str:
+        """Format a value for COPY's text format."""
+        if value is None:
+            return '\\N'
+        if isinstance(value, bool):
+            return 't' if value else 'f'
+        if isinstance(value, (bytes, bytearray)):
+            return '\\\\x' + bytes(value).hex()
+        return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+                .replace('\n', '\\n').replace('\r', '\\r'))
+    
+    def _import_chunks(self, table_name: str, columns: List[str], rows: Iterator[List[Any]],
+                       chunk_size: int, progress: Dict[str, Any]):
+        column_list = ', '.join(quote_identifier(col) for col in columns)
+        sql = f'COPY {quote_identifier(table_name)} ({column_list}) FROM STDIN'
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            while True:
+                chunk = list(itertools.islice(rows, chunk_size))
+                if not chunk:
+                    break
+                buffer = io.StringIO()
+                for row in chunk:
+                    buffer.write('\t'.join(self._copy_value(value) for value in row))
+                    buffer.write('\n')
+                buffer.seek(0)
+                try:
+                    # Each chunk is its own transaction; skip the WAL flush wait on commit.
+                    cursor.execute('SET LOCAL synchronous_commit = off')
+                    cursor.copy_expert(sql, buffer)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                progress['imported'] += len(chunk)
+                progress['chunks'] += 1
+        finally:
+            conn.close()
+    
+    def _stream(self, sql: str, params: Optional[List[Any]], batch_size: int) -> Iterator[Tuple[List[str], List[tuple]]]:
+        conn = self._read_connection()
+        try:
+            # A named cursor keeps the result set on the server and fetches it
+            # batch by batch, instead of pulling every row into client memory.
+            cursor = conn.cursor(name=f'dashtools_stream_{uuid.uuid4().hex}')
+            cursor.itersize = batch_size
+            cursor.execute(sql, params or None)
+            batch = cursor.fetchmany(batch_size)
+            columns = [col[0] for col in cursor.description or ()]
+            yield columns, batch
+            while batch:
+                batch = cursor.fetchmany(batch_size)
+                if batch:
+                    yield columns, batch
+            cursor.close()
+        finally:
+            conn.close()
 
 
-# Initialize the appropriate database adapter
-if USE_POSTGRESQL:
-    db_adapter = PostgreSQLAdapter(
-        host=os.getenv('POSTGRES_HOST', 'localhost'),
-        port=int(os.getenv('POSTGRES_PORT', '5432')),
-        user=os.getenv('POSTGRES_USER', 'dashtools'),
-        password=os.getenv('POSTGRES_PASSWORD', 'dashtools'),
-        database=os.getenv('POSTGRES_DB', 'dashtools')
-    )
-    print("Using PostgreSQL database")
-else:
-    DB_PATH = os.getenv('DATABASE_PATH', 'dashtools.db')
-    db_adapter = SQLiteAdapter(DB_PATH)
-    print(f"Using SQLite database at {DB_PATH}")
+def parse_replicas(spec: Any, primary: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Connection settings of read replicas: a comma-separated string (or list)
+    of ``postgresql://`` URLs or ``host[:port]`` entries. Whatever an entry
+    leaves out is taken from the ``primary`` settings.
+    """
+    items = spec.split(',') if isinstance(spec, str) else list(spec or [])
+    replicas = []
+    for item in (item.strip() for item in items):
+        if not item:
+            continue
+        settings = dict(primary)
+        if '://' in item:
+            parsed = parse_url(item)
+            if parsed['type'] != 'postgresql':
+                raise ValueError(f'Replica "{item}" is not a PostgreSQL URL')
+            settings.update((key, value) for key, value in parsed.items() if key != 'type' and value)
+        else:
+            host, _, port = item.partition(':')
+            settings.update(host=host, port=int(port) if port else primary['port'])
+        replicas.append(settings)
+    return replicas
+
+
+def create_adapter() -> DatabaseAdapter:
+    """Build the adapter configured by the environment; it connects on first use."""
+    if USE_POSTGRESQL:
+        primary = {
+            'host': os.getenv('POSTGRES_HOST', 'localhost'),
+            'port': int(os.getenv('POSTGRES_PORT', '5432')),
+            'user': os.getenv('POSTGRES_USER', 'dashtools'),
+            'password': os.getenv('POSTGRES_PASSWORD', 'dashtools'),
+            'database': os.getenv('POSTGRES_DB', 'dashtools'),
+        }
+        sticky = os.getenv('POSTGRES_REPLICA_STICKY', '')
+        adapter = PostgreSQLAdapter(
+            **primary,
+            pool_enabled=os.getenv('POSTGRES_POOL', 'true').lower() == 'true',
+            pool_min=int(os.getenv('POSTGRES_POOL_MIN', '1')),
+            pool_max=int(os.getenv('POSTGRES_POOL_MAX', '10')),
+            pool_timeout=float(os.getenv('POSTGRES_POOL_TIMEOUT', '30')),
+            pool_max_uses=int(os.getenv('POSTGRES_POOL_MAX_USES', '0')),
+            pool_max_age=float(os.getenv('POSTGRES_POOL_MAX_AGE', '0')),
+            pool_ping_query=os.getenv('POSTGRES_POOL_PING_QUERY', 'false').lower() == 'true',
+            replicas=parse_replicas(os.getenv('POSTGRES_REPLICAS', ''), primary),
+            replica_max_lag=float(os.getenv('POSTGRES_REPLICA_MAX_LAG', '5')),
+            replica_sticky=float(sticky) if sticky else None,
+            replica_check_interval=float(os.getenv('POSTGRES_REPLICA_CHECK_INTERVAL', '5')),
+            replica_retry=float(os.getenv('POSTGRES_REPLICA_RETRY', '30'))
+        )
+        logger.info("Using PostgreSQL database at %s:%s", adapter.host, adapter.port)
+        if adapter.replicas:
+            logger.info("Reading from %d PostgreSQL replica(s)", len(adapter.replicas))
+    else:
+        adapter = SQLiteAdapter(
+            DB_PATH,
+            persistent=os.getenv('SQLITE_PERSISTENT', 'true').lower() == 'true',
+            pragmas={**SQLITE_DEFAULT_PRAGMAS, **parse_pragmas(os.getenv('SQLITE_PRAGMAS', ''))},
+            pool_max=int(os.getenv('SQLITE_POOL_MAX', '10')),
+            pool_timeout=float(os.getenv('SQLITE_POOL_TIMEOUT', '30')),
+            group_commit=os.getenv('SQLITE_GROUP_COMMIT', 'false').lower() == 'true',
+            group_commit_window=float(os.getenv('SQLITE_GROUP_COMMIT_WINDOW_MS', '1')) / 1000,
+            group_commit_max_ops=int(os.getenv('SQLITE_GROUP_COMMIT_MAX_OPS', '100'))
+        )
+        logger.info("Using SQLite database at %s", DB_PATH)
+    if METRICS_ENABLED:
+        instrument_adapter(adapter)
+    return adapter
+
+
+# Name of the connection configured by DATABASE_TYPE and friends
+DEFAULT_CONNECTION = 'default'
+# Names a connection can't take: the default one, and the first path segments of /api/db/ routes
+RESERVED_CONNECTION_NAMES = (DEFAULT_CONNECTION, 'tables', 'query', 'indexes', 'transaction', 'pool', 'connections')
+# Per-connection options: PostgreSQL pool settings, SQLite settings, and adapter
+# limits and caches that otherwise come from the DB_* environment variables
+POSTGRES_CONNECTION_OPTIONS = ('pool_enabled', 'pool_min', 'pool_max', 'pool_timeout', 'pool_max_uses',
+                               'pool_max_age', 'pool_ping_query', 'replicas', 'replica_max_lag', 'replica_sticky',
+                               'replica_check_interval', 'replica_retry')
+SQLITE_CONNECTION_OPTIONS = ('persistent', 'pragmas', 'pool_max', 'pool_timeout', 'group_commit', 'group_commit_window',
+                             'group_commit_max_ops')
+ADAPTER_CONNECTION_OPTIONS = ('query_timeout', 'query_max_rows', 'query_max_bytes', 'count_strategy',
+                              'count_cache_ttl', 'metadata_cache_ttl', 'stream_batch_size', 'batch_chunk_size',
+                              'import_chunk_size', 'stats_sample_rows', 'stats_ttl', 'change_token_ttl',
+                              'use_executor', 'executor_workers', 'executor_queue')
+CACHE_CONNECTION_OPTIONS = ('query_cache_bytes', 'query_cache_ttl')
+
+
+def check_connection_options(name: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate a named connection's options; returns its parsed URL."""
+    settings = parse_url(options['url'])
+    own = POSTGRES_CONNECTION_OPTIONS if settings['type'] == 'postgresql' else SQLITE_CONNECTION_OPTIONS
+    allowed = set(own + ADAPTER_CONNECTION_OPTIONS + CACHE_CONNECTION_OPTIONS + ('url', 'source'))
+    unknown = sorted(set(options) - allowed)
+    if unknown:
+        raise ValueError(f'Connection "{name}" has unknown options for {settings["type"]}: {", ".join(unknown)}')
+    if options.get('count_strategy', DEFAULT_COUNT_STRATEGY) not in COUNT_STRATEGIES:
+        raise ValueError(f'Connection "{name}" has an invalid count_strategy')
+    return settings
+
+
+def create_named_adapter(name: str, options: Dict[str, Any]) -> DatabaseAdapter:
+    """Build the adapter of a named connection; like the default one, it connects on first use."""
+    settings = check_connection_options(name, options)
+    if settings['type'] == 'postgresql':
+        primary = {key: value for key, value in settings.items() if key != 'type'}
+        pg_options = {key: options[key] for key in POSTGRES_CONNECTION_OPTIONS if key in options}
+        pg_options['replicas'] = parse_replicas(options.get('replicas', ''), primary)
+        adapter = PostgreSQLAdapter(**primary, **pg_options)
+    else:
+        pragmas = options.get('pragmas', '')
+        if isinstance(pragmas, dict):
+            pragmas = ';'.join(f'{key}={value}' for key, value in pragmas.items())
+        adapter = SQLiteAdapter(
+            settings['path'],
+            persistent=options.get('persistent', os.getenv('SQLITE_PERSISTENT', 'true').lower() == 'true'),
+            pragmas={**SQLITE_DEFAULT_PRAGMAS, **parse_pragmas(os.getenv('SQLITE_PRAGMAS', '')),
+                     **parse_pragmas(pragmas)},
+            pool_max=options.get('pool_max', int(os.getenv('SQLITE_POOL_MAX', '10'))),
+            pool_timeout=options.get('pool_timeout', float(os.getenv('SQLITE_POOL_TIMEOUT', '30'))),
+            **{key: options[key] for key in ('group_commit', 'group_commit_window', 'group_commit_max_ops')
+               if key in options}
+        )
+    for key in ADAPTER_CONNECTION_OPTIONS:
+        if key in options:
+            setattr(adapter, key, options[key])
+    if any(key in options for key in CACHE_CONNECTION_OPTIONS):
+        adapter.query_cache = QueryResultCache(options.get('query_cache_bytes', QUERY_CACHE_BYTES),
+                                               options.get('query_cache_ttl', QUERY_CACHE_TTL))
+    logger.info("Opened database connection %s (%s)", name, settings['type'])
+    if METRICS_ENABLED:
+        instrument_adapter(adapter, collect=False)
+    return adapter
+
+
+def _load_connections() -> Dict[str, Dict[str, Any]]:
+    connections = {}
+    if DB_CONNECTIONS_FILE:
+        with open(DB_CONNECTIONS_FILE, encoding='utf-8') as f:
+            connections.update(parse_connections(f.read()))
+    connections.update(parse_connections(DB_CONNECTIONS))
+    for name, options in connections.items():
+        check_connection_options(name, options)
+    return connections
+
+
+# The process's adapter, built by get_adapter() on first use rather than at import,
+# so importing the app (or this module) neither loads a driver nor touches the database.
+_adapter: Optional[DatabaseAdapter] = None
+_adapter_lock = threading.Lock()
+# Named connections, read from the environment on first use
+_registry: Optional[ConnectionRegistry] = None
+# Connection the current request (or other context) works on; None is the default one
+_connection: ContextVar[Optional[str]] = ContextVar('db_connection', default=None)
+
+
+def get_registry() -> ConnectionRegistry:
+    """Return the registry of named connections, reading their configuration on first use."""
+    global _registry
+    registry = _registry
+    if registry is None:
+        with _adapter_lock:
+            if _registry is None:
+                _registry = ConnectionRegistry(
+                    create_named_adapter,
+                    _load_connections(),
+                    sqlite_dir=DB_SQLITE_DIR or None,
+                    idle_timeout=CONNECTION_IDLE_TIMEOUT,
+                    max_open=MAX_OPEN_CONNECTIONS,
+                    reserved=RESERVED_CONNECTION_NAMES
+                )
+            registry = _registry
+    return registry
+
+
+def use_connection(name: Optional[str]):
+    """Send this context's database calls (e.g. the current request's) to a named connection; None for the default."""
+    _connection.set(name)
+
+
+def use_session(key: Optional[str]):
+    """
+    Tag this context's database calls with a client session: after it writes,
+    its reads skip replicas for a while so it sees its own writes.
+    """
+    _session.set(key)
+
+
+def get_adapter(name: Optional[str] = None) -> DatabaseAdapter:
+    """
+    Return the adapter of a connection, creating it on first use.
+    
+    Without a name, the connection chosen by ``use_connection`` is used, or
+    the default one. Raises UnknownConnection for a name that isn't configured.
+    """
+    global _adapter
+    if name is None:
+        name = _connection.get()
+    if name is not None and name != DEFAULT_CONNECTION:
+        return get_registry().get(name)
+    adapter = _adapter
+    if adapter is None:
+        with _adapter_lock:
+            if _adapter is None:
+                _adapter = create_adapter()
+            adapter = _adapter
+    return adapter
+
+
+def close_adapter():
+    """Close the connections and threads of every adapter that was created."""
+    if _registry is not None:
+        _registry.close()
+    if _adapter is not None:
+        _adapter.close()
+
+
+def list_connections() -> Dict[str, Any]:
+    """List the default and named connections, whether they are open, and registry statistics."""
+    registry = get_registry()
+    default = {
+        'name': DEFAULT_CONNECTION,
+        'type': DATABASE_TYPE,
+        'source': 'environment',
+        'open': _adapter is not None,
+        'idle_seconds': None,
+    }
+    return {'connections': [default] + registry.describe(), 'registry': registry.stats()}
+
+
+def __getattr__(name: str):
+    # ``database.db_adapter`` keeps working, creating the adapter when first accessed.
+    if name == 'db_adapter':
+        return get_adapter()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+_readiness = ReadinessProbe(lambda: get_adapter(DEFAULT_CONNECTION).ping(), READY_INTERVAL, READY_TIMEOUT)
+
+
+def _reset_after_fork():
+    global _adapter_lock, _readiness
+    _adapter_lock = threading.Lock()
+    _readiness = ReadinessProbe(_readiness.check, _readiness.interval, _readiness.timeout)
+    if _adapter is not None:
+        _adapter.reset_after_fork()
+    if _registry is not None:
+        _registry.reset_after_fork()
+
+
+# A forked child (e.g. a serve.py worker) must not use its parent's connections.
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
 
 
 # Public API functions that delegate to the adapter
 def get_connection():
     """Get a database connection."""
-    return db_adapter.get_connection()
+    return get_adapter().get_connection()
 
 
-def init_database():
-    """Initialize the database if it doesn't exist."""
-    if not USE_POSTGRESQL:
-        if not os.path.exists(DB_PATH):
-            conn = get_connection()
-            conn.close()
-            print(f"Database initialized at {DB_PATH}")
-    else:
-        # PostgreSQL database should already exist
-        try:
-            conn = get_connection()
-            conn.close()
-            print("PostgreSQL database connection successful")
-        except Exception as e:
-            print(f"Warning: Could not connect to PostgreSQL: {e}")
+def get_readiness() -> Dict[str, Any]:
+    """Report whether the database answers, waiting at most ``DB_READY_TIMEOUT`` for a check."""
+    return _readiness.status()
 
 
 def get_tables() -> List[str]:
     """Get list of all tables in the database."""
-    return db_adapter.get_tables()
+    adapter = get_adapter()
+    return adapter.call(adapter.get_tables)
 
 
 def get_table_schema(table_name: str) -> List[Dict[str, Any]]:
     """Get schema information for a table."""
-    return db_adapter.get_table_schema(table_name)
+    adapter = get_adapter()
+    return adapter.call(adapter.get_table_schema, table_name)
+
+
+def get_table_indexes(table_name: str) -> List[Dict[str, Any]]:
+    """Get the indexes of a table."""
+    adapter = get_adapter()
+    return adapter.call(adapter.get_table_indexes, table_name)
+
+
+def list_indexes(table_name: str) -> List[Dict[str, Any]]:
+    """Get the indexes of a table with their sizes."""
+    adapter = get_adapter()
+    return adapter.call(adapter.list_indexes, table_name)
+
+
+def create_index(table_name: str, columns: List[str], name: Optional[str] = None,
+                 unique: bool = False, concurrently: bool = False) -> Tuple[bool, Optional[str]]:
+    """Create an index on a table (CONCURRENTLY on PostgreSQL if asked)."""
+    adapter = get_adapter()
+    return adapter.call(adapter.create_index, table_name, columns, name, unique, concurrently)
+
+
+def drop_index(table_name: str, index_name: str, concurrently: bool = False) -> Tuple[bool, Optional[str]]:
+    """Drop an index of a table."""
+    adapter = get_adapter()
+    return adapter.call(adapter.drop_index, table_name, index_name, concurrently)
+
+
+def get_table_stats(table_name: str, full: bool = False, refresh: bool = False) -> Dict[str, Any]:
+    """Get per-column statistics of a table, computed from a scan or sample and cached."""
+    adapter = get_adapter()
+    return adapter.call(adapter.table_stats, table_name, full, refresh)
+
+
+def get_index_advice(min_queries: int = 1) -> Dict[str, Any]:
+    """Get index recommendations drawn from recent queries."""
+    adapter = get_adapter()
+    return {
+        'stats': adapter.index_advisor.stats(),
+        'recommendations': adapter.call(adapter.index_advice, min_queries),
+    }
+
+
+def clear_index_advice():
+    """Forget the query shapes recorded by the index advisor."""
+    get_adapter().index_advisor.clear()
 
 
 def create_table(table_name: str, columns: List[Dict[str, str]]) -> Tuple[bool, Optional[str]]:
     """Create a new table with specified columns."""
-    return db_adapter.create_table(table_name, columns)
+    adapter = get_adapter()
+    return adapter.call(adapter.create_table, table_name, columns)
 
 
 def drop_table(table_name: str) -> bool:
     """Drop a table."""
-    return db_adapter.drop_table(table_name)
+    adapter = get_adapter()
+    return adapter.call(adapter.drop_table, table_name)
 
 
 def add_column(table_name: str, column_name: str, column_type: str, default_value: Optional[str] = None) -> bool:
     """Add a column to an existing table."""
-    return db_adapter.add_column(table_name, column_name, column_type, default_value)
+    adapter = get_adapter()
+    return adapter.call(adapter.add_column, table_name, column_name, column_type, default_value)
 
 
-def get_table_data(table_name: str, limit: int = 100, offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
-    """Get data from a table with pagination."""
-    return db_adapter.get_table_data(table_name, limit, offset)
+def get_table_data(table_name: str, limit: int = 100, offset: int = 0,
+                   after: Optional[str] = None, sort_column: Optional[str] = None,
+                   keyset: bool = False, count_strategy: Optional[str] = None,
+                   row_format: str = 'records', where: Any = None, order_by: Optional[str] = None,
+                   search: Optional[str] = None) -> Tuple[List[Any], int, Dict[str, Any]]:
+    """
+    Get data from a table with pagination.
+    
+    Uses LIMIT/OFFSET by default. With ``keyset`` (or an ``after`` cursor) it
+    seeks past the last row of the previous page instead, and the returned page
+    info carries the ``next_cursor``.
+    
+    ``count_strategy`` picks how ``total`` is computed (exact, cached or
+    estimated); the page info reports the strategy that produced it.
+    
+    ``row_format`` picks the row layout (see ``ROW_FORMATS``); the columnar
+    layouts add the column names to the page info.
+    
+    ``where`` filters rows (see ``normalize_filters``), ``search`` matches a
+    substring in any text column and ``order_by`` sorts offset pages. The page
+    info then lists ``index_hints`` for filters and sorts no index can serve.
+    """
+    adapter = get_adapter()
+    return adapter.call(adapter.get_table_data, table_name, limit, offset, after, sort_column, keyset,
+                        count_strategy, row_format, where, order_by, search)
 
 
 def insert_row(table_name: str, data: Dict[str, Any]) -> bool:
     """Insert a row into a table."""
-    return db_adapter.insert_row(table_name, data)
+    adapter = get_adapter()
+    return adapter.call(adapter.insert_row, table_name, data)
+
+
+def insert_rows(table_name: str, rows: List[Dict[str, Any]], atomic: bool = False) -> Dict[str, Any]:
+    """Insert many rows in one transaction, reporting the rows that failed."""
+    adapter = get_adapter()
+    return adapter.call(adapter.insert_rows, table_name, rows, atomic)
+
+
+def import_rows(table_name: str, columns: List[str], rows: Iterator[List[Any]],
+                create: bool = False, infer_types: bool = False,
+                chunk_size: Optional[int] = None) -> Dict[str, Any]:
+    """Bulk-load rows into a table in chunked transactions, optionally creating it."""
+    adapter = get_adapter()
+    return adapter.call(adapter.import_rows, table_name, columns, rows, create, infer_types, chunk_size)
+
+
+def execute_transaction(operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Run insert/update/delete operations across tables in one transaction."""
+    adapter = get_adapter()
+    return adapter.call(adapter.execute_transaction, operations)
 
 
 def update_row(table_name: str, row_id: int, data: Dict[str, Any], id_column: str = 'id') -> bool:
     """Update a row in a table."""
-    return db_adapter.update_row(table_name, row_id, data, id_column)
+    adapter = get_adapter()
+    return adapter.call(adapter.update_row, table_name, row_id, data, id_column)
 
 
 def delete_row(table_name: str, row_id: int, id_column: str = 'id') -> bool:
     """Delete a row from a table."""
-    return db_adapter.delete_row(table_name, row_id, id_column)
+    adapter = get_adapter()
+    return adapter.call(adapter.delete_row, table_name, row_id, id_column)
 
 
-def execute_query(query: str) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str]]:
+def execute_query(query: str, use_cache: bool = True, timeout: Optional[float] = None,
+                  max_rows: Optional[int] = None, max_bytes: Optional[int] = None,
+                  query_id: Optional[str] = None, row_format: str = 'records'
+                  ) -> Tuple[Optional[List[Any]], Optional[str], Dict[str, Any]]:
     """Execute a raw SQL query (SELECT only for safety)."""
-    return db_adapter.execute_query(query)
+    adapter = get_adapter()
+    return adapter.call(adapter.execute_query, query, use_cache, timeout, max_rows, max_bytes, query_id,
+                        row_format)
+
+
+def explain_query(query: str, analyze: bool = False) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Get the query plan of a SELECT query."""
+    adapter = get_adapter()
+    return adapter.call(adapter.explain_query, query, analyze)
+
+
+def get_change_token(table_name: Optional[str] = None) -> str:
+    """Get a token that changes whenever the table (or, without one, the table list) may have changed."""
+    return get_adapter().change_token(table_name)
+
+
+def get_slow_queries(limit: Optional[int] = None) -> Dict[str, Any]:
+    """Get the slow-query log, newest first."""
+    slow_log = get_adapter().slow_log
+    return {'stats': slow_log.stats(), 'queries': slow_log.entries(limit)}
+
+
+def clear_slow_queries():
+    """Empty the slow-query log."""
+    get_adapter().slow_log.clear()
+
+
+def cancel_query(query_id: str) -> bool:
+    """Cancel a running query by id."""
+    return get_adapter().cancel_query(query_id)
+
+
+def get_running_queries() -> List[Dict[str, Any]]:
+    """List the queries currently running."""
+    return get_adapter().running_queries()
+
+
+def get_query_cache_stats() -> Dict[str, Any]:
+    """Get hit/miss/eviction counters of the query result cache."""
+    return get_adapter().query_cache.stats()
+
+
+def clear_query_cache():
+    """Drop every cached query result."""
+    get_adapter().query_cache.clear()
+
+
+def stream_query(query: str, batch_size: Optional[int] = None) -> Iterator[Tuple[List[str], List[tuple]]]:
+    """Stream a SELECT query as ``(columns, rows)`` batches."""
+    return get_adapter().stream_query(query, batch_size)
+
+
+def export_table(table_name: str, export_format: str = 'csv') -> Iterator[Any]:
+    """Stream a whole table as CSV or NDJSON chunks."""
+    return get_adapter().export_table(table_name, export_format)
+
+
+def stream_table_data(table_name: str, limit: Optional[int] = None, offset: int = 0,
+                      batch_size: Optional[int] = None) -> Iterator[Tuple[List[str], List[tuple]]]:
+    """Stream the rows of a table as ``(columns, rows)`` batches."""
+    return get_adapter().stream_table_data(table_name, limit, offset, batch_size)
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Get connection pool statistics for the active adapter."""
+    return get_adapter().pool_stats()
+
+
+def get_executor_stats() -> Dict[str, Any]:
+    """Get worker and queue statistics of the active adapter's executor."""
+    return get_adapter().executor_stats()
@@ -0,0 +1,102 @@
+"""
+Bounded thread pools for blocking database calls.
+"""
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+
+class ExecutorSaturated(Exception):
+    """Raised when every worker is busy and the wait queue is full."""
+
+
+class BoundedExecutor:
+    """
+    Thread pool that runs at most ``max_workers`` calls at once and lets at
+    most ``max_queue`` more wait for a worker.
+
+    Anything beyond that is rejected straight away with ``ExecutorSaturated``
+    instead of queueing without bound, so a burst of slow queries turns into
+    fast failures rather than an ever-growing backlog.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, name: str = 'dashtools-db'):
+        if max_workers < 1:
+            raise ValueError('max_workers must be at least 1')
+        if max_queue < 0:
+            raise ValueError('max_queue must not be negative')
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'rejected': 0,
+        }
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Schedule a call, raising ExecutorSaturated if the queue is full."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise ExecutorSaturated(
+                f'Database is busy ({self.max_workers} calls running, {self.max_queue} queued); try again shortly'
+            )
+        with self._lock:
+            self._pending += 1
+            self._stats['submitted'] += 1
+        try:
+            # Run in a copy of the caller's context, so context variables such
+            # as the selected connection and session carry over to the worker.
+            future = self._executor.submit(contextvars.copy_context().run, self._run, fn, args, kwargs)
+        except Exception:
+            self._finish(failed=True)
+            raise
+        future.add_done_callback(lambda f: self._finish(failed=f.cancelled() or f.exception() is not None))
+        return future
+
+    def _run(self, fn: Callable, args, kwargs):
+        self._local.worker = True
+        with self._lock:
+            self._running += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def _finish(self, failed: bool):
+        self._slots.release()
+        with self._lock:
+            self._pending -= 1
+            self._stats['failed' if failed else 'completed'] += 1
+
+    def call(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run a call on the pool and wait for its result (inline when already on a worker)."""
+        if getattr(self._local, 'worker', False):
+            return fn(*args, **kwargs)
+        return self.submit(fn, *args, **kwargs).result()
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a snapshot of worker usage and queue depth."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                'enabled': True,
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'running': self._running,
+                'queued': self._pending - self._running,
+            })
+        return stats
+
@@ -0,0 +1,87 @@
+"""
+Check how long importing the app takes against a time budget.
+
+Every worker serve.py forks (without SERVER_PRELOAD) and every instance an
+autoscaler starts pays this cost before serving its first request. The app
+is imported in fresh interpreters, once per database type, and must also
+leave the database alone: no adapter or connection registry built and no
+psycopg2 loaded.
+
+Usage: python import_budget.py [--budget MS] [--runs N] [--top N]
+Exits with status 1 when the budget is exceeded or the import isn't lazy.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Milliseconds `import app` may take (median of the runs)
+IMPORT_BUDGET_MS = float(os.getenv('IMPORT_BUDGET_MS', '500'))
+
+PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+import app
+elapsed = time.perf_counter() - started
+import database
+print(json.dumps({
+    'ms': elapsed * 1000,
+    'adapter': database._adapter is not None or database._registry is not None,
+    'psycopg2': 'psycopg2' in sys.modules,
+}))
+'''
+
+
+def run_probe(database_type: str):
+    """Import the app in a fresh interpreter; return the probe's report and the -X importtime lines."""
+    env = dict(os.environ, DATABASE_TYPE=database_type)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', PROBE], env=env,
+                            cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True, timeout=60)
+    if result.returncode != 0:
+        raise RuntimeError(f'Importing the app failed ({database_type}):\n{result.stderr[-2000:]}')
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        timings.append((int(own), int(cumulative), name.rstrip()))
+    return report, timings
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--budget', type=float, default=IMPORT_BUDGET_MS, help='budget in milliseconds')
+    parser.add_argument('--runs', type=int, default=5, help='imports per database type')
+    parser.add_argument('--top', type=int, default=10, help='slowest modules to list')
+    args = parser.parse_args()
+
+    failed = False
+    for database_type in ('sqlite', 'postgresql'):
+        reports = []
+        timings = []
+        for _ in range(max(args.runs, 1)):
+            report, timings = run_probe(database_type)
+            reports.append(report)
+        median = statistics.median(report['ms'] for report in reports)
+        verdict = 'ok' if median <= args.budget else 'OVER BUDGET'
+        print(f'{database_type}: import app took {median:.1f} ms (median of {len(reports)}, '
+              f'budget {args.budget:g} ms) {verdict}')
+        failed |= median > args.budget
+        if any(report['adapter'] for report in reports):
+            print(f'{database_type}: importing the app built the database adapter')
+            failed = True
+        if any(report['psycopg2'] for report in reports):
+            print(f'{database_type}: importing the app loaded psycopg2')
+            failed = True
+    print('Slowest modules by own import time (last run, ms):')
+    for own, cumulative, name in sorted(timings, reverse=True)[:args.top]:
+        print(f'  {own / 1000:8.1f} {cumulative / 1000:8.1f}  {name.strip()}')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,220 @@
+"""
+Index recommendations from the predicates and sort orders of recent queries.
+"""
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+# String literals are blanked out before looking for column references
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_CLAUSE_END_RE = re.compile(r'\b(?:GROUP\s+BY|ORDER\s+BY|HAVING|LIMIT|OFFSET|UNION|INTERSECT|EXCEPT|FETCH|FOR)\b|;',
+                            re.IGNORECASE)
+_ORDER_END_RE = re.compile(r'\b(?:LIMIT|OFFSET|FETCH|FOR)\b|;|\)', re.IGNORECASE)
+_NAME = r'(?:"((?:[^"]|"")+)"|([A-Za-z_][\w$]*))'
+# column (optionally qualified) followed by a comparison
+_PREDICATE_RE = re.compile(
+    rf'(?:{_NAME}\s*\.\s*)?{_NAME}\s*(=|<>|!=|<=|>=|<|>|\bNOT\s+LIKE\b|\bI?LIKE\b|\bNOT\s+IN\b|\bIN\b|'
+    rf'\bIS\s+NOT\s+NULL\b|\bIS\s+NULL\b|\bBETWEEN\b)',
+    re.IGNORECASE)
+_ORDER_TERM_RE = re.compile(rf'^\s*(?:{_NAME}\s*\.\s*)?{_NAME}\s*(?:ASC|DESC)?\s*(?:NULLS\s+(?:FIRST|LAST))?\s*$',
+                            re.IGNORECASE)
+
+# Filter ops as the advisor sees them: equality can lead an index, ranges end it
+EQUALITY_OPS = ('eq', 'in', 'is_null')
+RANGE_OPS = ('lt', 'lte', 'gt', 'gte', 'like', 'between')
+
+# (table, equality columns, range column, sort columns)
+Pattern = Tuple[str, FrozenSet[str], Optional[str], Tuple[str, ...]]
+
+
+def _name(quoted: str, bare: str) -> str:
+    return quoted.replace('""', '"') if quoted else bare
+
+
+def _sql_op(op: str) -> Optional[str]:
+    op = ' '.join(op.upper().split())
+    if op in ('=', 'IN', 'IS NULL'):
+        return 'eq'
+    if op in ('<', '<=', '>', '>=', 'BETWEEN'):
+        return 'lt'
+    if op in ('LIKE', 'ILIKE'):
+        return 'like'
+    return None
+
+
+def query_predicates(query: str, columns: Dict[str, Sequence[str]]
+                     ) -> Dict[str, Tuple[List[Tuple[str, str]], List[str]]]:
+    """
+    Find the filtered and sorted columns of a SELECT, per table.
+
+    ``columns`` maps the tables the query reads to their column names. Only
+    the outermost WHERE and ORDER BY are read and aliases aren't resolved: a
+    column is attributed to the table that qualifies it, or to the only table
+    that has a column of that name. Returns ``table -> (filters, sort columns)``
+    where filters are ``(column, op)`` with op ``eq``, ``lt`` or ``like``.
+    """
+    sql = _LITERAL_RE.sub("''", query)
+    owners: Dict[str, List[str]] = {}
+    for table, names in columns.items():
+        for name in names:
+            owners.setdefault(name, []).append(table)
+
+    def resolve(qualifier: Optional[str], column: str) -> Optional[str]:
+        tables = owners.get(column, [])
+        if qualifier in tables:
+            return qualifier
+        return tables[0] if len(tables) == 1 else None
+
+    found: Dict[str, Tuple[List[Tuple[str, str]], List[str]]] = {}
+    where = re.search(r'\bWHERE\b', sql, re.IGNORECASE)
+    if where:
+        clause = sql[where.end():]
+        end = _CLAUSE_END_RE.search(clause)
+        for match in _PREDICATE_RE.finditer(clause[:end.start()] if end else clause):
+            qualifier = _name(match.group(1), match.group(2)) if match.group(1) or match.group(2) else None
+            column = _name(match.group(3), match.group(4))
+            op = _sql_op(match.group(5))
+            table = resolve(qualifier, column)
+            if op and table:
+                found.setdefault(table, ([], []))[0].append((column, op))
+    order = re.search(r'\bORDER\s+BY\b', sql, re.IGNORECASE)
+    if order:
+        clause = sql[order.end():]
+        end = _ORDER_END_RE.search(clause)
+        for term in (clause[:end.start()] if end else clause).split(','):
+            match = _ORDER_TERM_RE.match(term)
+            if not match:
+                break
+            qualifier = _name(match.group(1), match.group(2)) if match.group(1) or match.group(2) else None
+            column = _name(match.group(3), match.group(4))
+            table = resolve(qualifier, column)
+            if table is None:
+                break
+            found.setdefault(table, ([], []))[1].append(column)
+    return found
+
+
+def index_pattern(table: str, filters: Iterable[Tuple[str, str]], sort: Sequence[str]) -> Optional[Pattern]:
+    """Reduce filters and a sort order to the shape an index would need to serve."""
+    equal = frozenset(column for column, op in filters if op in EQUALITY_OPS)
+    ranges = [column for column, op in filters if op in RANGE_OPS and column not in equal]
+    if not equal and not ranges and not sort:
+        return None
+    return table, equal, ranges[0] if ranges else None, tuple(sort)
+
+
+def pattern_columns(pattern: Pattern) -> List[str]:
+    """
+    Columns of the index that serves a pattern: equality columns first, then
+    the sort columns, then one range column (an index can seek on equalities,
+    then either return rows in order or scan a range, not both).
+    """
+    _, equal, range_column, sort = pattern
+    columns = sorted(equal)
+    for column in sort:
+        if column not in columns:
+            columns.append(column)
+    if range_column and not sort and range_column not in columns:
+        columns.append(range_column)
+    return columns
+
+
+def covered(columns: List[str], equal: FrozenSet[str], indexes: List[Dict[str, Any]]) -> bool:
+    """True if an existing index starts with ``columns`` (equality columns in any order)."""
+    lead = len(equal)
+    for index in indexes:
+        existing = index['columns']
+        if len(existing) < len(columns) or index.get('partial'):
+            continue
+        if set(existing[:lead]) == set(columns[:lead]) and existing[lead:len(columns)] == columns[lead:]:
+            return True
+    return False
+
+
+class IndexAdvisor:
+    """
+    Tallies how often, and for how long, each filter/sort shape was queried.
+
+    At most ``size`` shapes are kept, least recently seen dropped first; a
+    ``size`` of 0 disables the advisor.
+    """
+
+    def __init__(self, size: int = 100):
+        self.size = size
+        self._lock = threading.Lock()
+        # pattern -> [queries, total seconds]
+        self._patterns: 'OrderedDict[Pattern, List[float]]' = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def record(self, pattern: Optional[Pattern], duration: float):
+        if not self.enabled or pattern is None:
+            return
+        with self._lock:
+            tally = self._patterns.get(pattern)
+            if tally is None:
+                tally = self._patterns[pattern] = [0, 0.0]
+                while len(self._patterns) > self.size:
+                    self._patterns.popitem(last=False)
+            else:
+                self._patterns.move_to_end(pattern)
+            tally[0] += 1
+            tally[1] += duration
+
+    def clear(self):
+        with self._lock:
+            self._patterns.clear()
+
+    def patterns(self) -> List[Tuple[Pattern, int, float]]:
+        with self._lock:
+            return [(pattern, int(count), total) for pattern, (count, total) in self._patterns.items()]
+
+    def recommend(self, indexes: Dict[str, List[Dict[str, Any]]], min_queries: int = 1) -> List[Dict[str, Any]]:
+        """
+        Suggest indexes for the recorded shapes that no index in ``indexes``
+        (table -> its indexes) serves, busiest first.
+
+        A suggestion that is a prefix of a longer one is folded into it, since
+        the composite index serves both.
+        """
+        candidates: Dict[Tuple[str, Tuple[str, ...]], Dict[str, Any]] = {}
+        for pattern, count, total in self.patterns():
+            table, equal = pattern[0], pattern[1]
+            columns = pattern_columns(pattern)
+            if table not in indexes or covered(columns, equal, indexes[table]):
+                continue
+            entry = candidates.setdefault((table, tuple(columns)), {
+                'table': table,
+                'columns': columns,
+                'queries': 0,
+                'total_ms': 0.0,
+                'filters': sorted(equal | ({pattern[2]} if pattern[2] else set())),
+                'sort': list(pattern[3]),
+            })
+            entry['queries'] += count
+            entry['total_ms'] += total * 1000
+        for key, entry in sorted(candidates.items(), key=lambda item: len(item[0][1])):
+            table, columns = key
+            for other_key, other in candidates.items():
+                if other is not entry and other_key[0] == table and len(other_key[1]) > len(columns) \
+                        and other_key[1][:len(columns)] == columns and other['queries']:
+                    other['queries'] += entry['queries']
+                    other['total_ms'] += entry['total_ms']
+                    entry['queries'] = 0
+                    break
+        result = [entry for entry in candidates.values() if entry['queries'] >= max(min_queries, 1)]
+        for entry in result:
+            entry['total_ms'] = round(entry['total_ms'], 3)
+        result.sort(key=lambda entry: (entry['total_ms'], entry['queries']), reverse=True)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'size': self.size,
+                'patterns': len(self._patterns),
+            }
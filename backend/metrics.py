@@ -0,0 +1,386 @@
+"""
+Lightweight Prometheus-style metrics.
+
+Every thread writes to its own shard, so recording a sample takes no lock
+and formats no strings; shards are only merged (and rendered as Prometheus
+text) when the metrics endpoint is scraped.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Adapter methods timed by instrument_adapter
+ADAPTER_METHODS = (
+    'get_tables', 'get_table_schema', 'get_table_indexes', 'create_table', 'drop_table', 'add_column',
+    'list_indexes', 'create_index', 'drop_index', 'index_advice', 'table_stats',
+    'get_table_data', 'insert_row', 'insert_rows', 'import_rows', 'execute_transaction',
+    'update_row', 'delete_row', 'execute_query', 'explain_query',
+    'stream_query', 'stream_table_data', 'export_table',
+)
+
+# Pool statistics that only ever grow, exported as counters
+POOL_COUNTERS = ('checkouts', 'created', 'closed', 'recycled', 'failed_pings', 'timeouts')
+
+# Sample = (metric name suffix, labels, value)
+Sample = Tuple[str, Dict[str, Any], float]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    """
+    A labelled metric whose cells live in per-thread shards.
+
+    A cell is a list of numbers keyed by the tuple of label values. Shards of
+    threads that have exited are folded into ``_retired`` so short-lived
+    request threads don't accumulate.
+    """
+
+    TYPE = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: List[Tuple[threading.Thread, Dict[tuple, list]]] = []
+        self._retired: Dict[tuple, list] = {}
+
+    def _new_cell(self) -> list:
+        raise NotImplementedError
+
+    def _reset_after_fork(self):
+        # The lock may have been held by a parent thread that doesn't exist here.
+        self._lock = threading.Lock()
+
+    def _shard(self) -> Dict[tuple, list]:
+        try:
+            return self._local.cells
+        except AttributeError:
+            cells: Dict[tuple, list] = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), cells))
+                if len(self._shards) > 2 * threading.active_count() + 8:
+                    self._fold()
+            self._local.cells = cells
+            return cells
+
+    def _cell(self, labels: tuple) -> list:
+        cells = self._shard()
+        cell = cells.get(labels)
+        if cell is None:
+            cell = cells[labels] = self._new_cell()
+        return cell
+
+    @staticmethod
+    def _merge(into: Dict[tuple, list], cells: Iterable[Tuple[tuple, list]]):
+        for labels, cell in cells:
+            merged = into.get(labels)
+            if merged is None:
+                into[labels] = list(cell)
+            else:
+                for i, value in enumerate(cell):
+                    merged[i] += value
+
+    def _fold(self):
+        """Merge the shards of finished threads into ``_retired`` (lock held)."""
+        live = []
+        for thread, cells in self._shards:
+            if thread.is_alive():
+                live.append((thread, cells))
+            else:
+                self._merge(self._retired, cells.items())
+        self._shards = live
+
+    def collect(self) -> Dict[tuple, list]:
+        """Return every cell summed across threads."""
+        with self._lock:
+            self._fold()
+            merged: Dict[tuple, list] = {}
+            self._merge(merged, self._retired.items())
+            for _, cells in self._shards:
+                # list() snapshots the dict in one step even while its thread writes to it
+                self._merge(merged, list(cells.items()))
+        return merged
+
+    def samples(self) -> List[Sample]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """A monotonically increasing total."""
+
+    TYPE = 'counter'
+
+    def _new_cell(self) -> list:
+        return [0]
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        self._cell(labels)[0] += amount
+
+    def samples(self) -> List[Sample]:
+        return [('', dict(zip(self.labelnames, labels)), cell[0])
+                for labels, cell in sorted(self.collect().items())]
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative ``le`` buckets, plus their sum."""
+
+    TYPE = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_cell(self) -> list:
+        # One slot per bucket, one for +Inf, then the sum
+        return [0] * (len(self.buckets) + 2)
+
+    def observe(self, labels: tuple, value: float):
+        cell = self._cell(labels)
+        cell[bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    def samples(self) -> List[Sample]:
+        samples = []
+        for labels, cell in sorted(self.collect().items()):
+            base = dict(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), cell):
+                cumulative += count
+                samples.append(('_bucket', dict(base, le=_format_value(float(bound))), cumulative))
+            samples.append(('_sum', base, cell[-1]))
+            samples.append(('_count', base, cumulative))
+        return samples
+
+
+class Registry:
+    """A set of metrics plus callbacks that report values computed at scrape time."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        # Each collector returns (name, type, help, samples) tuples
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def reset_after_fork(self):
+        for metric in self._metrics:
+            metric._reset_after_fork()
+
+    def register_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        families = [(m.name, m.TYPE, m.documentation, m.samples()) for m in self._metrics]
+        for collector in self._collectors:
+            try:
+                families.extend(collector())
+            except Exception:
+                # A failing collector must not take the whole endpoint down.
+                continue
+        lines = []
+        for name, kind, documentation, samples in families:
+            lines.append(f'# HELP {name} {documentation}')
+            lines.append(f'# TYPE {name} {kind}')
+            for suffix, labels, value in samples:
+                lines.append(f'{name}{suffix}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=REGISTRY.reset_after_fork)
+
+REQUEST_DURATION = REGISTRY.histogram(
+    'dashtools_http_request_duration_seconds', 'Time spent handling HTTP requests.',
+    ('route', 'method', 'status'))
+RESPONSE_BYTES = REGISTRY.counter(
+    'dashtools_http_response_bytes_total', 'Bytes sent in HTTP response bodies.',
+    ('route', 'method'))
+ADAPTER_DURATION = REGISTRY.histogram(
+    'dashtools_db_method_duration_seconds', 'Time spent in database adapter methods.',
+    ('adapter', 'method'))
+ADAPTER_ERRORS = REGISTRY.counter(
+    'dashtools_db_method_errors_total', 'Database adapter method calls that raised.',
+    ('adapter', 'method'))
+ROWS_RETURNED = REGISTRY.counter(
+    'dashtools_db_rows_returned_total', 'Rows returned by database adapter methods.',
+    ('adapter', 'method'))
+
+
+def _rows_returned(result: Any) -> Optional[int]:
+    """Count the rows in an adapter result: a list, or a tuple that starts with one."""
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, tuple) and result and isinstance(result[0], list):
+        # The 'columns' layout holds one list per column rather than per row.
+        if isinstance(result[-1], dict) and result[-1].get('format') == 'columns':
+            return len(result[0][0]) if result[0] else 0
+        return len(result[0])
+    return None
+
+
+def _timed(method: Callable, adapter_name: str, method_name: str) -> Callable:
+    labels = (adapter_name, method_name)
+
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = method(*args, **kwargs)
+        except Exception:
+            ADAPTER_ERRORS.inc(labels)
+            raise
+        finally:
+            ADAPTER_DURATION.observe(labels, time.perf_counter() - started)
+        rows = _rows_returned(result)
+        if rows:
+            ROWS_RETURNED.inc(labels, rows)
+        return result
+
+    return wrapper
+
+
+def instrument_adapter(adapter, methods: Sequence[str] = ADAPTER_METHODS, collect: bool = True):
+    """
+    Time the public methods of a database adapter instance.
+
+    Methods that return a stream are timed until the stream is returned, not
+    until it has been consumed. With ``collect`` the adapter's pool, executor
+    and query cache are also exported; collectors are never unregistered, so
+    adapters that come and go (named connections) are only timed.
+    """
+    adapter_name = type(adapter).__name__
+    for name in methods:
+        method = getattr(adapter, name, None)
+        if method is not None:
+            setattr(adapter, name, _timed(method, adapter_name, name))
+
+    def collect_pool():
+        stats = adapter.pool_stats()
+        labels = {'adapter': adapter_name}
+        for key, value in sorted(stats.items()):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            if key in POOL_COUNTERS:
+                yield (f'dashtools_db_pool_{key}_total', 'counter', f'Connection pool {key.replace("_", " ")}.',
+                       [('', labels, value)])
+            elif key == 'wait_time_total':
+                yield ('dashtools_db_pool_wait_seconds_total', 'counter',
+                       'Time spent waiting for a pooled connection.', [('', labels, value)])
+            elif key != 'wait_time_avg':
+                yield (f'dashtools_db_pool_{key}', 'gauge', f'Connection pool {key.replace("_", " ")}.',
+                       [('', labels, value)])
+
+    def collect_query_cache():
+        stats = adapter.query_cache.stats()
+        labels = {'adapter': adapter_name}
+        for key in ('hits', 'misses', 'evictions', 'invalidations'):
+            yield (f'dashtools_query_cache_{key}_total', 'counter', f'Query result cache {key}.',
+                   [('', labels, stats[key])])
+        yield ('dashtools_query_cache_bytes', 'gauge', 'Approximate size of cached query results.',
+               [('', labels, stats['bytes'])])
+
+    def collect_executor():
+        stats = adapter.executor_stats()
+        if not stats.get('enabled'):
+            return
+        labels = {'adapter': adapter_name}
+        yield ('dashtools_db_executor_running', 'gauge', 'Adapter calls running on the executor.',
+               [('', labels, stats['running'])])
+        yield ('dashtools_db_executor_queued', 'gauge', 'Adapter calls waiting for an executor worker.',
+               [('', labels, stats['queued'])])
+        yield ('dashtools_db_executor_rejected_total', 'counter', 'Adapter calls rejected because the executor queue was full.',
+               [('', labels, stats['rejected'])])
+
+    if not collect:
+        return adapter
+    REGISTRY.register_collector(collect_pool)
+    REGISTRY.register_collector(collect_executor)
+    REGISTRY.register_collector(collect_query_cache)
+    return adapter
+
+
+class _CountingIterable:
+    """Passes a streamed response body through, counting the bytes sent."""
+
+    def __init__(self, body, labels: tuple):
+        self._body = body
+        self._labels = labels
+
+    def __iter__(self):
+        sent = 0
+        try:
+            for chunk in self._body:
+                sent += len(chunk)
+                yield chunk
+        finally:
+            RESPONSE_BYTES.inc(self._labels, sent)
+
+    def close(self):
+        close = getattr(self._body, 'close', None)
+        if close is not None:
+            close()
+
+
+def instrument_app(app):
+    """Record the latency and response size of every request a Flask app handles."""
+    from flask import g, request
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop('_metrics_started', None)
+        if started is None:
+            return response
+        rule = request.url_rule
+        route = rule.rule if rule is not None else 'unmatched'
+        REQUEST_DURATION.observe((route, request.method, response.status_code), time.perf_counter() - started)
+        if response.is_streamed:
+            response.response = _CountingIterable(response.response, (route, request.method))
+        else:
+            RESPONSE_BYTES.inc((route, request.method), response.content_length or 0)
+        return response
+
+    return app
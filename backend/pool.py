@@ -0,0 +1,270 @@
+"""
+Thread-safe connection pooling for the database adapters.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out before the timeout."""
+
+
+class PooledConnection:
+    """
+    Proxy around a pooled DB-API connection.
+
+    Behaves like the underlying connection, except that ``close()`` hands the
+    connection back to its pool instead of closing it. This keeps the adapters'
+    ``conn = self.get_connection() ... finally: conn.close()`` pattern intact.
+    """
+
+    def __init__(self, pool: 'ConnectionPool', entry: '_PoolEntry'):
+        self._pool = pool
+        self._entry = entry
+
+    @property
+    def raw(self):
+        """The underlying driver connection."""
+        if self._entry is None:
+            raise RuntimeError('Connection has already been returned to the pool')
+        return self._entry.conn
+
+    def close(self):
+        """Return the connection to the pool."""
+        if self._entry is not None:
+            entry, self._entry = self._entry, None
+            self._pool._release(entry)
+
+    def discard(self):
+        """Close the connection for good instead of returning it to the pool."""
+        if self._entry is not None:
+            entry, self._entry = self._entry, None
+            self._pool._release(entry, discard=True)
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __del__(self):
+        # A connection that was never closed must not leak out of the pool.
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class _PoolEntry:
+    """Bookkeeping for one physical connection."""
+
+    __slots__ = ('conn', 'created_at', 'uses', 'last_used')
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.uses = 0
+        self.last_used = self.created_at
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of DB-API connections.
+
+    Connections are created lazily up to ``max_size`` (``min_size`` of them are
+    opened up front), validated on checkout with ``ping`` and recycled once they
+    have been used ``max_uses`` times or are older than ``max_age`` seconds.
+    On return, any open transaction is rolled back with ``reset``.
+    """
+
+    def __init__(self, connect: Callable[[], Any], min_size: int = 1, max_size: int = 10,
+                 timeout: float = 30.0, max_uses: int = 0, max_age: float = 0.0,
+                 ping: Optional[Callable[[Any], bool]] = None,
+                 reset: Optional[Callable[[Any], None]] = None):
+        if max_size < 1:
+            raise ValueError('max_size must be at least 1')
+        if min_size < 0 or min_size > max_size:
+            raise ValueError('min_size must be between 0 and max_size')
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self._ping = ping
+        self._reset = reset
+        self._idle: List[_PoolEntry] = []
+        self._size = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._closed = False
+        self._cond = threading.Condition(threading.Lock())
+        self._stats = {
+            'checkouts': 0,
+            'created': 0,
+            'closed': 0,
+            'recycled': 0,
+            'failed_pings': 0,
+            'timeouts': 0,
+            'wait_time_total': 0.0,
+        }
+        self._fill()
+
+    def _fill(self):
+        """Open connections until ``min_size`` are available."""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                entry = _PoolEntry(self._connect())
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._stats['created'] += 1
+                self._idle.append(entry)
+                self._cond.notify()
+
+    def _expired(self, entry: _PoolEntry) -> bool:
+        if self.max_uses and entry.uses >= self.max_uses:
+            return True
+        if self.max_age and time.monotonic() - entry.created_at >= self.max_age:
+            return True
+        return False
+
+    def _close_entry(self, entry: _PoolEntry):
+        try:
+            entry.conn.close()
+        except Exception:
+            pass
+
+    def getconn(self, timeout: Optional[float] = None) -> PooledConnection:
+        """Check out a connection, waiting up to ``timeout`` seconds for one."""
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        while True:
+            entry = None
+            create = False
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError('Connection pool is closed')
+                    if self._idle:
+                        entry = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        create = True
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeout(
+                            f'Timed out after {timeout:.1f}s waiting for a database connection '
+                            f'(pool size {self.max_size})'
+                        )
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+
+            if create:
+                try:
+                    entry = _PoolEntry(self._connect())
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._stats['created'] += 1
+            elif self._expired(entry) or not self._alive(entry):
+                self._drop(entry)
+                continue
+
+            entry.uses += 1
+            entry.last_used = time.monotonic()
+            with self._cond:
+                self._in_use += 1
+                self._stats['checkouts'] += 1
+                self._stats['wait_time_total'] += entry.last_used - started
+            return PooledConnection(self, entry)
+
+    def _alive(self, entry: _PoolEntry) -> bool:
+        if self._ping is None:
+            return True
+        try:
+            alive = self._ping(entry.conn)
+        except Exception:
+            alive = False
+        if not alive:
+            with self._cond:
+                self._stats['failed_pings'] += 1
+        return alive
+
+    def _drop(self, entry: _PoolEntry, recycled: bool = True):
+        """Close a physical connection and free its slot."""
+        self._close_entry(entry)
+        with self._cond:
+            self._size -= 1
+            self._stats['closed'] += 1
+            if recycled:
+                self._stats['recycled'] += 1
+            self._cond.notify()
+
+    def _release(self, entry: _PoolEntry, discard: bool = False):
+        with self._cond:
+            self._in_use -= 1
+        if not discard and self._reset is not None:
+            try:
+                self._reset(entry.conn)
+            except Exception:
+                discard = True
+        if discard or self._closed or self._expired(entry):
+            self._drop(entry, recycled=not discard)
+            if not self._closed:
+                try:
+                    self._fill()
+                except Exception:
+                    pass
+            return
+        with self._cond:
+            self._idle.append(entry)
+            self._cond.notify()
+
+    def close(self):
+        """Close all idle connections; checked-out ones are closed when returned."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for entry in idle:
+            self._drop(entry, recycled=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a snapshot of pool sizing and usage counters."""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'waiting': self._waiting,
+                'pool_closed': self._closed,
+            })
+        checkouts = stats['checkouts']
+        stats['wait_time_avg'] = stats['wait_time_total'] / checkouts if checkouts else 0.0
+        return stats
+
@@ -0,0 +1,162 @@
+"""
+In-memory result cache for read-only queries.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+# String literals are skipped when looking for table names
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_IDENTIFIER_RE = re.compile(r'"((?:[^"]|"")+)"|([A-Za-z_][\w$]*)')
+_TOKEN_RE = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|\s+|[^'\"\s]+")
+
+
+def normalize_sql(query: str) -> str:
+    """Collapse whitespace outside literals and drop a trailing semicolon."""
+    parts = []
+    for token in _TOKEN_RE.findall(query.strip().rstrip(';').strip()):
+        parts.append(' ' if token.isspace() else token)
+    return ''.join(parts)
+
+
+def referenced_tables(query: str, tables: Iterable[str]) -> FrozenSet[str]:
+    """
+    Return the known tables a query mentions.
+
+    Any identifier equal to a table name counts, so a column that shares a
+    table's name only causes extra invalidation, never a stale hit.
+    """
+    by_name = {}
+    for table in tables:
+        by_name.setdefault(table.lower(), set()).add(table)
+    found = set()
+    for quoted, bare in _IDENTIFIER_RE.findall(_LITERAL_RE.sub("''", query)):
+        if quoted:
+            name = quoted.replace('""', '"')
+            if name in by_name.get(name.lower(), ()):
+                found.add(name)
+        else:
+            found.update(by_name.get(bare.lower(), ()))
+    return frozenset(found)
+
+
+def estimate_row_size(row: Any) -> int:
+    """Rough memory footprint of one result row (a dict or a tuple), in bytes."""
+    size = 64 + 16 * len(row)
+    for value in (row.values() if isinstance(row, dict) else row):
+        if isinstance(value, (str, bytes, bytearray)):
+            size += len(value) + 48
+        else:
+            size += 24
+    return size
+
+
+def estimate_size(rows: List[Any]) -> int:
+    """Rough memory footprint of a result, in bytes."""
+    return 64 + sum(estimate_row_size(row) for row in rows)
+
+
+class QueryResultCache:
+    """
+    LRU cache of query results bounded by an approximate byte budget.
+
+    Entries expire after ``ttl`` seconds and are tagged with the tables the
+    query reads, so a write to a table drops only the entries that touch it.
+    A query whose tables were written while it ran is not cached.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float = 60.0):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # key -> (rows, tables, size, stored_at)
+        self._entries: 'OrderedDict[str, Tuple[List[Dict[str, Any]], FrozenSet[str], int, float]]' = OrderedDict()
+        self._bytes = 0
+        self._generation = 0
+        # table -> generation of its last invalidation
+        self._invalidated: Dict[str, int] = {}
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def generation(self) -> int:
+        """Snapshot to pass to ``put`` once the query has run."""
+        with self._lock:
+            return self._generation
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            rows, _, size, stored_at = entry
+            if self.ttl and time.monotonic() - stored_at >= self.ttl:
+                self._remove(key)
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return rows
+
+    def put(self, key: str, rows: Any, tables: FrozenSet[str], generation: int, size: Optional[int] = None):
+        """Store a result; ``size`` overrides the estimate for values that aren't a row list."""
+        if size is None:
+            size = estimate_size(rows)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if any(self._invalidated.get(table, -1) > generation for table in tables):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (rows, tables, size, time.monotonic())
+            self._bytes += size
+            self._stats['stores'] += 1
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+
+    def _remove(self, key: str):
+        _, _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def invalidate(self, table_name: str):
+        """Drop every entry that reads ``table_name``."""
+        with self._lock:
+            self._generation += 1
+            self._invalidated[table_name] = self._generation
+            for key in [key for key, entry in self._entries.items() if table_name in entry[1]]:
+                self._remove(key)
+                self._stats['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+            })
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,70 @@
+"""
+Readiness checks that never hold a probe request hostage to the database.
+
+A check runs on a daemon thread, at most one at a time, and its result is
+reused for ``interval`` seconds. A caller waits at most ``timeout`` seconds
+for a check in flight; one that takes longer counts as a failure until it
+finishes.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class ReadinessProbe:
+    """Runs ``check`` (which raises when not ready) in the background and reports its last outcome."""
+
+    def __init__(self, check: Callable[[], None], interval: float = 5.0, timeout: float = 1.0):
+        self.check = check
+        self.interval = interval
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._ready = False
+        self._error: Optional[str] = 'Not checked yet'
+        self._checked_at: Optional[float] = None
+        self._latency: Optional[float] = None
+        # Start time and completion event of the check in flight
+        self._started: Optional[float] = None
+        self._done: Optional[threading.Event] = None
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            fresh = self._checked_at is not None and time.monotonic() - self._checked_at < self.interval
+            if not fresh and self._done is None:
+                self._started = time.monotonic()
+                self._done = threading.Event()
+                threading.Thread(target=self._run, args=(self._done,), name='readiness-check', daemon=True).start()
+            done = self._done
+        if not fresh and done is not None:
+            done.wait(self.timeout)
+        with self._lock:
+            return self._report()
+
+    def _run(self, done: threading.Event):
+        started = time.monotonic()
+        error = None
+        try:
+            self.check()
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        with self._lock:
+            self._ready = error is None
+            self._error = error
+            self._checked_at = time.monotonic()
+            self._latency = self._checked_at - started
+            self._started = None
+            self._done = None
+        done.set()
+
+    def _report(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        ready, error = self._ready, self._error
+        if self._started is not None and now - self._started >= self.timeout:
+            ready, error = False, f'Database check has not answered in {self.timeout:g}s'
+        return {
+            'status': 'ready' if ready else 'unavailable',
+            'ready': ready,
+            'error': error,
+            'latency_ms': round(self._latency * 1000, 3) if self._latency is not None else None,
+            'checked_seconds_ago': round(now - self._checked_at, 3) if self._checked_at is not None else None,
+        }
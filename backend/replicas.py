@@ -0,0 +1,159 @@
+"""
+Read replicas: round-robin over the ones that are up and caught up.
+
+Each replica has its own connection pool, opened on first use. Before a
+replica serves reads its replication lag is measured, and again every
+``check_interval`` seconds; one lagging more than ``max_lag`` seconds is
+skipped until it catches up. A replica that can't be reached is skipped for
+``retry_interval`` seconds.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from pool import PoolTimeout
+
+
+class Replica:
+    """One replica: its pool and what is known about its health and lag."""
+
+    def __init__(self, name: str, new_pool: Callable[[], Any]):
+        self.name = name
+        self._new_pool = new_pool
+        self.pool = None
+        # Guards building the pool, so concurrent first reads share one
+        self._pool_lock = threading.Lock()
+        self.lag: Optional[float] = None
+        self.checked_at: Optional[float] = None
+        self.down_until = 0.0
+        self.error: Optional[str] = None
+        # True while a thread measures the lag, so others don't pile on
+        self.checking = False
+        self.reads = 0
+        self.failures = 0
+
+    def getconn(self):
+        pool = self.pool
+        if pool is None:
+            with self._pool_lock:
+                if self.pool is None:
+                    self.pool = self._new_pool()
+                pool = self.pool
+        return pool.getconn()
+
+    def close(self):
+        with self._pool_lock:
+            pool, self.pool = self.pool, None
+        if pool is not None:
+            pool.close()
+
+
+class ReplicaSet:
+    """
+    Picks the replica for the next read.
+
+    ``replicas`` maps a name to a function that builds that replica's pool.
+    ``measure_lag(conn)`` returns a replica's replication lag in seconds; a
+    ``max_lag`` of 0 skips lag checks, so any reachable replica serves reads.
+    """
+
+    def __init__(self, replicas: Dict[str, Callable[[], Any]], measure_lag: Callable[[Any], float],
+                 max_lag: float = 5.0, check_interval: float = 5.0, retry_interval: float = 30.0):
+        self.replicas = [Replica(name, new_pool) for name, new_pool in replicas.items()]
+        self.measure_lag = measure_lag
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.retry_interval = retry_interval
+        self._lock = threading.Lock()
+        self._next = 0
+        self._stats = {'replica_reads': 0, 'primary_fallbacks': 0}
+
+    def getconn(self):
+        """
+        Check out a connection from the next usable replica; None when no
+        replica is usable (the caller then reads from the primary).
+        """
+        with self._lock:
+            start = self._next
+            self._next = (self._next + 1) % len(self.replicas)
+        for i in range(len(self.replicas)):
+            replica = self.replicas[(start + i) % len(self.replicas)]
+            if not self._usable(replica):
+                continue
+            try:
+                conn = replica.getconn()
+            except PoolTimeout:
+                # Busy rather than broken: leave it in rotation.
+                continue
+            except Exception as e:
+                self.mark_down(replica, e)
+                continue
+            with self._lock:
+                replica.reads += 1
+                self._stats['replica_reads'] += 1
+            return conn
+        with self._lock:
+            self._stats['primary_fallbacks'] += 1
+        return None
+
+    def _usable(self, replica: Replica) -> bool:
+        now = time.monotonic()
+        if replica.down_until > now:
+            return False
+        if not self.max_lag:
+            return True
+        with self._lock:
+            stale = replica.checked_at is None or now - replica.checked_at >= self.check_interval
+            check = stale and not replica.checking
+            if check:
+                replica.checking = True
+        if check:
+            self._check(replica)
+        return replica.down_until <= now and replica.lag is not None and replica.lag <= self.max_lag
+
+    def _check(self, replica: Replica):
+        try:
+            conn = replica.getconn()
+            try:
+                lag = self.measure_lag(conn)
+            finally:
+                conn.close()
+        except Exception as e:
+            self.mark_down(replica, e)
+            lag = None
+        with self._lock:
+            replica.lag = lag
+            replica.checked_at = time.monotonic()
+            replica.checking = False
+
+    def mark_down(self, replica: Replica, error: Exception):
+        """Take a replica out of rotation for ``retry_interval`` seconds."""
+        with self._lock:
+            replica.down_until = time.monotonic() + self.retry_interval
+            replica.error = str(error) or type(error).__name__
+            replica.failures += 1
+            # Measure the lag again once it is back.
+            replica.checked_at = None
+
+    def pools(self) -> List[Any]:
+        return [replica.pool for replica in self.replicas if replica.pool is not None]
+
+    def close(self):
+        for replica in self.replicas:
+            replica.close()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({'max_lag': self.max_lag, 'replicas': [{
+                'name': replica.name,
+                'up': replica.down_until <= now,
+                'lag_seconds': round(replica.lag, 3) if replica.lag is not None else None,
+                'checked_seconds_ago': round(now - replica.checked_at, 3) if replica.checked_at is not None else None,
+                'reads': replica.reads,
+                'failures': replica.failures,
+                'error': replica.error,
+                'pool': replica.pool.stats() if replica.pool is not None else None,
+            } for replica in self.replicas]})
+        return stats
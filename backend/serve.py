@@ -0,0 +1,293 @@
+"""
+Production entry point: a pre-forking multi-process server for the Flask app.
+
+The master process binds the listening socket and forks worker processes
+that accept connections from it. Each worker imports the app after the fork
+(its database adapter, pools and caches are built on first use), serves requests
+on a bounded number of threads and is replaced once it has handled
+``SERVER_MAX_REQUESTS`` requests.
+
+Signals sent to the master:
+    SIGHUP           graceful reload: start fresh workers, then stop the old ones
+    SIGTERM, SIGINT  graceful shutdown
+    SIGTTIN, SIGTTOU add or remove a worker
+
+Usage: python serve.py
+"""
+import logging
+import os
+import random
+import signal
+import socket
+import threading
+import time
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+from werkzeug.serving import ThreadedWSGIServer, WSGIRequestHandler
+
+load_dotenv()
+
+HOST = os.getenv('FLASK_HOST', '0.0.0.0')
+PORT = int(os.getenv('PORT', '5000'))
+# Worker processes (0 = one per CPU)
+WORKERS = int(os.getenv('SERVER_WORKERS', '0')) or os.cpu_count() or 1
+# Requests handled at once by each worker
+THREADS = int(os.getenv('SERVER_THREADS', '16'))
+# Requests after which a worker is replaced (0 = never), plus a random extra so workers don't restart together
+MAX_REQUESTS = int(os.getenv('SERVER_MAX_REQUESTS', '10000'))
+MAX_REQUESTS_JITTER = int(os.getenv('SERVER_MAX_REQUESTS_JITTER', '1000'))
+# Seconds a stopping worker gets to finish its requests before it is killed
+GRACEFUL_TIMEOUT = float(os.getenv('SERVER_GRACEFUL_TIMEOUT', '30'))
+# Seconds a connection may sit idle, waiting for a request or for the client to read
+KEEPALIVE = float(os.getenv('SERVER_KEEPALIVE', '5'))
+# Import the app in the master so workers share its memory; reloads then don't pick up code changes
+PRELOAD = os.getenv('SERVER_PRELOAD', 'false').lower() == 'true'
+
+logger = logging.getLogger(__name__)
+
+
+def load_app():
+    from app import app
+    return app
+
+
+class RequestHandler(WSGIRequestHandler):
+    # Idle keep-alive connections must not hold a stopping worker open.
+    timeout = KEEPALIVE
+
+    def handle_one_request(self):
+        super().handle_one_request()
+        if self.server.stopping:
+            self.close_connection = True
+
+
+class WorkerServer(ThreadedWSGIServer):
+    """
+    Threaded WSGI server with at most ``threads`` requests in flight.
+
+    When every thread is busy the worker stops accepting, leaving new
+    connections in the shared backlog for other workers. On shutdown it
+    waits for in-flight requests.
+    """
+
+    daemon_threads = False
+    block_on_close = True
+
+    def __init__(self, *args, threads: int = THREADS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._slots = threading.BoundedSemaphore(threads)
+        self.stopping = False
+
+    def process_request(self, request, client_address):
+        self._slots.acquire()
+        try:
+            super().process_request(request, client_address)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self._slots.release()
+
+
+class Worker:
+    """One worker process, seen from inside it."""
+
+    def __init__(self, listener: socket.socket, app=None):
+        self.listener = listener
+        self.app = app
+        self.server: Optional[WorkerServer] = None
+        self.handled = 0
+        self.max_requests = MAX_REQUESTS + random.randint(0, MAX_REQUESTS_JITTER) if MAX_REQUESTS else 0
+        self._lock = threading.Lock()
+        self._stopping = False
+
+    def stop(self, *_):
+        """Stop accepting and exit once in-flight requests are done."""
+        with self._lock:
+            if self._stopping:
+                return
+            self._stopping = True
+            server = self.server
+        if server is not None:
+            server.stopping = True
+            # shutdown() waits for serve_forever to return, so it can't run on its thread.
+            threading.Thread(target=server.shutdown, daemon=True).start()
+
+    def wsgi_app(self, environ, start_response):
+        try:
+            return self.app(environ, start_response)
+        finally:
+            if self.max_requests:
+                with self._lock:
+                    self.handled += 1
+                    recycle = self.handled == self.max_requests
+                if recycle:
+                    logger.info('Handled %d requests, recycling', self.handled)
+                    self.stop()
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        signal.signal(signal.SIGTTIN, signal.SIG_IGN)
+        signal.signal(signal.SIGTTOU, signal.SIG_IGN)
+        if self.app is None:
+            self.app = load_app()
+        server = WorkerServer(HOST, PORT, self.wsgi_app, handler=RequestHandler, fd=self.listener.fileno())
+        self.listener.close()
+        with self._lock:
+            self.server = server
+            stopping = self._stopping
+        logger.info('Worker started')
+        try:
+            if not stopping:
+                server.serve_forever()
+        finally:
+            # Waits for the request threads, then closes this worker's own connections.
+            server.server_close()
+            import database
+            database.close_adapter()
+        logger.info('Worker stopped')
+
+
+class Master:
+    """Forks and supervises the worker processes."""
+
+    def __init__(self):
+        self.workers = WORKERS
+        self.app = None
+        self.listener: Optional[socket.socket] = None
+        # pid -> generation; the generation is bumped on every reload
+        self.children: Dict[int, int] = {}
+        # pid -> time it must have exited by before it is killed
+        self.stopping: Dict[int, float] = {}
+        self.generation = 0
+        self.running = True
+        self._reload = False
+        self._last_failure = 0.0
+
+    def bind(self):
+        family = socket.AF_INET6 if ':' in HOST else socket.AF_INET
+        listener = socket.socket(family, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((HOST, PORT))
+        listener.listen(socket.SOMAXCONN)
+        listener.set_inheritable(True)
+        self.listener = listener
+
+    def spawn(self):
+        pid = os.fork()
+        if pid:
+            self.children[pid] = self.generation
+            return
+        # Child: reset_after_fork hooks have already cleared inherited database state.
+        code = 0
+        try:
+            Worker(self.listener, self.app).run()
+        except BaseException as e:
+            logger.exception('Worker failed: %r', e)
+            code = 1
+        finally:
+            os._exit(code)
+
+    def stop_worker(self, pid: int):
+        if pid in self.stopping:
+            return
+        self.stopping[pid] = time.monotonic() + GRACEFUL_TIMEOUT
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    def reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+            self.children.pop(pid, None)
+            expected = self.stopping.pop(pid, None) is not None
+            if os.waitstatus_to_exitcode(status) != 0 and not expected:
+                logger.warning('Worker %d exited with status %d', pid, os.waitstatus_to_exitcode(status))
+                self._last_failure = time.monotonic()
+
+    def kill_overdue(self):
+        now = time.monotonic()
+        for pid, deadline in list(self.stopping.items()):
+            if now >= deadline:
+                logger.warning('Worker %d did not stop in %gs, killing it', pid, GRACEFUL_TIMEOUT)
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                self.stopping[pid] = float('inf')
+
+    def maintain(self):
+        """Start workers until the current generation is at full strength, and trim extras."""
+        current = [pid for pid, gen in self.children.items() if gen == self.generation and pid not in self.stopping]
+        for pid in current[self.workers:]:
+            self.stop_worker(pid)
+        # Back off briefly after a crash so a broken app doesn't fork in a tight loop.
+        if time.monotonic() - self._last_failure < 1.0:
+            return
+        for _ in range(self.workers - len(current)):
+            self.spawn()
+
+    def handle_signal(self, signum, _frame):
+        if signum in (signal.SIGTERM, signal.SIGINT):
+            self.running = False
+        elif signum == signal.SIGHUP:
+            self._reload = True
+        elif signum == signal.SIGTTIN:
+            self.workers += 1
+        elif signum == signal.SIGTTOU:
+            self.workers = max(1, self.workers - 1)
+
+    def reload(self):
+        logger.info('Reloading workers')
+        self.generation += 1
+        old = [pid for pid, gen in self.children.items() if gen < self.generation]
+        self.maintain()
+        for pid in old:
+            self.stop_worker(pid)
+
+    def run(self):
+        self.bind()
+        if PRELOAD:
+            self.app = load_app()
+            # Workers must open their own connections; hand none of ours down.
+            import database
+            database.close_adapter()
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGTTIN, signal.SIGTTOU):
+            signal.signal(sig, self.handle_signal)
+        logger.info('Listening on %s:%d with %d workers of %d threads', HOST, PORT, self.workers, THREADS)
+        while self.running:
+            if self._reload:
+                self._reload = False
+                self.reload()
+            self.reap()
+            self.kill_overdue()
+            if self.running:
+                self.maintain()
+            time.sleep(0.2)
+        logger.info('Shutting down')
+        for pid in list(self.children):
+            self.stop_worker(pid)
+        while self.children:
+            self.reap()
+            self.kill_overdue()
+            time.sleep(0.1)
+        self.listener.close()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO').upper(),
+                        format='[%(name)s %(process)d] %(levelname)s %(message)s')
+    Master().run()
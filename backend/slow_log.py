@@ -0,0 +1,74 @@
+"""
+Ring buffer of recent slow statements.
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence
+
+
+def params_shape(params: Optional[Sequence[Any]]) -> Optional[List[str]]:
+    """Describe bound parameters by type only, so values never reach the log."""
+    if params is None:
+        return None
+    return [type(value).__name__ for value in params]
+
+
+class SlowQueryLog:
+    """
+    Keeps the last ``size`` statements that took at least ``threshold_ms``.
+
+    Entries record the SQL, the types of its parameters, the duration and the
+    number of rows returned. A ``size`` of 0 disables the log.
+    """
+
+    def __init__(self, threshold_ms: float, size: int = 100):
+        self.threshold_ms = threshold_ms
+        self.size = size
+        self._lock = threading.Lock()
+        self._entries: deque = deque(maxlen=size or None)
+        self._recorded = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def record(self, source: str, sql: str, params: Optional[Sequence[Any]], duration: float,
+               rows: Optional[int], error: Optional[str] = None):
+        """Log a statement that ran for ``duration`` seconds, if it was slow enough."""
+        duration_ms = duration * 1000
+        if not self.enabled or duration_ms < self.threshold_ms:
+            return
+        entry = {
+            'source': source,
+            'sql': sql,
+            'params': params_shape(params),
+            'duration_ms': round(duration_ms, 3),
+            'rows': rows,
+            'error': error,
+            'finished_at': time.time(),
+        }
+        with self._lock:
+            self._entries.append(entry)
+            self._recorded += 1
+
+    def entries(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return logged statements, newest first."""
+        with self._lock:
+            entries = list(self._entries)
+        entries.reverse()
+        return entries[:limit] if limit else entries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'threshold_ms': self.threshold_ms,
+                'size': self.size,
+                'entries': len(self._entries),
+                'recorded': self._recorded,
+            }
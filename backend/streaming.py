@@ -0,0 +1,207 @@
+"""
+Incremental encoders for streaming query results over HTTP.
+
+Adapters yield ``(columns, rows)`` batches of plain tuples; the helpers here
+turn them into response chunks without ever holding more than one batch.
+"""
+import csv
+import io
+import itertools
+import json
+import zlib
+from typing import Any, BinaryIO, Iterable, Iterator, List, Optional, Tuple
+
+from serialization import dumps
+
+Batch = Tuple[List[str], List[tuple]]
+
+
+def _dumps(value: Any) -> str:
+    return dumps(value)
+
+
+class PrimedIterator:
+    """
+    Iterator that pulls its first item eagerly.
+
+    Errors such as invalid SQL surface before the HTTP response has started,
+    so they can still be reported with a proper status code. ``close()`` is
+    forwarded to the source, which releases its database connection.
+    """
+
+    def __init__(self, source: Iterator[Any]):
+        self._source = source
+        try:
+            self._first = next(source)
+            self._primed = True
+        except StopIteration:
+            self._first = None
+            self._primed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._primed:
+            self._primed = False
+            first, self._first = self._first, None
+            return first
+        return next(self._source)
+
+    def close(self):
+        close = getattr(self._source, 'close', None)
+        if close is not None:
+            close()
+
+
+def _close(batches: Iterable[Batch]):
+    close = getattr(batches, 'close', None)
+    if close is not None:
+        close()
+
+
+def ndjson_stream(batches: Iterable[Batch]) -> Iterator[str]:
+    """Encode batches as newline-delimited JSON, one object per row."""
+    try:
+        for columns, rows in batches:
+            if rows:
+                yield ''.join(_dumps(dict(zip(columns, row))) + '\n' for row in rows)
+    except Exception as e:
+        # The status line is long gone; report the failure in-band.
+        yield _dumps({'error': str(e)}) + '\n'
+    finally:
+        _close(batches)
+
+
+def json_array_stream(batches: Iterable[Batch], extra: Optional[dict] = None) -> Iterator[str]:
+    """Encode batches as one JSON document, ``{"data": [...]}``, written incrementally."""
+    head = _dumps(extra or {})[:-1]
+    yield (head + ',' if extra else '{') + '"data":['
+    first = True
+    error = None
+    try:
+        for columns, rows in batches:
+            if rows:
+                chunk = ','.join(_dumps(dict(zip(columns, row))) for row in rows)
+                yield chunk if first else ',' + chunk
+                first = False
+    except Exception as e:
+        error = str(e)
+    finally:
+        _close(batches)
+    yield ']' + (',"error":' + _dumps(error) if error is not None else '') + '}'
+
+
+def csv_stream(batches: Iterable[Batch]) -> Iterator[str]:
+    """Encode batches as CSV with a header row; NULL becomes an empty field."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    header = True
+    try:
+        for columns, rows in batches:
+            if header:
+                writer.writerow(columns)
+                header = False
+            writer.writerows(rows)
+            chunk = buffer.getvalue()
+            if chunk:
+                yield chunk
+                buffer.seek(0)
+                buffer.truncate()
+    finally:
+        _close(batches)
+
+
+def gzip_stream(chunks: Iterable[Any], level: int = 6, flush: bool = False) -> Iterator[bytes]:
+    """
+    Gzip a stream of str/bytes chunks on the fly.
+    
+    With ``flush`` every input chunk is flushed out, so a client can decode
+    each batch as soon as it arrives instead of when the buffer fills.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            compressed = compressor.compress(chunk)
+            if flush:
+                compressed += compressor.flush(zlib.Z_SYNC_FLUSH)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+    finally:
+        _close(chunks)
+
+
+def read_csv(stream: BinaryIO, encoding: str = 'utf-8') -> Tuple[List[str], Iterator[List[Any]]]:
+    """
+    Parse a CSV body incrementally.
+    
+    The first record is the header. Returns the column names and an iterator
+    of rows; empty fields become NULL.
+    """
+    reader = csv.reader(io.TextIOWrapper(stream, encoding=encoding, newline=''))
+    header = next(reader, None)
+    if not header:
+        raise ValueError('CSV body is empty')
+    columns = [name.strip() for name in header]
+
+    def rows() -> Iterator[List[Any]]:
+        for record in reader:
+            if not record:
+                continue
+            if len(record) != len(columns):
+                raise ValueError(f'Line {reader.line_num}: expected {len(columns)} fields, got {len(record)}')
+            yield [value if value != '' else None for value in record]
+
+    return columns, rows()
+
+
+def _ndjson_value(value: Any) -> Any:
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (dict, list)):
+        return _dumps(value)
+    return value
+
+
+def read_ndjson(stream: BinaryIO, sample_size: int = 1000,
+                encoding: str = 'utf-8') -> Tuple[List[str], Iterator[List[Any]]]:
+    """
+    Parse an NDJSON body (one object per line) incrementally.
+    
+    The columns are the keys seen in the first ``sample_size`` objects, in
+    order of appearance; a later object with a key outside that set is an
+    error. Nested values are stored as JSON text and booleans as 0/1.
+    """
+    def objects() -> Iterator[Tuple[int, dict]]:
+        for number, line in enumerate(io.TextIOWrapper(stream, encoding=encoding), 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                obj = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f'Line {number}: {e}')
+            if not isinstance(obj, dict):
+                raise ValueError(f'Line {number}: expected a JSON object')
+            yield number, obj
+
+    source = objects()
+    sample = list(itertools.islice(source, sample_size))
+    columns: List[str] = []
+    for _, obj in sample:
+        for key in obj:
+            if key not in columns:
+                columns.append(key)
+    known = set(columns)
+
+    def rows() -> Iterator[List[Any]]:
+        for number, obj in itertools.chain(sample, source):
+            unknown = [key for key in obj if key not in known]
+            if unknown:
+                raise ValueError(f'Line {number}: unexpected column "{unknown[0]}"')
+            yield [_ndjson_value(obj.get(name)) for name in columns]
+
+    return columns, rows()
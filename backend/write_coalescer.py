@@ -0,0 +1,166 @@
+"""
+Group commit for single-row writes.
+
+Writes submitted from many threads are run by one writer thread on its own
+connection. It gathers the writes that arrive within ``window`` seconds of
+the first (at most ``max_ops``) and commits them in a single transaction,
+so they take the database's write lock and sync once instead of each
+queueing for it. Gathering stops early once every caller waiting on a write
+is in the batch. Writes that arrive while a batch commits are already
+waiting when the next batch starts, so under load batches grow even with a
+window of 0.
+
+Each write runs under its own savepoint: one that fails is rolled back on
+its own and its caller gets the exception, while the rest of the batch
+commits. If the commit itself fails, every write in the batch gets that
+error, since none of them was stored.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Tuple
+
+_STOP = object()
+
+
+class WriteCoalescer:
+    """
+    Runs ``op(cursor)`` callables in batched transactions on a connection
+    made by ``connect`` (a DB-API connection that understands SAVEPOINT).
+    The writer thread starts with the first write.
+    """
+
+    def __init__(self, connect: Callable[[], Any], window: float = 0.001, max_ops: int = 100,
+                 name: str = 'write-coalescer'):
+        self.connect = connect
+        self.window = window
+        self.max_ops = max(max_ops, 1)
+        self.name = name
+        self._queue: 'queue.Queue' = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        # Callers blocked in submit()
+        self._waiting = 0
+        self._stats = {'batches': 0, 'ops': 0, 'failed': 0, 'failed_commits': 0, 'largest_batch': 0}
+
+    def submit(self, op: Callable[[Any], Any]) -> Any:
+        """Run ``op(cursor)`` in the next batch; returns its result once committed, or raises its error."""
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('Write coalescer is closed')
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            self._queue.put((op, future))
+            self._waiting += 1
+        try:
+            return future.result()
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    def _run(self):
+        conn = None
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            stop = self._gather(batch)
+            try:
+                if conn is None:
+                    conn = self.connect()
+                self._commit(conn, batch)
+            except Exception as e:
+                # BEGIN failed (or no connection): nothing in the batch ran.
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                with self._lock:
+                    self._stats['failed_commits'] += 1
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _gather(self, batch: List[Tuple[Callable[[Any], Any], Future]]) -> bool:
+        """Add the writes that arrive within the window to ``batch``; True if the coalescer was closed meanwhile."""
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_ops:
+            if len(batch) >= self._waiting and self._queue.empty():
+                # Every writer is already in: waiting longer only adds latency.
+                break
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return True
+            batch.append(item)
+        return False
+
+    def _commit(self, conn, batch: List[Tuple[Callable[[Any], Any], Future]]):
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        outcomes = []
+        try:
+            for op, future in batch:
+                cursor.execute('SAVEPOINT dashtools_write')
+                try:
+                    result = op(cursor)
+                except Exception as e:
+                    cursor.execute('ROLLBACK TO SAVEPOINT dashtools_write')
+                    cursor.execute('RELEASE SAVEPOINT dashtools_write')
+                    outcomes.append((future, None, e))
+                    continue
+                cursor.execute('RELEASE SAVEPOINT dashtools_write')
+                outcomes.append((future, result, None))
+            conn.commit()
+        except Exception as e:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            for _, future in batch:
+                future.set_exception(e)
+            with self._lock:
+                self._stats['failed_commits'] += 1
+            return
+        failed = 0
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+                failed += 1
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['ops'] += len(batch)
+            self._stats['failed'] += failed
+            self._stats['largest_batch'] = max(self._stats['largest_batch'], len(batch))
+
+    def close(self, timeout: float = 5.0):
+        """Commit the writes already submitted, then stop the writer and close its connection."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+            if thread is not None:
+                self._queue.put(_STOP)
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['avg_batch'] = round(stats['ops'] / stats['batches'], 2) if stats['batches'] else 0.0
+        stats['queued'] = self._queue.qsize()
+        stats.update({'window_ms': self.window * 1000, 'max_ops': self.max_ops})
+        return stats